@@ -1,47 +1,277 @@
 """Box Mock API Server - Entry point for running the Flask application."""
 
+from __future__ import annotations
+
 import argparse
+import signal
+import sys
 from pathlib import Path
 
-from flask import Flask
+from flask import Flask, Request, g
 
-from box_mock.hooks import log_request, setup_db_session, teardown_db_session
+from box_mock import config, storage
+from box_mock.cache import configure_item_cache
+from box_mock.db import (
+    DB_PROFILES,
+    build_template,
+    configure_engine_cache,
+    start_checkpointing,
+    start_engine_sweeping,
+)
+from box_mock.hooks import (
+    log_request,
+    setup_db_session,
+    start_request_timer,
+    teardown_db_session,
+)
+from box_mock.identity import get_identity
+from box_mock.request_log import configure_request_log
 from box_mock.routes.admin import admin_bp
+from box_mock.routes.batch import batch_bp
 from box_mock.routes.collaborations import collaborations_bp
 from box_mock.routes.files import files_bp
 from box_mock.routes.folders import folders_bp
+from box_mock.routes.search import search_bp
 from box_mock.routes.sign_requests import sign_requests_bp
+from box_mock.routes.upload_sessions import upload_sessions_bp
 from box_mock.routes.users import users_bp
+from box_mock.serialization import FastJSONProvider
+from box_mock.server import ServerConfigError, serve
+
+
+class BoxMockRequest(Request):
+    """Request parsing uploaded files straight into the identity's files dir."""
+
+    upload_files: list[storage.HashingTempFile] | None = None
+
+    def _get_file_stream(
+        self,
+        total_content_length: int | None,  # noqa: ARG002
+        content_type: str | None,  # noqa: ARG002
+        filename: str | None = None,  # noqa: ARG002
+        content_length: int | None = None,  # noqa: ARG002
+    ) -> storage.HashingTempFile:
+        """Write a file part to a hashed temp file instead of the system temp dir."""
+        identity = g.get("identity") or get_identity()
+        upload = storage.HashingTempFile(storage.get_files_dir(identity))
+        self.upload_files = [*(self.upload_files or []), upload]
+        return upload
+
+    def close(self) -> None:
+        """Close the request, removing uploaded parts no route claimed."""
+        super().close()
+        # Parts of a form that failed to parse never reach ``files``.
+        for upload in self.upload_files or []:
+            upload.close()
+
+
+class BoxMockFlask(Flask):
+    """Flask app with upload-aware requests, serializing with ``FastJSONProvider``."""
+
+    request_class = BoxMockRequest
+    json_provider_class = FastJSONProvider
 
 
 def create_app() -> Flask:
     """Create Flask app with identity-based database isolation."""
-    app = Flask(__name__)
+    app = BoxMockFlask(__name__)
 
     data_dir = Path("/data")
     data_dir.mkdir(parents=True, exist_ok=True)
     app.config["DATA_DIR"] = data_dir
-    app.logger.setLevel("DEBUG")
 
     app.register_blueprint(admin_bp)
+    app.register_blueprint(batch_bp)
     app.register_blueprint(users_bp)
     app.register_blueprint(folders_bp)
     app.register_blueprint(files_bp)
+    app.register_blueprint(upload_sessions_bp)
     app.register_blueprint(collaborations_bp)
     app.register_blueprint(sign_requests_bp)
+    app.register_blueprint(search_bp)
 
+    configure_engine_cache()
+    configure_item_cache()
+    configure_request_log()
+    build_template()
+    start_checkpointing()
+    start_engine_sweeping()
+
+    app.before_request(start_request_timer)
     app.before_request(setup_db_session)
-    app.before_request(log_request)
+    app.after_request(log_request)
     app.teardown_request(teardown_db_session)
 
     return app
 
 
-def main() -> None:
-    """Run the Box Mock API server."""
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser, defaulting to the configured settings."""
     parser = argparse.ArgumentParser(description="Box Mock API Server")
     parser.add_argument("--port", type=int, default=8888, help="Port to run on")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=config.WORKERS,
+        help="Worker processes serving requests (in-memory mode needs 1)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        default=config.THREADS,
+        help="Threads per worker process",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        default=config.GRACEFUL_TIMEOUT,
+        help="Seconds workers get to finish their requests on shutdown",
+    )
+    parser.add_argument(
+        "--dev",
+        action="store_true",
+        default=config.DEV_SERVER,
+        help="Run the Werkzeug development server with debugger and reloader",
+    )
+    parser.add_argument(
+        "--fanout-depth",
+        type=int,
+        choices=range(5),
+        default=config.FANOUT_DEPTH,
+        help="Directory levels blobs are nested under (0 for a flat layout)",
+    )
+    parser.add_argument(
+        "--in-memory",
+        action="store_true",
+        default=config.IN_MEMORY,
+        help="Keep identity databases and blobs in memory instead of on disk",
+    )
+    parser.add_argument(
+        "--memory-dir",
+        type=Path,
+        default=config.MEMORY_DIR,
+        help="Directory holding in-memory identities' blobs",
+    )
+    parser.add_argument(
+        "--checkpoint-interval",
+        type=int,
+        default=config.CHECKPOINT_INTERVAL,
+        help="Seconds between in-memory checkpoints to /data (0 disables)",
+    )
+    parser.add_argument(
+        "--checkpoint-on-exit",
+        action="store_true",
+        default=config.CHECKPOINT_ON_EXIT,
+        help="Checkpoint in-memory identities to /data on shutdown",
+    )
+    parser.add_argument(
+        "--db-profile",
+        choices=sorted(DB_PROFILES),
+        default=config.DB_PROFILE,
+        help="SQLite PRAGMA profile for identity databases",
+    )
+    parser.add_argument(
+        "--read-engine",
+        action=argparse.BooleanOptionalAction,
+        default=config.READ_ENGINE,
+        help="Serve GET routes from a separate read-only engine per identity",
+    )
+    parser.add_argument(
+        "--max-engines",
+        type=int,
+        default=config.MAX_ENGINES,
+        help="Identities whose databases stay open at once (0 for no limit)",
+    )
+    parser.add_argument(
+        "--engine-idle-ttl",
+        type=int,
+        default=config.ENGINE_IDLE_TTL,
+        help="Seconds before an unused identity's database is closed (0 to keep)",
+    )
+    parser.add_argument(
+        "--item-cache-size",
+        type=int,
+        default=config.ITEM_CACHE_SIZE,
+        help="Item responses cached per process (0 disables the cache)",
+    )
+    parser.add_argument(
+        "--item-cache-ttl",
+        type=int,
+        default=config.ITEM_CACHE_TTL,
+        help="Seconds before an unused cached item is dropped (0 to keep)",
+    )
+    parser.add_argument(
+        "--json-backend",
+        choices=["orjson", "stdlib"],
+        default=config.JSON_BACKEND,
+        help="JSON encoder for responses (orjson is used only when installed)",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        default=config.LOG_LEVEL,
+        help="Lowest level of request and server logs written",
+    )
+    parser.add_argument(
+        "--log-sample-rate",
+        type=float,
+        default=config.LOG_SAMPLE_RATE,
+        help="Fraction of successful requests logged (errors are always logged)",
+    )
+    parser.add_argument(
+        "--log-routes",
+        default=config.LOG_ROUTES,
+        help='Per-route overrides, e.g. "admin.health=WARNING,files.get_file=INFO:0.1"',
+    )
+    parser.add_argument(
+        "--log-bodies",
+        action="store_true",
+        default=config.LOG_BODIES,
+        help="Log JSON and text request bodies, up to --log-body-limit bytes",
+    )
+    parser.add_argument(
+        "--log-body-limit",
+        type=int,
+        default=config.LOG_BODY_LIMIT,
+        help="Bytes of each request body logged with --log-bodies",
+    )
+    return parser
+
+
+def main() -> None:
+    """Run the Box Mock API server."""
+    parser = build_parser()
     args = parser.parse_args()
+    config.WORKERS = args.workers
+    config.THREADS = args.threads
+    config.GRACEFUL_TIMEOUT = args.graceful_timeout
+    config.LOG_LEVEL = args.log_level
+    config.LOG_SAMPLE_RATE = args.log_sample_rate
+    config.LOG_ROUTES = args.log_routes
+    config.LOG_BODIES = args.log_bodies
+    config.LOG_BODY_LIMIT = args.log_body_limit
+    config.JSON_BACKEND = args.json_backend
+    config.ITEM_CACHE_SIZE = args.item_cache_size
+    config.ITEM_CACHE_TTL = args.item_cache_ttl
+    config.MAX_ENGINES = args.max_engines
+    config.ENGINE_IDLE_TTL = args.engine_idle_ttl
+    config.DB_PROFILE = args.db_profile
+    config.READ_ENGINE = args.read_engine
+    config.FANOUT_DEPTH = args.fanout_depth
+    config.IN_MEMORY = args.in_memory
+    config.MEMORY_DIR = args.memory_dir
+    config.CHECKPOINT_INTERVAL = args.checkpoint_interval
+    config.CHECKPOINT_ON_EXIT = args.checkpoint_on_exit
+
+    if not args.dev:
+        try:
+            serve(create_app, "0.0.0.0", args.port)
+        except ServerConfigError as e:
+            parser.error(str(e))
+        return
+
+    # Turn SIGTERM (e.g. docker stop) into a normal exit so exit checkpoints run.
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
 
     app = create_app()
     app.run(host="0.0.0.0", port=args.port, debug=True)
@@ -0,0 +1,130 @@
+"""
+Read-through cache of item responses.
+
+GET routes for files, folders, users and sign requests render items as Box
+objects; the full object is cached per ``(identity, generation, type, id)``
+and ``fields`` selections are cut from it. Write routes invalidate the items
+they change once their transaction is committed. Changes to a whole identity
+(reset, restore, recursive deletes) bump its generation instead, which makes
+all of its entries unreachable at once.
+
+Reads that raced with a write are not cached: each identity has a write
+epoch, and a value is only stored if no invalidation happened while it was
+being loaded.
+
+Inside ``bypass`` items are read straight from the session and not cached,
+for work whose transaction is not committed yet.
+"""
+
+from __future__ import annotations
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import TYPE_CHECKING, Any
+
+from box_mock import config
+from box_mock.lru import LRUCache
+from box_mock.serialization import load_options
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from sqlalchemy.orm import Session
+
+    from box_mock.serialization import Serializable
+
+_items: LRUCache[tuple[str, int, str, str], dict[str, Any]] = LRUCache()
+_generations: dict[str, int] = {}
+_epochs: dict[str, int] = {}
+_lock = threading.Lock()
+_bypassed: ContextVar[bool] = ContextVar("item_cache_bypassed", default=False)
+
+
+def configure_item_cache() -> None:
+    """Start an empty item cache with the configured size and TTL limits."""
+    global _items  # noqa: PLW0603
+    _items = LRUCache(config.ITEM_CACHE_SIZE, config.ITEM_CACHE_TTL)
+
+
+@contextmanager
+def bypass() -> Iterator[None]:
+    """
+    Read items without the cache for the duration of the block.
+
+    Uncommitted reads must not be served to other requests, and cached items
+    may predate the changes the block has made.
+    """
+    token = _bypassed.set(True)
+    try:
+        yield
+    finally:
+        _bypassed.reset(token)
+
+
+def _project(
+    model: type[Serializable],
+    data: dict[str, Any],
+    fields: frozenset[str] | None,
+) -> dict[str, Any]:
+    """Keep only ``fields`` of a full Box object."""
+    if fields is None:
+        return data
+    return {
+        name: value
+        for name, value in data.items()
+        if name in fields or name in model.REQUIRED_FIELDS
+    }
+
+
+def get_item(
+    identity: str,
+    session: Session,
+    model: type[Serializable],
+    item_id: str,
+    fields: frozenset[str] | None = None,
+) -> dict[str, Any] | None:
+    """
+    Return an item rendered as a Box object, or None if it does not exist.
+
+    With the cache disabled or bypassed, only the columns ``fields`` need are
+    loaded.
+    """
+    if not config.ITEM_CACHE_SIZE or _bypassed.get():
+        item = session.get(model, item_id, options=load_options(model, fields))
+        return item.to_dict(fields) if item else None
+
+    with _lock:
+        key = (identity, _generations.get(identity, 0), model.__tablename__, item_id)
+        epoch = _epochs.get(identity, 0)
+    data = _items.get(key)
+    if data is None:
+        item = session.get(model, item_id)
+        if item is None:
+            return None
+        data = item.to_dict()
+        with _lock:
+            if _epochs.get(identity, 0) == epoch:
+                _items.put(key, data)
+    return _project(model, data, fields)
+
+
+def invalidate(identity: str, model: type[Serializable], *item_ids: str) -> None:
+    """Drop cached items changed by a committed write."""
+    with _lock:
+        _epochs[identity] = _epochs.get(identity, 0) + 1
+        generation = _generations.get(identity, 0)
+    for item_id in item_ids:
+        _items.pop((identity, generation, model.__tablename__, item_id))
+
+
+def invalidate_identity(identity: str) -> None:
+    """Drop every cached item of an identity."""
+    with _lock:
+        _epochs[identity] = _epochs.get(identity, 0) + 1
+        _generations[identity] = _generations.get(identity, 0) + 1
+
+
+def item_cache_stats() -> dict[str, int | float]:
+    """Return size, limits and hit/miss/eviction counters of the item cache."""
+    return _items.stats()
@@ -0,0 +1,84 @@
+"""Runtime settings, read from ``BOX_MOCK_*`` environment variables."""
+
+from __future__ import annotations
+
+import os
+import tempfile
+from pathlib import Path
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment."""
+    return int(os.environ.get(name, default))
+
+
+# Number of two-character directory levels blobs are nested under, e.g. with a
+# depth of 2 the blob "abcdef..." is stored at "ab/cd/abcdef...".
+FANOUT_DEPTH = _env_int("BOX_MOCK_FANOUT_DEPTH", 2)
+
+
+def _env_bool(name: str, *, default: bool = False) -> bool:
+    """Read a boolean setting from the environment."""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.lower() in {"1", "true", "yes", "on"}
+
+
+def _default_memory_dir() -> Path:
+    """Use the RAM-backed /dev/shm if there is one, else the temp directory."""
+    shm = Path("/dev/shm")
+    return (shm if shm.is_dir() else Path(tempfile.gettempdir())) / "box-mock"
+
+
+# Keep identity databases in shared in-memory SQLite and blobs under MEMORY_DIR
+# instead of under DATA_DIR.
+IN_MEMORY = _env_bool("BOX_MOCK_IN_MEMORY")
+MEMORY_DIR = Path(os.environ.get("BOX_MOCK_MEMORY_DIR") or _default_memory_dir())
+
+# In-memory mode only: seconds between checkpoints to DATA_DIR (0 disables
+# periodic checkpoints) and whether to checkpoint when the server exits.
+CHECKPOINT_INTERVAL = _env_int("BOX_MOCK_CHECKPOINT_INTERVAL", 0)
+CHECKPOINT_ON_EXIT = _env_bool("BOX_MOCK_CHECKPOINT_ON_EXIT")
+
+# SQLite PRAGMA profile for identity databases: "durable", "fast" or "ci".
+DB_PROFILE = os.environ.get("BOX_MOCK_DB_PROFILE", "fast")
+
+# Give each identity a second, read-only engine used by GET routes.
+READ_ENGINE = _env_bool("BOX_MOCK_READ_ENGINE", default=True)
+
+# Identities whose engines stay open at once (0 for no limit), and seconds an
+# identity's engines may sit unused before they are closed (0 to keep them).
+MAX_ENGINES = _env_int("BOX_MOCK_MAX_ENGINES", 256)
+ENGINE_IDLE_TTL = _env_int("BOX_MOCK_ENGINE_IDLE_TTL", 600)
+
+# JSON encoder for responses: "orjson" (used when installed) or "stdlib".
+JSON_BACKEND = os.environ.get("BOX_MOCK_JSON_BACKEND", "orjson")
+
+# Item responses cached per process (0 disables the cache), and seconds an
+# entry may go unused before it is dropped (0 to keep until evicted).
+ITEM_CACHE_SIZE = _env_int("BOX_MOCK_ITEM_CACHE_SIZE", 10000)
+ITEM_CACHE_TTL = _env_int("BOX_MOCK_ITEM_CACHE_TTL", 300)
+
+# Request log: lowest level written, and the fraction of requests logged.
+# Client and server errors are logged whatever the sampling.
+LOG_LEVEL = os.environ.get("BOX_MOCK_LOG_LEVEL", "INFO").upper()
+LOG_SAMPLE_RATE = float(os.environ.get("BOX_MOCK_LOG_SAMPLE_RATE", "1"))
+
+# Per-route overrides as "endpoint=LEVEL[:rate]" pairs separated by commas,
+# e.g. "admin.health=WARNING,files.get_file=INFO:0.1".
+LOG_ROUTES = os.environ.get("BOX_MOCK_LOG_ROUTES", "")
+
+# Log request bodies, up to LOG_BODY_LIMIT bytes each. Multipart and form
+# bodies are never logged.
+LOG_BODIES = _env_bool("BOX_MOCK_LOG_BODIES")
+LOG_BODY_LIMIT = _env_int("BOX_MOCK_LOG_BODY_LIMIT", 1024)
+
+# Server: worker processes, threads per worker, and seconds workers get to
+# finish their requests on shutdown. In-memory mode needs a single worker.
+WORKERS = _env_int("BOX_MOCK_WORKERS", 1)
+THREADS = _env_int("BOX_MOCK_THREADS", 8)
+GRACEFUL_TIMEOUT = _env_int("BOX_MOCK_GRACEFUL_TIMEOUT", 30)
+
+# Serve with the Werkzeug development server, debugger and reloader instead.
+DEV_SERVER = _env_bool("BOX_MOCK_DEV_SERVER")
@@ -2,64 +2,455 @@
 
 from __future__ import annotations
 
+import atexit
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
 from pathlib import Path
+from typing import TYPE_CHECKING, NamedTuple
 
 from flask import g
-from sqlalchemy import Engine, create_engine
+from sqlalchemy import Engine, create_engine, event
 from sqlalchemy.orm import Session, sessionmaker
 
+from box_mock import cache, config, locks, storage
+from box_mock.lru import LRUCache
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+
+    from sqlalchemy.pool import PoolProxiedConnection
+
 DATA_DIR = Path("/data")
-_engines: dict[str, tuple] = {}  # identity -> (engine, SessionClass)
+# Held by the process bootstrapping an identity, in the identity's directory.
+BOOTSTRAP_LOCK = ".bootstrap.lock"
+# Seconds between sweeps of idle engines.
+ENGINE_SWEEP_INTERVAL = 60
+
+logger = logging.getLogger(__name__)
+
+# PRAGMAs applied to every new connection, by profile name.
+DB_PROFILES: dict[str, dict[str, str | int]] = {
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16000,
+        "mmap_size": 0,
+        "busy_timeout": 30000,
+    },
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "busy_timeout": 30000,
+    },
+    "ci": {
+        "journal_mode": "WAL",
+        "synchronous": "OFF",
+        "cache_size": -64000,
+        "mmap_size": 268435456,
+        "busy_timeout": 30000,
+        "temp_store": "MEMORY",
+    },
+}
+
+
+class IdentityEngines(NamedTuple):
+    """Engines and session classes for one identity."""
+
+    engine: Engine
+    session_class: type[Session]
+    read_engine: Engine | None
+    read_session_class: type[Session]
+
+
+def _dispose_engines(identity: str, engines: IdentityEngines) -> None:
+    """Close the pooled connections of an identity evicted from the cache."""
+    logger.info("Disposing engines for identity %s", identity)
+    engines.engine.dispose()
+    if engines.read_engine is not None:
+        engines.read_engine.dispose()
+
+
+# Identity -> engines, bounded so idle identities release their file descriptors.
+_engines: LRUCache[str, IdentityEngines] = LRUCache(on_evict=_dispose_engines)
+# In-memory mode: identity -> connection keeping its memory database alive.
+_memory_keepers: dict[str, PoolProxiedConnection] = {}
+_checkpointing_started = False
+_sweeping_started = False
+_template_path: Path | None = None
+_template_lock = threading.Lock()
+# Kept for good: a lock dropped while a thread waits on it would let the next
+# request bootstrap alongside that thread under a new one.
+_bootstrap_locks: defaultdict[str, threading.Lock] = defaultdict(threading.Lock)
+_bootstrap_locks_guard = threading.Lock()
+
+
+def configure_engine_cache() -> None:
+    """
+    Apply the configured size and idle limits to the engine cache.
+
+    In-memory identities are never evicted: their data only lives as long as
+    their engine, and memory databases hold no file descriptors.
+    """
+    _engines.max_size = 0 if config.IN_MEMORY else config.MAX_ENGINES
+    _engines.ttl = 0 if config.IN_MEMORY else config.ENGINE_IDLE_TTL
+
+
+def get_identity_dir(identity: str) -> Path:
+    """Get the directory holding an identity's blobs and upload sessions."""
+    return (config.MEMORY_DIR if config.IN_MEMORY else DATA_DIR) / identity
+
+
+def _apply_profile(engine: Engine, *, read_only: bool = False) -> Engine:
+    """Apply the configured profile's PRAGMAs to each new connection."""
+    pragmas = dict(DB_PROFILES[config.DB_PROFILE])
+    if read_only:
+        pragmas["query_only"] = "ON"
 
+    @event.listens_for(engine, "connect")
+    def set_pragmas(dbapi_connection: sqlite3.Connection, _: object) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
 
-def get_session_class(identity: str) -> tuple[Engine, type[Session]]:
-    """Get or create engine and session class for identity."""
-    if identity not in _engines:
-        db_dir = DATA_DIR / identity
+    return engine
+
+
+def build_template() -> Path:
+    """
+    Build the database new identities are cloned from, once per process.
+
+    The template has the full schema, migrated to the current version, and
+    the root folder, so bootstrapping an identity is a file copy instead of
+    ``create_all`` plus an insert.
+    """
+    global _template_path  # noqa: PLW0603
+    with _template_lock:
+        if _template_path is None or not _template_path.exists():
+            from box_mock import migrations  # noqa: PLC0415
+            from box_mock.models import Base, Folder  # noqa: PLC0415
+
+            template_dir = Path(tempfile.mkdtemp(prefix="box-mock-template-"))
+            atexit.register(shutil.rmtree, template_dir, ignore_errors=True)
+            path = template_dir / "box.db"
+            engine = create_engine(f"sqlite:///{path}")
+            Base.metadata.create_all(engine)
+            migrations.upgrade(engine)
+            with Session(engine) as session:
+                session.add(Folder(id="0", name="All Files", parent_id=None))
+                session.commit()
+            engine.dispose()
+            _template_path = path
+        return _template_path
+
+
+def _clone_template(db_path: Path) -> bool:
+    """
+    Create ``db_path`` as a copy of the template unless it already exists.
+
+    The copy is linked into place, so a concurrent bootstrap by another
+    process can never be overwritten. Returns whether the file was created.
+    """
+    if db_path.exists():
+        return False
+    fd, tmp_name = tempfile.mkstemp(dir=db_path.parent, prefix=".box.db-")
+    os.close(fd)
+    try:
+        shutil.copyfile(build_template(), tmp_name)
+        os.link(tmp_name, db_path)
+    except FileExistsError:
+        return False
+    finally:
+        Path(tmp_name).unlink()
+    return True
+
+
+def _create_engines(identity: str) -> tuple[Engine, Engine | None, bool]:
+    """
+    Create the read-write and optional read-only engine for an identity.
+
+    New identities are cloned from the template database. In-memory mode uses
+    SQLite's ``memdb`` VFS, a memory database shared by all connections of
+    this process; a keeper connection holds it open, and it is seeded from the
+    last checkpoint in DATA_DIR, or else from the template. Also returns
+    whether the database predates this process and may need migrating.
+    """
+    db_dir = DATA_DIR / identity
+    checkpoint = db_dir / "box.db"
+    if config.IN_MEMORY:
+        url = f"sqlite:///file:/box-mock-{uuid.uuid4().hex}?vfs=memdb&uri=true"
+        existing = checkpoint.exists()
+    else:
         db_dir.mkdir(parents=True, exist_ok=True)
+        url = f"sqlite:///{checkpoint}"
+        existing = not _clone_template(checkpoint)
 
-        engine = create_engine(
-            f"sqlite:///{db_dir}/box.db",
-            connect_args={"check_same_thread": False},
-        )
+    connect_args = {"check_same_thread": False}
+    engine = _apply_profile(create_engine(url, connect_args=connect_args))
+    read_engine = (
+        _apply_profile(create_engine(url, connect_args=connect_args), read_only=True)
+        if config.READ_ENGINE
+        else None
+    )
+    if not config.IN_MEMORY:
+        return engine, read_engine, existing
+
+    keeper = engine.raw_connection()
+    _memory_keepers[identity] = keeper
+    source = sqlite3.connect(checkpoint if existing else build_template())
+    try:
+        source.backup(keeper.driver_connection)
+    finally:
+        source.close()
+    # Blobs left by an earlier process do not belong to this database.
+    shutil.rmtree(get_identity_dir(identity), ignore_errors=True)
+    if existing and (db_dir / "files").exists():
+        storage.mirror_dir(db_dir / "files", get_identity_dir(identity) / "files")
+    return engine, read_engine, existing
+
+
+@contextmanager
+def _bootstrap_lock(identity: str) -> Iterator[None]:
+    """
+    Hold the lock serializing bootstrap of one identity.
+
+    On disk, other server processes are locked out as well, so only one of
+    them clones or migrates the database at a time. In-memory identities
+    belong to a single process.
+    """
+    with _bootstrap_locks_guard:
+        lock = _bootstrap_locks[identity]
+    with lock:
+        if config.IN_MEMORY:
+            yield
+        else:
+            with locks.file_lock(DATA_DIR / identity / BOOTSTRAP_LOCK):
+                yield
 
-        from box_mock.models import Base, Folder  # noqa: PLC0415
 
-        Base.metadata.create_all(engine)
+def _get_engines(identity: str) -> IdentityEngines:
+    """
+    Get or create the engines and session classes for identity.
 
+    Bootstrap is single-flight: concurrent first requests for an identity
+    wait for one of them to create its engines.
+    """
+    engines = _engines.get(identity)
+    if engines is not None:
+        return engines
+
+    with _bootstrap_lock(identity):
+        engines = _engines.peek(identity)
+        if engines is not None:
+            return engines
+
+        engine, read_engine, existing = _create_engines(identity)
         session_class = sessionmaker(bind=engine)
-        session = session_class()
-        if not session.get(Folder, "0"):
-            session.add(Folder(id="0", name="All Files", parent_id=None))
-            session.commit()
-        session.close()
+        if existing:
+            from box_mock import migrations  # noqa: PLC0415
+            from box_mock.models import Folder  # noqa: PLC0415
 
-        _engines[identity] = (engine, session_class)
+            migrations.upgrade(engine)
+            session = session_class()
+            if not session.get(Folder, "0"):
+                session.add(Folder(id="0", name="All Files", parent_id=None))
+                session.commit()
+            session.close()
 
-    return _engines[identity][1]
+        read_session_class = (
+            sessionmaker(bind=read_engine) if read_engine else session_class
+        )
+        engines = IdentityEngines(
+            engine,
+            session_class,
+            read_engine,
+            read_session_class,
+        )
+        _engines.put(identity, engines)
+        return engines
+
+
+def get_session_class(identity: str) -> type[Session]:
+    """Get or create the read-write session class for identity."""
+    return _get_engines(identity).session_class
+
+
+def get_read_session_class(identity: str) -> type[Session]:
+    """
+    Get the session class for read-only work on identity.
+
+    Uses the separate read-only engine when enabled, so readers never wait on
+    the writers' connection pool; otherwise it is the read-write class.
+    """
+    return _get_engines(identity).read_session_class
+
+
+def backup_database(identity: str, target: Path) -> None:
+    """
+    Copy an identity's database to ``target``.
+
+    Uses the SQLite online backup API, so writers are not blocked, and moves
+    the copy into place atomically.
+    """
+    engine = _get_engines(identity).engine
+    target.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=target.parent, prefix=".box.db-")
+    os.close(fd)
+    destination = sqlite3.connect(tmp_name)
+    connection = engine.raw_connection()
+    try:
+        connection.driver_connection.backup(destination)
+    finally:
+        connection.close()
+        destination.close()
+    Path(tmp_name).replace(target)
+
+
+def restore_database(identity: str, source: Path) -> None:
+    """
+    Overwrite an identity's database with ``source`` using the backup API.
+
+    The restored database is migrated, as ``source`` may be a snapshot taken
+    with an older schema, and the identity's cached items are dropped.
+    """
+    from box_mock import migrations  # noqa: PLC0415
+
+    engine = _get_engines(identity).engine
+    origin = sqlite3.connect(source)
+    connection = engine.raw_connection()
+    try:
+        origin.backup(connection.driver_connection)
+    finally:
+        connection.close()
+        origin.close()
+    migrations.upgrade(engine)
+    cache.invalidate_identity(identity)
 
 
 def reset_identity_data(identity: str) -> None:
-    """Reset all data for a specific identity."""
-    if identity in _engines:
-        engine, _ = _engines[identity]
-        from box_mock.models import Base, Folder  # noqa: PLC0415
+    """
+    Reset all data for a specific identity.
 
-        Base.metadata.drop_all(engine)
-        Base.metadata.create_all(engine)
+    The database is overwritten with the template, which is much cheaper than
+    dropping and recreating every table.
+    """
+    if identity in _engines or (DATA_DIR / identity / "box.db").exists():
+        restore_database(identity, build_template())
 
-        session_class = sessionmaker(bind=engine)
-        session = session_class()
-        session.add(Folder(id="0", name="All Files", parent_id=None))
-        session.commit()
-        session.close()
+    storage.clear_files(identity)
+    shutil.rmtree(get_identity_dir(identity) / "upload_sessions", ignore_errors=True)
+
+
+def checkpoint_identity(identity: str) -> None:
+    """
+    Write an in-memory identity to DATA_DIR.
+
+    The database is copied to ``box.db`` with the SQLite online backup API and
+    blobs are mirrored into ``files/``.
+    """
+    if identity not in _memory_keepers:
+        return
+
+    db_dir = DATA_DIR / identity
+    backup_database(identity, db_dir / "box.db")
+    storage.mirror_dir(get_identity_dir(identity) / "files", db_dir / "files")
+
+
+def checkpoint_all() -> None:
+    """Checkpoint every in-memory identity to DATA_DIR."""
+    for identity in list(_memory_keepers):
+        checkpoint_identity(identity)
 
-        _engines[identity] = (engine, session_class)
 
-    files_dir = DATA_DIR / identity / "files"
-    if files_dir.exists():
-        for f in files_dir.iterdir():
-            f.unlink()
+def remove_memory_dirs() -> None:
+    """Remove the blob directories of this process's in-memory identities."""
+    for identity in list(_memory_keepers):
+        shutil.rmtree(get_identity_dir(identity), ignore_errors=True)
+
+
+def start_checkpointing() -> None:
+    """
+    Schedule in-memory checkpoints as configured.
+
+    Starts a daemon thread for periodic checkpoints and registers exit
+    handlers for a final one and, after it, for removing the identities'
+    blob directories. Safe to call more than once.
+    """
+    global _checkpointing_started  # noqa: PLW0603
+    if _checkpointing_started or not config.IN_MEMORY:
+        return
+    _checkpointing_started = True
+
+    # Exit handlers run last registered first.
+    atexit.register(remove_memory_dirs)
+    if config.CHECKPOINT_ON_EXIT:
+        atexit.register(checkpoint_all)
+
+    if config.CHECKPOINT_INTERVAL > 0:
+
+        def run() -> None:
+            while True:
+                time.sleep(config.CHECKPOINT_INTERVAL)
+                try:
+                    checkpoint_all()
+                except Exception:
+                    logger.exception("Periodic checkpoint failed")
+
+        threading.Thread(target=run, name="box-mock-checkpoint", daemon=True).start()
+
+
+def start_engine_sweeping() -> None:
+    """
+    Close idle identities' engines in the background.
+
+    The engine cache only drops idle entries when it is used, so a server
+    that goes quiet would otherwise keep every database open. Starts a daemon
+    thread sweeping the cache every ``ENGINE_SWEEP_INTERVAL`` seconds if an
+    idle limit is set. Safe to call more than once.
+    """
+    global _sweeping_started  # noqa: PLW0603
+    if _sweeping_started or not _engines.ttl:
+        return
+    _sweeping_started = True
+
+    def run() -> None:
+        while True:
+            time.sleep(ENGINE_SWEEP_INTERVAL)
+            try:
+                _engines.evict_idle()
+            except Exception:
+                logger.exception("Engine sweep failed")
+
+    threading.Thread(target=run, name="box-mock-engine-sweep", daemon=True).start()
+
+
+def engine_cache_stats() -> dict[str, int | float]:
+    """Return size, limits and hit/miss/eviction counters of the engine cache."""
+    return _engines.stats()
+
+
+def list_identities() -> list[str]:
+    """List identities with a database on disk or in memory."""
+    on_disk = (
+        {
+            identity_dir.name
+            for identity_dir in DATA_DIR.iterdir()
+            if identity_dir.is_dir() and (identity_dir / "box.db").exists()
+        }
+        if DATA_DIR.exists()
+        else set()
+    )
+    return sorted(on_disk | set(_memory_keepers))
 
 
 class DBProxy:
@@ -70,5 +461,12 @@ class DBProxy:
         """Get the current database session from flask.g."""
         return g.db_session
 
+    @property
+    def read_session(self) -> Session:
+        """Get a session for read-only work, opened on first use."""
+        if "db_read_session" not in g:
+            g.db_read_session = get_read_session_class(g.identity)()
+        return g.db_read_session
+
 
 db = DBProxy()
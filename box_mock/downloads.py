@@ -0,0 +1,151 @@
+"""
+File content responses with conditional GET and byte-range support.
+
+Full responses and single ranges are handed to the WSGI server's
+``wsgi.file_wrapper`` so production servers can use ``sendfile``; multiple
+ranges are streamed as ``multipart/byteranges`` in fixed-size chunks.
+"""
+
+from __future__ import annotations
+
+import mimetypes
+import uuid
+from typing import TYPE_CHECKING
+
+from flask import Response, current_app, request, send_file
+from werkzeug.http import parse_range_header
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+CHUNK_SIZE = 1024 * 1024
+
+
+def send_content(path: Path, download_name: str, etag: str) -> Response:
+    """Send a file honoring If-None-Match, If-Range and Range headers."""
+    size = path.stat().st_size
+    ranges = _requested_ranges(etag, size)
+
+    if ranges is None:
+        return send_file(path, download_name=download_name, etag=etag, conditional=True)
+    if request.if_none_match.contains(etag):
+        return _not_modified(etag)
+    if not ranges:
+        response = current_app.response_class(status=416)
+        response.headers["Content-Range"] = f"bytes */{size}"
+        return response
+
+    mimetype = mimetypes.guess_type(download_name)[0] or "application/octet-stream"
+    if len(ranges) == 1:
+        response = _single_range(path, ranges[0], size, mimetype)
+    else:
+        response = _multiple_ranges(path, ranges, size, mimetype)
+    response.set_etag(etag)
+    response.accept_ranges = "bytes"
+    return response
+
+
+def _requested_ranges(etag: str, size: int) -> list[tuple[int, int]] | None:
+    """
+    Return the satisfiable ``(start, stop)`` ranges of the request.
+
+    None leaves the request to werkzeug: there is no Range header, If-Range no
+    longer matches, or a single range is requested and the server has no
+    native ``wsgi.file_wrapper`` to send it with.
+    """
+    parsed = parse_range_header(request.headers.get("Range"))
+    if parsed is None or parsed.units != "bytes" or not size:
+        return None
+    if "If-Range" in request.headers and request.if_range.etag != etag:
+        return None
+    native = "wsgi.file_wrapper" in request.environ
+    if len(parsed.ranges) == 1 and not native:
+        return None
+
+    ranges = []
+    for start, stop in parsed.ranges:
+        if start < 0:
+            ranges.append((max(size + start, 0), size))
+        elif start < size:
+            ranges.append((start, size if stop is None else min(stop, size)))
+    return ranges
+
+
+def _not_modified(etag: str) -> Response:
+    """Build a 304 response for a matching If-None-Match."""
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def _single_range(
+    path: Path,
+    byte_range: tuple[int, int],
+    size: int,
+    mimetype: str,
+) -> Response:
+    """
+    Send one range through the server's file wrapper.
+
+    The file is positioned at the range start and the Content-Length bounds
+    the transfer, which lets servers such as gunicorn use ``sendfile``.
+    """
+    start, stop = byte_range
+    f = path.open("rb")
+    f.seek(start)
+    file_wrapper = request.environ["wsgi.file_wrapper"]
+    response = current_app.response_class(
+        file_wrapper(f, CHUNK_SIZE),
+        status=206,
+        mimetype=mimetype,
+        direct_passthrough=True,
+    )
+    response.content_length = stop - start
+    response.headers["Content-Range"] = f"bytes {start}-{stop - 1}/{size}"
+    return response
+
+
+def _multiple_ranges(
+    path: Path,
+    ranges: list[tuple[int, int]],
+    size: int,
+    mimetype: str,
+) -> Response:
+    """Stream several ranges as a ``multipart/byteranges`` body."""
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        (
+            f"--{boundary}\r\n"
+            f"Content-Type: {mimetype}\r\n"
+            f"Content-Range: bytes {start}-{stop - 1}/{size}\r\n\r\n"
+        ).encode()
+        for start, stop in ranges
+    ]
+    closing = f"--{boundary}--\r\n".encode()
+
+    def generate() -> Iterator[bytes]:
+        with path.open("rb") as f:
+            for header, (start, stop) in zip(part_headers, ranges):
+                yield header
+                f.seek(start)
+                remaining = stop - start
+                while remaining > 0:
+                    chunk = f.read(min(CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    remaining -= len(chunk)
+                    yield chunk
+                yield b"\r\n"
+        yield closing
+
+    response = current_app.response_class(
+        generate(),
+        status=206,
+        content_type=f"multipart/byteranges; boundary={boundary}",
+        direct_passthrough=True,
+    )
+    response.content_length = sum(
+        len(h) + stop - start + 2 for h, (start, stop) in zip(part_headers, ranges)
+    ) + len(closing)
+    return response
@@ -0,0 +1,61 @@
+"""
+Entity tags of files and folders.
+
+Files and folders have an ``etag`` counter mapped as the SQLAlchemy version
+column: every ORM update bumps it and checks the old value in its WHERE
+clause, so a write racing another one fails instead of overwriting it. Write
+routes compare it with ``If-Match`` before changing an item, and GET routes
+answer 304 when ``If-None-Match`` names it.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from flask import current_app, jsonify, request
+
+from box_mock.db import db
+
+if TYPE_CHECKING:
+    from flask import Response
+    from sqlalchemy.orm.exc import StaleDataError
+
+
+def precondition_failed() -> tuple[Response, int]:
+    """Return the error Box sends when an ``If-Match`` header does not match."""
+    return jsonify(
+        {
+            "type": "error",
+            "code": "precondition_failed",
+            "message": "The resource has been modified. Please retrieve the "
+            "resource again and retry",
+        },
+    ), 412
+
+
+def check_if_match(etag: str) -> tuple[Response, int] | None:
+    """Return a 412 response if ``If-Match`` is sent and does not name ``etag``."""
+    if request.if_match and not request.if_match.contains(etag):
+        return precondition_failed()
+    return None
+
+
+def item_response(data: dict[str, Any]) -> Response:
+    """
+    Send an item with its ETag, or 304 if ``If-None-Match`` names it.
+
+    ``data`` is a rendered file or folder, which always includes its etag.
+    """
+    etag = data["etag"]
+    if request.if_none_match.contains_weak(etag):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(data)
+    response.set_etag(etag)
+    return response
+
+
+def handle_stale_data(_: StaleDataError) -> tuple[Response, int]:
+    """Report an item changed by a concurrent request as a failed precondition."""
+    db.session.rollback()
+    return precondition_failed()
@@ -2,25 +2,28 @@
 
 from __future__ import annotations
 
-from flask import current_app, g, request
+import time
+from typing import TYPE_CHECKING
+
+from flask import g
 
 from box_mock.db import get_session_class
 from box_mock.identity import get_identity
+from box_mock.request_log import log_response
+
+if TYPE_CHECKING:
+    from flask import Response
+
+
+def start_request_timer() -> None:
+    """Before request hook noting when the request started, for its log entry."""
+    g.request_started = time.perf_counter()
 
 
-def log_request() -> None:
-    """Log incoming request details for debugging."""
-    current_app.logger.info(f"REQUEST: {request.method} {request.path}")
-    current_app.logger.info(f"Content-Type: {request.content_type}")
-    current_app.logger.info(f"Form data: {dict(request.form)}")
-    current_app.logger.info(f"Files: {list(request.files.keys())}")
-    for key in request.files:
-        f = request.files[key]
-        current_app.logger.info(
-            f"  - {key}: filename='{f.filename}', content_type='{f.content_type}'",
-        )
-    if request.is_json and request.data:
-        current_app.logger.info(f"JSON: {request.get_json()}")
+def log_request(response: Response) -> Response:
+    """After request hook logging the finished request, without reading forms."""
+    log_response(response)
+    return response
 
 
 def setup_db_session() -> None:
@@ -32,6 +35,7 @@ def setup_db_session() -> None:
 
 def teardown_db_session(exception: BaseException | None = None) -> None:  # noqa: ARG001
     """Teardown hook to cleanup session."""
-    session = g.pop("db_session", None)
-    if session:
-        session.close()
+    for key in ("db_session", "db_read_session"):
+        session = g.pop(key, None)
+        if session:
+            session.close()
@@ -0,0 +1,28 @@
+"""
+Locks shared by every server process.
+
+Worker processes share identity databases and blob directories on disk, so
+work that checks then changes those files, such as bootstrapping an identity
+or placing a blob, holds an ``flock`` on a lock file next to them. ``flock``
+locks belong to an open file, not a thread: callers serialize their own
+threads with a ``threading.Lock`` held around ``file_lock``.
+"""
+
+from __future__ import annotations
+
+import fcntl
+from contextlib import contextmanager
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """Hold an exclusive lock on ``path``, created if missing, across processes."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
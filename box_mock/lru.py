@@ -0,0 +1,136 @@
+"""Thread-safe LRU cache with size and idle-time limits."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Generic, TypeVar
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+K = TypeVar("K")
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """
+    Least-recently-used cache with optional size and idle-time limits.
+
+    A ``max_size`` or ``ttl`` of 0 disables that limit. Entries idle for longer
+    than ``ttl`` seconds are dropped lazily, on the next access to the cache,
+    or when ``evict_idle`` is called. ``on_evict`` is called for every entry
+    dropped by a limit or ``pop``.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 0,
+        ttl: float = 0,
+        on_evict: Callable[[K, V], None] | None = None,
+    ) -> None:
+        """Create an empty cache."""
+        self.max_size = max_size
+        self.ttl = ttl
+        self.on_evict = on_evict
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        self._lock = threading.RLock()
+
+    def __contains__(self, key: K) -> bool:
+        """Check for a live entry without counting a hit or miss."""
+        with self._lock:
+            self._evict_idle()
+            return key in self._entries
+
+    def __len__(self) -> int:
+        """Return the number of entries."""
+        return len(self._entries)
+
+    def keys(self) -> list[K]:
+        """Return the keys, least recently used first."""
+        with self._lock:
+            return list(self._entries)
+
+    def get(self, key: K) -> V | None:
+        """Return the value for ``key`` and mark it as recently used."""
+        with self._lock:
+            self._evict_idle()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries[key] = (entry[0], time.monotonic())
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def peek(self, key: K) -> V | None:
+        """Return the value for ``key`` without touching recency or counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[0] if entry else None
+
+    def put(self, key: K, value: V) -> None:
+        """Store ``value`` and evict the least recently used entries if full."""
+        with self._lock:
+            self._entries[key] = (value, time.monotonic())
+            self._entries.move_to_end(key)
+            while self.max_size and len(self._entries) > self.max_size:
+                self._evict(next(iter(self._entries)))
+            self._evict_idle()
+
+    def pop(self, key: K) -> V | None:
+        """Remove and return the entry for ``key``, calling ``on_evict``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._evict(key, counted=False)
+            return entry[0]
+
+    def evict_idle(self) -> None:
+        """Drop the entries that have not been used for ``ttl`` seconds."""
+        with self._lock:
+            self._evict_idle()
+
+    def clear(self) -> None:
+        """Remove all entries without calling ``on_evict``."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, int | float]:
+        """Return size, limits and hit/miss/eviction counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def _evict(self, key: K, *, counted: bool = True) -> None:
+        """Drop one entry and notify ``on_evict``."""
+        value, _ = self._entries.pop(key)
+        if counted:
+            self.evictions += 1
+        if self.on_evict is not None:
+            self.on_evict(key, value)
+
+    def _evict_idle(self) -> None:
+        """Drop entries that have not been used for ``ttl`` seconds."""
+        if not self.ttl:
+            return
+        deadline = time.monotonic() - self.ttl
+        while self._entries:
+            key, (_, last_used) = next(iter(self._entries.items()))
+            if last_used > deadline:
+                break
+            self._evict(key)
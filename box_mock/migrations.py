@@ -0,0 +1,187 @@
+"""
+Versioned schema migrations for identity databases.
+
+The schema version is kept in SQLite's ``PRAGMA user_version``. New databases
+are cloned from a template built by running every migration; databases
+created by older releases are upgraded in place when their engine is created.
+Schema objects the ORM does not model, such as full-text indexes, only exist
+in migrations.
+Migrations must be idempotent, since databases created before versioning was
+introduced report version 0 whatever their actual schema.
+"""
+
+from __future__ import annotations
+
+import logging
+from typing import TYPE_CHECKING
+
+from sqlalchemy import text
+
+from box_mock.models import Base
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from sqlalchemy import Connection, Engine
+
+logger = logging.getLogger(__name__)
+
+
+def _columns(connection: Connection, table: str) -> set[str]:
+    """Return the column names of a table."""
+    return {row[1] for row in connection.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def _add_file_sha1(connection: Connection) -> None:
+    """Add the content hash column used by the blob store."""
+    if "sha1" not in _columns(connection, "files"):
+        connection.exec_driver_sql("ALTER TABLE files ADD COLUMN sha1 VARCHAR(40)")
+    connection.exec_driver_sql(
+        "CREATE INDEX IF NOT EXISTS ix_files_sha1 ON files (sha1)",
+    )
+
+
+def _rename_duplicate_files(connection: Connection) -> None:
+    """
+    Make file names unique within each folder.
+
+    Every file but the oldest of a name gets its ID appended to its name, so
+    the unique index can be created without losing data.
+    """
+    duplicates = connection.execute(
+        text(
+            "SELECT id, name FROM files WHERE rowid NOT IN "
+            "(SELECT MIN(rowid) FROM files GROUP BY folder_id, name)",
+        ),
+    ).all()
+    for file_id, name in duplicates:
+        connection.execute(
+            text("UPDATE files SET name = :name WHERE id = :id"),
+            {"name": f"{name} ({file_id})", "id": file_id},
+        )
+    if duplicates:
+        logger.warning("Renamed %d files with duplicate names", len(duplicates))
+
+
+def _add_lookup_indexes(connection: Connection) -> None:
+    """Index name lookups, folder listings and upload parts."""
+    _rename_duplicate_files(connection)
+    for statement in (
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_files_folder_id_name "
+        "ON files (folder_id, name)",
+        "CREATE INDEX IF NOT EXISTS ix_folders_parent_id_name "
+        "ON folders (parent_id, name)",
+        "CREATE INDEX IF NOT EXISTS ix_users_email ON users (email)",
+        "CREATE INDEX IF NOT EXISTS ix_users_login ON users (login)",
+        "DELETE FROM upload_parts WHERE rowid NOT IN "
+        "(SELECT MAX(rowid) FROM upload_parts GROUP BY session_id, offset)",
+        "CREATE UNIQUE INDEX IF NOT EXISTS ix_upload_parts_session_id_offset "
+        "ON upload_parts (session_id, offset)",
+    ):
+        connection.exec_driver_sql(statement)
+
+
+def _search_index_statements(
+    table: str,
+    columns: tuple[str, ...] = ("name",),
+    options: str = "prefix='2 3', tokenize='unicode61 remove_diacritics 2'",
+) -> list[str]:
+    """Return the DDL of an FTS5 index over ``columns`` of ``table``."""
+    fts = f"{table}_fts"
+    names = ", ".join(columns)
+    old_values = ", ".join(f"old.{c}" for c in columns)
+    new_values = ", ".join(f"new.{c}" for c in columns)
+    delete = (
+        f"INSERT INTO {fts}({fts}, rowid, {names}) "
+        f"VALUES ('delete', old.rowid, {old_values})"
+    )
+    insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.rowid, {new_values})"
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, "
+        f"content='{table}', content_rowid='rowid', {options})",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {table} "
+        f"BEGIN {insert}; END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {table} "
+        f"BEGIN {delete}; END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_rename AFTER UPDATE OF {names} "
+        f"ON {table} BEGIN {delete}; {insert}; END",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    ]
+
+
+def _add_search_index(connection: Connection) -> None:
+    """
+    Index file and folder names for search.
+
+    The FTS5 tables use the item tables as external content, keyed by rowid,
+    and triggers keep them in sync with inserts, renames and deletes.
+    """
+    for table in ("files", "folders"):
+        for statement in _search_index_statements(table):
+            connection.exec_driver_sql(statement)
+
+
+def _add_user_search_index(connection: Connection) -> None:
+    """
+    Index user names, emails and logins for substring lookups.
+
+    The trigram tokenizer lets ``filter_term`` match anywhere in a value, as
+    the ``ilike('%term%')`` filters it replaces did.
+    """
+    for statement in _search_index_statements(
+        "users",
+        ("name", "email", "login"),
+        "tokenize='trigram'",
+    ):
+        connection.exec_driver_sql(statement)
+
+
+def _add_etags(connection: Connection) -> None:
+    """Add the etag counters of files and folders, starting existing items at 0."""
+    for table in ("files", "folders"):
+        if "etag" not in _columns(connection, table):
+            connection.exec_driver_sql(
+                f"ALTER TABLE {table} ADD COLUMN etag INTEGER NOT NULL DEFAULT 0",
+            )
+
+
+# Migration N upgrades a database from version N - 1 to version N.
+MIGRATIONS: list[Callable[[Connection], None]] = [
+    _add_file_sha1,
+    _add_lookup_indexes,
+    _add_search_index,
+    _add_user_search_index,
+    _add_etags,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def get_version(connection: Connection) -> int:
+    """Return the schema version of a database."""
+    return connection.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+def set_version(connection: Connection, version: int = SCHEMA_VERSION) -> None:
+    """Record the schema version of a database."""
+    connection.exec_driver_sql(f"PRAGMA user_version = {int(version)}")
+
+
+def upgrade(engine: Engine) -> int:
+    """
+    Bring a database up to ``SCHEMA_VERSION``.
+
+    Tables added since the database was created are created first, then every
+    pending migration runs in order and the new version is recorded last, so
+    an interrupted upgrade is retried. Returns the version the database had.
+    """
+    with engine.begin() as connection:
+        version = get_version(connection)
+        if version >= SCHEMA_VERSION:
+            return version
+        Base.metadata.create_all(connection)
+        for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+            logger.info("Applying migration %d: %s", number, migration.__name__)
+            migration(connection)
+        set_version(connection)
+    return version
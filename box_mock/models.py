@@ -4,24 +4,57 @@ from __future__ import annotations
 
 import json
 import uuid
-from datetime import datetime
-from typing import TYPE_CHECKING, Any
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, ClassVar
 
-from sqlalchemy import Boolean, Column, DateTime, ForeignKey, Integer, String, Text
+from sqlalchemy import (
+    Boolean,
+    Column,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+)
 from sqlalchemy.orm import DeclarativeBase, relationship
 
+from box_mock.serialization import (
+    Field,
+    Serializable,
+    column,
+    constant,
+    etag_field,
+    folder_reference,
+)
+
 if TYPE_CHECKING:
     from sqlalchemy.orm import Session
 
+UPLOAD_SESSION_TTL = timedelta(days=7)
+
 
 class Base(DeclarativeBase):
     """Base class for all models."""
 
 
-class User(Base):
+def next_etag(etag: int | None) -> int:
+    """Return the etag of a new item (0) or of an item being updated."""
+    return 0 if etag is None else etag + 1
+
+
+# Rendered with every file and folder, whatever fields are requested, as Box does.
+ITEM_REQUIRED_FIELDS = frozenset({"type", "id", "etag"})
+
+
+class User(Serializable, Base):
     """Box app user."""
 
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_email", "email"),
+        Index("ix_users_login", "login"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     name = Column(String(255), nullable=False)
@@ -31,30 +64,35 @@ class User(Base):
     job_title = Column(String(255), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    def to_dict(self) -> dict[str, Any]:
-        """Convert user to dictionary representation."""
-        return {
-            "type": "user",
-            "id": self.id,
-            "name": self.name,
-            "login": self.login,
-            "email": self.email,
-            "is_platform_access_only": self.is_platform_access_only,
-            "job_title": self.job_title,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-        }
+    FIELDS: ClassVar[dict[str, Field]] = {
+        "type": constant("user"),
+        "id": column("id"),
+        "name": column("name"),
+        "login": column("login"),
+        "email": column("email"),
+        "is_platform_access_only": column("is_platform_access_only"),
+        "job_title": column("job_title"),
+        "created_at": column("created_at"),
+    }
 
 
-class Folder(Base):
+class Folder(Serializable, Base):
     """Box folder. Root folder has id='0' and parent_id=None."""
 
     __tablename__ = "folders"
+    __table_args__ = (Index("ix_folders_parent_id_name", "parent_id", "name"),)
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     parent_id = Column(String(36), ForeignKey("folders.id"), nullable=True)
     name = Column(String(255), nullable=False)
+    etag = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __mapper_args__: ClassVar[dict[str, Any]] = {
+        "version_id_col": etag,
+        "version_id_generator": next_etag,
+    }
+
     parent = relationship(
         "Folder",
         remote_side=[id],
@@ -70,50 +108,130 @@ class Folder(Base):
         cascade="all, delete-orphan",
     )
 
-    def to_dict(self) -> dict[str, Any]:
-        """Convert folder to dictionary representation."""
-        return {
-            "type": "folder",
-            "id": self.id,
-            "name": self.name,
-            "parent": {"type": "folder", "id": self.parent_id}
-            if self.parent_id
-            else None,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-        }
+    REQUIRED_FIELDS = ITEM_REQUIRED_FIELDS
+    FIELDS: ClassVar[dict[str, Field]] = {
+        "type": constant("folder"),
+        "id": column("id"),
+        "etag": etag_field(),
+        "name": column("name"),
+        "parent": folder_reference("parent_id"),
+        "created_at": column("created_at"),
+    }
 
 
-class File(Base):
-    """Box file. Content stored on filesystem at data/{identity}/files/{id}."""
+class File(Serializable, Base):
+    """Box file. Content stored on filesystem at data/{identity}/files/{sha1}."""
 
     __tablename__ = "files"
+    __table_args__ = (
+        Index("ix_files_folder_id_name", "folder_id", "name", unique=True),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     folder_id = Column(String(36), ForeignKey("folders.id"), nullable=False)
     name = Column(String(255), nullable=False)
     version = Column(Integer, default=1)
     size = Column(Integer, default=0)
+    sha1 = Column(String(40), nullable=True, index=True)
+    etag = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=datetime.utcnow)
 
+    __mapper_args__: ClassVar[dict[str, Any]] = {
+        "version_id_col": etag,
+        "version_id_generator": next_etag,
+    }
+
     folder = relationship("Folder", back_populates="files")
 
+    REQUIRED_FIELDS = ITEM_REQUIRED_FIELDS
+    FIELDS: ClassVar[dict[str, Field]] = {
+        "type": constant("file"),
+        "id": column("id"),
+        "etag": etag_field(),
+        "name": column("name"),
+        "size": column("size"),
+        "sha1": column("sha1"),
+        "parent": folder_reference("folder_id"),
+        "file_version": Field(
+            lambda file: {
+                "id": f"{file.id}_v{file.version}",
+                "version_number": file.version,
+            },
+            ("id", "version"),
+        ),
+        "created_at": column("created_at"),
+    }
+
+
+class UploadSession(Base):
+    """Chunked upload session. Parts are stored at data/{identity}/upload_sessions."""
+
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(36), primary_key=True, default=lambda: uuid.uuid4().hex)
+    folder_id = Column(String(36), nullable=True)
+    file_id = Column(String(36), nullable=True)
+    file_name = Column(String(255), nullable=True)
+    file_size = Column(Integer, nullable=False)
+    part_size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    parts = relationship(
+        "UploadPart",
+        back_populates="session",
+        cascade="all, delete-orphan",
+        order_by="UploadPart.offset",
+    )
+
+    @property
+    def total_parts(self) -> int:
+        """Number of parts needed to upload the whole file."""
+        return max(1, -(-self.file_size // self.part_size))
+
     def to_dict(self) -> dict[str, Any]:
-        """Convert file to dictionary representation."""
+        """Convert upload session to dictionary representation."""
+        expires_at = self.created_at + UPLOAD_SESSION_TTL if self.created_at else None
         return {
-            "type": "file",
+            "type": "upload_session",
             "id": self.id,
-            "name": self.name,
+            "session_expires_at": expires_at.isoformat() if expires_at else None,
+            "part_size": self.part_size,
+            "total_parts": self.total_parts,
+            "num_parts_processed": len(self.parts),
+        }
+
+
+class UploadPart(Base):
+    """Uploaded part of a chunked upload session."""
+
+    __tablename__ = "upload_parts"
+    __table_args__ = (
+        Index("ix_upload_parts_session_id_offset", "session_id", "offset", unique=True),
+    )
+
+    part_id = Column(
+        String(8),
+        primary_key=True,
+        default=lambda: uuid.uuid4().hex[:8].upper(),
+    )
+    session_id = Column(String(36), ForeignKey("upload_sessions.id"), nullable=False)
+    offset = Column(Integer, nullable=False)
+    size = Column(Integer, nullable=False)
+    sha1 = Column(String(40), nullable=False)
+
+    session = relationship("UploadSession", back_populates="parts")
+
+    def to_dict(self) -> dict[str, Any]:
+        """Convert upload part to dictionary representation."""
+        return {
+            "part_id": self.part_id,
+            "offset": self.offset,
             "size": self.size,
-            "parent": {"type": "folder", "id": self.folder_id},
-            "file_version": {
-                "id": f"{self.id}_v{self.version}",
-                "version_number": self.version,
-            },
-            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "sha1": self.sha1,
         }
 
 
-class SignRequest(Base):
+class SignRequest(Serializable, Base):
     """Box Sign request. Stores signers/files as JSON for simplicity."""
 
     __tablename__ = "sign_requests"
@@ -126,21 +244,21 @@ class SignRequest(Base):
     files_json = Column(Text, nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    def to_dict(self) -> dict[str, Any]:
-        """Convert sign request to dictionary representation."""
-        signers = json.loads(self.signers_json) if self.signers_json else []
-        files = json.loads(self.files_json) if self.files_json else []
-        return {
-            "type": "sign-request",
-            "id": self.id,
-            "status": self.status,
-            "signers": signers,
-            "sign_files": {"files": files},
-            "parent_folder": {"type": "folder", "id": self.parent_folder_id}
-            if self.parent_folder_id
-            else None,
-            "created_at": self.created_at.isoformat() if self.created_at else None,
-        }
+    FIELDS: ClassVar[dict[str, Field]] = {
+        "type": constant("sign-request"),
+        "id": column("id"),
+        "status": column("status"),
+        "signers": Field(
+            lambda sign_request: json.loads(sign_request.signers_json or "[]"),
+            ("signers_json",),
+        ),
+        "sign_files": Field(
+            lambda sign_request: {"files": json.loads(sign_request.files_json or "[]")},
+            ("files_json",),
+        ),
+        "parent_folder": folder_reference("parent_folder_id"),
+        "created_at": column("created_at"),
+    }
 
 
 def get_session() -> Session:
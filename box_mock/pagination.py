@@ -0,0 +1,147 @@
+"""
+Box-style pagination for list endpoints.
+
+Offset pagination pages with ``offset`` and ``limit`` and reports a
+``total_count``. Marker pagination (``usemarker=true``) uses keyset paging:
+the opaque ``next_marker`` holds the sort key of the last entry, so each page
+seeks straight to its first row however deep into the listing it is.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import json
+import operator
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from flask import request
+from sqlalchemy import DateTime, and_, or_
+
+if TYPE_CHECKING:
+    from collections.abc import Collection, Sequence
+
+    from sqlalchemy import ColumnElement
+
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+
+class PaginationError(ValueError):
+    """Invalid paging parameters."""
+
+
+class Page(NamedTuple):
+    """Paging parameters of a list request."""
+
+    offset: int
+    limit: int
+    use_marker: bool
+    marker: dict[str, Any] | None
+    sort: str
+    descending: bool
+
+    def order(self) -> list[dict[str, str]]:
+        """Describe the sort order the way Box responses do."""
+        return [{"by": self.sort, "direction": "DESC" if self.descending else "ASC"}]
+
+
+def parse_page(sorts: Collection[str], default_sort: str) -> Page:
+    """Read the paging parameters of the current request."""
+    use_marker = request.args.get("usemarker", "").lower() == "true"
+    offset = request.args.get("offset", 0, type=int)
+    limit = request.args.get("limit", DEFAULT_LIMIT, type=int)
+    sort = request.args.get("sort", default_sort)
+    direction = request.args.get("direction", "ASC").upper()
+    if offset < 0 or limit < 1:
+        msg = "offset must be non-negative and limit positive"
+        raise PaginationError(msg)
+    if sort not in sorts:
+        msg = f"sort must be one of: {', '.join(sorted(sorts))}"
+        raise PaginationError(msg)
+    if direction not in {"ASC", "DESC"}:
+        msg = "direction must be ASC or DESC"
+        raise PaginationError(msg)
+
+    marker = request.args.get("marker")
+    return Page(
+        offset=0 if use_marker else offset,
+        limit=min(limit, MAX_LIMIT),
+        use_marker=use_marker,
+        marker=decode_marker(marker) if use_marker and marker else None,
+        sort=sort,
+        descending=direction == "DESC",
+    )
+
+
+def encode_marker(data: dict[str, Any]) -> str:
+    """Encode a position in a listing as an opaque marker."""
+    raw = json.dumps(data, default=datetime.isoformat, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_marker(marker: str) -> dict[str, Any]:
+    """Decode a marker made by ``encode_marker``."""
+    try:
+        data = json.loads(base64.urlsafe_b64decode(marker + "=" * (-len(marker) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        msg = "Invalid marker"
+        raise PaginationError(msg) from e
+    if not isinstance(data, dict):
+        msg = "Invalid marker"
+        raise PaginationError(msg)
+    return data
+
+
+def order_by(
+    columns: Sequence[ColumnElement],
+    *,
+    descending: bool,
+) -> list[ColumnElement]:
+    """Return ORDER BY clauses sorting by ``columns`` in one direction."""
+    return [column.desc() if descending else column.asc() for column in columns]
+
+
+def _marker_value(column: ColumnElement, value: object) -> object:
+    """Convert a marker value to a value of ``column``."""
+    if isinstance(column.type, DateTime):
+        return datetime.fromisoformat(value)
+    if value is not None and not isinstance(value, (str, int, float)):
+        msg = f"Unexpected marker value: {value!r}"
+        raise TypeError(msg)
+    return value
+
+
+def after(
+    columns: Sequence[ColumnElement],
+    values: Sequence[Any],
+    *,
+    descending: bool,
+) -> ColumnElement[bool]:
+    """
+    Select the rows sorting after ``values`` in the order of ``columns``.
+
+    ``values`` come from a marker, so datetimes arrive as ISO strings. Raises
+    ``PaginationError`` if they do not fit ``columns``.
+    """
+    if not isinstance(values, list) or len(values) != len(columns):
+        msg = "Invalid marker"
+        raise PaginationError(msg)
+    try:
+        values = [
+            _marker_value(column, value) for column, value in zip(columns, values)
+        ]
+    except (TypeError, ValueError) as e:
+        msg = "Invalid marker"
+        raise PaginationError(msg) from e
+    compare = operator.lt if descending else operator.gt
+    return or_(
+        *(
+            and_(
+                *(column == value for column, value in zip(columns[:i], values[:i])),
+                compare(columns[i], values[i]),
+            )
+            for i in range(len(columns))
+        ),
+    )
@@ -0,0 +1,177 @@
+"""
+Structured, sampled request logging.
+
+Each request is logged once, after its response is built, as a JSON line
+with its method, path, endpoint, identity, status and duration. Records of
+the ``box_mock`` loggers go through a queue to a background thread that
+formats and writes them, so requests never wait on the log stream.
+
+Every route has a level and a sample rate, defaulting to ``LOG_LEVEL`` and
+``LOG_SAMPLE_RATE``; errors are logged whatever the sampling. Logging only
+reads request headers: bodies are logged when ``LOG_BODIES`` is on, capped at
+``LOG_BODY_LIMIT`` bytes, and only for JSON and text requests; of a body the
+route left unread, no more than that is read. Forms and uploads are never
+parsed.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from http import HTTPStatus
+from logging.handlers import QueueHandler, QueueListener
+from typing import TYPE_CHECKING, Any, NamedTuple
+
+from flask import g, request
+
+from box_mock import config
+
+if TYPE_CHECKING:
+    from typing import TextIO
+
+    from flask import Response
+
+logger = logging.getLogger("box_mock.requests")
+
+
+class RoutePolicy(NamedTuple):
+    """Lowest level logged for a route and the fraction of requests sampled."""
+
+    level: int
+    sample_rate: float
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as JSON lines, with the request fields of request logs."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        """Render a record as one line of JSON."""
+        entry: dict[str, Any] = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        entry.update(getattr(record, "request", {}))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_default_policy = RoutePolicy(logging.INFO, 1.0)
+_route_policies: dict[str, RoutePolicy] = {}
+_listener: QueueListener | None = None
+
+
+def _level(name: str) -> int:
+    """Return the number of a level name such as "INFO"."""
+    level = logging.getLevelName(name.strip().upper())
+    if not isinstance(level, int):
+        msg = f"Unknown log level: {name}"
+        raise ValueError(msg)  # noqa: TRY004 - invalid setting value
+    return level
+
+
+def parse_route_policies(spec: str, default: RoutePolicy) -> dict[str, RoutePolicy]:
+    """Parse "endpoint=LEVEL[:rate]" pairs separated by commas."""
+    policies = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        endpoint, _, setting = item.partition("=")
+        level, _, rate = setting.partition(":")
+        policies[endpoint.strip()] = RoutePolicy(
+            _level(level) if level else default.level,
+            float(rate) if rate else default.sample_rate,
+        )
+    return policies
+
+
+def configure_request_log(stream: TextIO | None = None) -> None:
+    """
+    Apply the configured levels and sampling, and start the log writer.
+
+    The writer thread is started once per process and writes to ``stream``,
+    standard error by default; it is flushed and stopped at exit.
+    """
+    global _default_policy, _route_policies, _listener  # noqa: PLW0603
+    _default_policy = RoutePolicy(_level(config.LOG_LEVEL), config.LOG_SAMPLE_RATE)
+    _route_policies = parse_route_policies(config.LOG_ROUTES, _default_policy)
+
+    package_logger = logging.getLogger("box_mock")
+    package_logger.setLevel(_default_policy.level)
+    # Request records are filtered by their route's policy instead.
+    logger.setLevel(logging.DEBUG)
+    if _listener is None:
+        handler = logging.StreamHandler(stream or sys.stderr)
+        handler.setFormatter(JSONFormatter())
+        records: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+        package_logger.addHandler(QueueHandler(records))
+        package_logger.propagate = False
+        _listener = QueueListener(records, handler)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+
+def route_policy(endpoint: str | None) -> RoutePolicy:
+    """Return the logging policy of a route."""
+    return _route_policies.get(endpoint or "", _default_policy)
+
+
+def _body() -> str | None:
+    """Return the start of a JSON or text request body, if bodies are logged."""
+    if not config.LOG_BODIES or not request.content_length:
+        return None
+    if not (request.is_json or request.mimetype.startswith("text/")):
+        return None
+    # The body the route read, as cached by ``get_data``.
+    data = getattr(request, "_cached_data", None)
+    if data is None:
+        # The route left it unread: read no more than is logged.
+        data = request.stream.read(config.LOG_BODY_LIMIT)
+    return data[: config.LOG_BODY_LIMIT].decode(errors="replace")
+
+
+def log_response(response: Response) -> None:
+    """Log a finished request if its route's level and sampling allow it."""
+    status = response.status_code
+    if status >= HTTPStatus.INTERNAL_SERVER_ERROR:
+        level = logging.ERROR
+    elif status >= HTTPStatus.BAD_REQUEST:
+        level = logging.WARNING
+    else:
+        level = logging.INFO
+    policy = route_policy(request.endpoint)
+    if level < policy.level:
+        return
+    if level < logging.WARNING and random.random() >= policy.sample_rate:
+        return
+
+    fields: dict[str, Any] = {
+        "method": request.method,
+        "path": request.path,
+        "endpoint": request.endpoint,
+        "identity": g.get("identity"),
+        "status": status,
+        "content_type": request.content_type,
+        "content_length": request.content_length,
+    }
+    if "request_started" in g:
+        fields["duration_ms"] = round(
+            (time.perf_counter() - g.request_started) * 1000,
+            3,
+        )
+    body = _body()
+    if body is not None:
+        fields["body"] = body
+    logger.log(
+        level,
+        "%s %s %s",
+        request.method,
+        request.path,
+        status,
+        extra={"request": fields},
+    )
@@ -2,86 +2,149 @@
 
 from __future__ import annotations
 
+import functools
 import json
+from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Any
 
 from flask import (
     Blueprint,
     Response,
+    current_app,
     g,
     jsonify,
     redirect,
-    render_template_string,
+    render_template,
     request,
 )
+from sqlalchemy import func, literal, select
 
-from box_mock.db import DATA_DIR, get_session_class, reset_identity_data
-from box_mock.models import Folder, SignRequest, User
+from box_mock.cache import item_cache_stats
+from box_mock.db import (
+    engine_cache_stats,
+    get_read_session_class,
+    list_identities,
+    reset_identity_data,
+)
+from box_mock.export import stream_export
+from box_mock.models import File, Folder, SignRequest, User
+from box_mock.seed import SeedError, seed_identity
+from box_mock.snapshots import (
+    SNAPSHOT_NAME,
+    create_snapshot,
+    list_snapshots,
+    restore_snapshot,
+)
 
 if TYPE_CHECKING:
+    from jinja2 import Environment, Template
     from sqlalchemy.orm import Session
 
 admin_bp = Blueprint("admin", __name__)
 
-BROWSE_TEMPLATE = """
-<!DOCTYPE html>
-<html>
-<head>
-<title>Box Mock Browser</title>
+# Identities listed per index page.
+BROWSE_PAGE_SIZE = 200
+# Folder levels below the root shown by default, and at most.
+BROWSE_DEPTH = 3
+MAX_BROWSE_DEPTH = 50
+# Rows shown per identity page; larger trees are cut off.
+BROWSE_FOLDER_LIMIT = 500
+BROWSE_FILE_LIMIT = 1000
+BROWSE_LIST_LIMIT = 100
+
+BROWSE_STYLE = """
 <style>
   body { font-family: sans-serif; margin: 20px; }
   .identity-section { border: 1px solid #ccc; margin: 10px 0; padding: 15px; border-radius: 5px; }
   .identity-header { background: #f0f0f0; margin: -15px -15px 15px -15px; padding: 10px 15px; border-radius: 5px 5px 0 0; }
   .identity-header h2 { margin: 0; display: inline; }
-  .folder-tree { margin-left: 20px; }
   h3 { margin-top: 15px; margin-bottom: 5px; }
 </style>
+"""  # noqa: E501
+
+BROWSE_INDEX_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+<title>Box Mock Browser</title>
+{{ style|safe }}
 </head>
 <body>
 <h1>Box Mock Browser</h1>
-<p><a href="/_browse">Refresh</a></p>
-
-{% macro render_folder(folder, indent=0) %}
-<div style="margin-left: {{ indent * 20 }}px">
-  <b>📁 {{ folder.name }}</b> <small>({{ folder.id }})</small>
-  {% for file in folder.files %}
-  <div style="margin-left: 20px">📄 {{ file.name }} <small>({{ file.id }}, {{ file.size }} bytes)</small></div>
-  {% endfor %}
-  {% for child in folder.children %}
-  {{ render_folder(child, indent + 1) }}
-  {% endfor %}
-</div>
-{% endmacro %}
+<p><a href="/_browse">Refresh</a> &middot; {{ total }} identities</p>
 
-{% if identities %}
-{% for ident in identities %}
+{% for identity in identities %}
 <div class="identity-section">
   <div class="identity-header">
-    <h2>📦 {{ ident.name }}</h2>
+    <h2>📦 <a href="/_browse/{{ identity|urlencode }}">{{ identity }}</a></h2>
     <form style="display:inline; float:right" method="POST" action="/_reset">
-      <input type="hidden" name="identity" value="{{ ident.name }}">
+      <input type="hidden" name="identity" value="{{ identity }}">
       <button type="submit">Reset</button>
     </form>
   </div>
-  
+</div>
+{% else %}
+<p>No identities found. Make a request with an Authorization header to create one.</p>
+{% endfor %}
+
+{% if offset > 0 %}
+<a href="/_browse?offset={{ [offset - limit, 0]|max }}">Previous</a>
+{% endif %}
+{% if offset + limit < total %}
+<a href="/_browse?offset={{ offset + limit }}">Next</a>
+{% endif %}
+</body>
+</html>
+"""
+
+BROWSE_IDENTITY_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+<title>Box Mock Browser - {{ identity }}</title>
+{{ style|safe }}
+</head>
+<body>
+<h1>Box Mock Browser</h1>
+<p><a href="/_browse">All identities</a></p>
+
+<div class="identity-section">
+  <div class="identity-header"><h2>📦 {{ identity }}</h2></div>
+
   <h3>Folders & Files</h3>
-  {{ render_folder(ident.tree) }}
-  
-  <h3>Users ({{ ident.users|length }})</h3>
-  {% if ident.users %}
+  {% for row in tree %}
+  <div style="margin-left: {{ row.depth * 20 }}px">
+    {% if row.type == "folder" %}
+    <b>📁 <a href="?root={{ row.id|urlencode }}&depth={{ depth }}">
+      {{- row.name }}</a></b> <small>({{ row.id }})</small>
+    {% else %}
+    📄 {{ row.name }} <small>({{ row.id }}, {{ row.size }} bytes)</small>
+    {% endif %}
+  </div>
+  {% else %}
+  <p><em>Folder not found</em></p>
+  {% endfor %}
+  <p><small>
+    Showing {{ depth }} levels below {{ root }}{% if truncated %}, cut off at
+    {{ folder_limit }} folders and {{ file_limit }} files{% endif %}.
+    <a href="?root={{ root|urlencode }}&depth={{ depth + 1 }}">Show more levels</a>
+  </small></p>
+
+  <h3>Users ({{ user_count }})</h3>
+  {% if users %}
   <ul>
-  {% for user in ident.users %}
+  {% for user in users %}
     <li>👤 <b>{{ user.name }}</b> ({{ user.id }}) - {{ user.email or 'no email' }}</li>
   {% endfor %}
   </ul>
   {% else %}
   <p><em>No users</em></p>
   {% endif %}
-  
-  <h3>Sign Requests ({{ ident.sign_requests|length }})</h3>
-  {% if ident.sign_requests %}
+
+  <h3>Sign Requests ({{ sign_request_count }})</h3>
+  {% if sign_requests %}
   <ul>
-  {% for sr in ident.sign_requests %}
+  {% for sr in sign_requests %}
     <li>✍️ <b>{{ sr.id }}</b> - Status: {{ sr.status }}
     {% if sr.signers %}
     <ul>
@@ -97,85 +160,192 @@ BROWSE_TEMPLATE = """
   <p><em>No sign requests</em></p>
   {% endif %}
 </div>
-{% endfor %}
-{% else %}
-<p>No identities found. Make a request with an Authorization header to create one.</p>
-{% endif %}
 </body>
 </html>
-"""  # noqa
+"""
 
 
-def _get_tree(session: Session, folder: Folder) -> dict[str, Any]:
-    """Recursively build folder tree structure."""
-    return {
-        "id": folder.id,
-        "name": folder.name,
-        "files": [{"id": f.id, "name": f.name, "size": f.size} for f in folder.files],
-        "children": [_get_tree(session, child) for child in folder.children],
-    }
+@functools.lru_cache(maxsize=16)
+def _compile(environment: Environment, source: str) -> Template:
+    """Compile a template once per Jinja environment."""
+    return environment.from_string(source)
 
 
-def _get_identity_data(identity: str) -> dict[str, Any]:
-    """Get all data for a specific identity."""
-    session_class = get_session_class(identity)
-    session = session_class()
+def _render(source: str, **context: Any) -> str:  # noqa: ANN401
+    """Render a template compiled on first use."""
+    template = _compile(current_app.jinja_env, source)
+    return render_template(template, style=BROWSE_STYLE, **context)
 
-    try:
-        root = session.get(Folder, "0")
-        tree = (
-            _get_tree(session, root)
-            if root
-            else {"id": "0", "name": "Empty", "files": [], "children": []}
-        )
 
-        users = [
-            {"id": u.id, "name": u.name, "email": u.email}
-            for u in session.query(User).all()
-        ]
+def _get_tree(
+    session: Session,
+    root_id: str,
+    depth: int,
+) -> tuple[list[dict[str, Any]], bool]:
+    """
+    Flatten a folder tree into rows in display order, for the browse page.
+
+    Folders down to ``depth`` levels below the root are read with a single
+    recursive query, shallowest first, and their files with one more query;
+    both are capped. Returns the rows and whether any were cut off.
+    """
+    tree = (
+        select(Folder.id, Folder.parent_id, Folder.name, literal(0).label("depth"))
+        .where(Folder.id == root_id)
+        .cte("tree", recursive=True)
+    )
+    tree = tree.union_all(
+        select(Folder.id, Folder.parent_id, Folder.name, tree.c.depth + 1)
+        .join(tree, Folder.parent_id == tree.c.id)
+        .where(tree.c.depth < depth),
+    )
+    folders = session.execute(
+        select(tree)
+        .order_by(tree.c.depth, tree.c.name, tree.c.id)
+        .limit(BROWSE_FOLDER_LIMIT + 1),
+    ).all()
+    # Files are capped in the order of their folders, so the files of the
+    # shallowest folders are kept. A folder on a parent cycle is reached at
+    # several depths; the first one counts.
+    levels = (
+        select(tree.c.id, tree.c.name, func.min(tree.c.depth).label("depth"))
+        .group_by(tree.c.id, tree.c.name)
+        .subquery()
+    )
+    files = session.execute(
+        select(File.id, File.folder_id, File.name, File.size)
+        .join(levels, File.folder_id == levels.c.id)
+        .where(File.folder_id.in_([row.id for row in folders[:BROWSE_FOLDER_LIMIT]]))
+        .order_by(levels.c.depth, levels.c.name, levels.c.id, File.name)
+        .limit(BROWSE_FILE_LIMIT + 1),
+    ).all()
+    truncated = len(folders) > BROWSE_FOLDER_LIMIT or len(files) > BROWSE_FILE_LIMIT
 
-        sign_requests = []
-        for sr in session.query(SignRequest).all():
-            signers = json.loads(sr.signers_json) if sr.signers_json else []
-            sign_requests.append({"id": sr.id, "status": sr.status, "signers": signers})
+    children: dict[str | None, list[Any]] = {}
+    for row in folders[:BROWSE_FOLDER_LIMIT]:
+        children.setdefault(row.parent_id, []).append(row)
+    folder_files: dict[str, list[Any]] = {}
+    for row in files[:BROWSE_FILE_LIMIT]:
+        folder_files.setdefault(row.folder_id, []).append(row)
 
-        return {
-            "name": identity,
-            "tree": tree,
-            "users": users,
-            "sign_requests": sign_requests,
-        }
-    finally:
-        session.close()
+    rows: list[dict[str, Any]] = []
+    # The depth limit ends the query on a parent cycle; this ends the walk.
+    seen: set[str] = set()
+    pending = [(row, 0) for row in folders[:1]]
+    while pending:
+        folder, level = pending.pop()
+        if folder.id in seen:
+            continue
+        seen.add(folder.id)
+        rows.append(
+            {"type": "folder", "id": folder.id, "name": folder.name, "depth": level}
+        )
+        rows.extend(
+            {
+                "type": "file",
+                "id": f.id,
+                "name": f.name,
+                "size": f.size,
+                "depth": level + 1,
+            }
+            for f in folder_files.get(folder.id, [])
+        )
+        pending.extend(
+            (child, level + 1) for child in reversed(children.get(folder.id, []))
+        )
+    return rows, truncated
 
 
 @admin_bp.route("/_browse")
 def browse() -> str:
     """
-    Render HTML view of all identities with their folders, files,
-    and sign requests.
+    Render the index of identities, a page at a time.
+
+    Identities are listed from the data directory without opening their
+    databases; each links to its own page.
     """
-    identities = (
-        [
-            _get_identity_data(identity_dir.name)
-            for identity_dir in sorted(DATA_DIR.iterdir())
-            if identity_dir.is_dir() and (identity_dir / "box.db").exists()
+    identities = list_identities()
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    return _render(
+        BROWSE_INDEX_TEMPLATE,
+        identities=identities[offset : offset + BROWSE_PAGE_SIZE],
+        total=len(identities),
+        offset=offset,
+        limit=BROWSE_PAGE_SIZE,
+    )
+
+
+@admin_bp.route("/_browse/<identity>")
+def browse_identity(identity: str) -> str | tuple[str, int]:
+    """
+    Render one identity's folders, files, users and sign requests.
+
+    ``root`` picks the folder the tree starts at and ``depth`` how many levels
+    below it are shown; only this identity's database is opened.
+    """
+    if identity not in list_identities():
+        return "Identity not found", 404
+    root = request.args.get("root", "0")
+    depth = min(
+        max(request.args.get("depth", BROWSE_DEPTH, type=int), 0), MAX_BROWSE_DEPTH
+    )
+
+    with get_read_session_class(identity)() as session:
+        tree, truncated = _get_tree(session, root, depth)
+        users = session.execute(
+            select(User.id, User.name, User.email)
+            .order_by(User.name)
+            .limit(BROWSE_LIST_LIMIT),
+        ).all()
+        user_count = session.scalar(select(func.count()).select_from(User))
+        sign_requests = [
+            {
+                "id": sr.id,
+                "status": sr.status,
+                "signers": json.loads(sr.signers_json or "[]"),
+            }
+            for sr in session.scalars(
+                select(SignRequest)
+                .order_by(SignRequest.created_at)
+                .limit(BROWSE_LIST_LIMIT),
+            )
         ]
-        if DATA_DIR.exists()
-        else []
+        sign_request_count = session.scalar(
+            select(func.count()).select_from(SignRequest)
+        )
+
+    return _render(
+        BROWSE_IDENTITY_TEMPLATE,
+        identity=identity,
+        root=root,
+        depth=depth,
+        tree=tree,
+        truncated=truncated,
+        folder_limit=BROWSE_FOLDER_LIMIT,
+        file_limit=BROWSE_FILE_LIMIT,
+        users=users,
+        user_count=user_count,
+        sign_requests=sign_requests,
+        sign_request_count=sign_request_count,
     )
 
-    return render_template_string(BROWSE_TEMPLATE, identities=identities)
+
+def _request_data() -> dict[str, Any]:
+    """Get admin request parameters from a JSON body or form."""
+    if request.is_json:
+        return request.get_json() or {}
+    return request.form.to_dict()
+
+
+def _target_identity(data: dict[str, Any]) -> str:
+    """Get the identity an admin request applies to."""
+    return data.get("identity") or g.get("identity", "default")
 
 
 @admin_bp.route("/_reset", methods=["POST"])
 def reset() -> tuple[Response, int] | Response:
     """Clear all data for the given identity (database + files)."""
-    if request.is_json:
-        data = request.get_json() or {}
-        identity = data.get("identity") or g.get("identity", "default")
-    else:
-        identity = request.form.get("identity") or g.get("identity", "default")
+    identity = _target_identity(_request_data())
 
     reset_identity_data(identity)
 
@@ -185,6 +355,132 @@ def reset() -> tuple[Response, int] | Response:
     return redirect("/_browse")
 
 
+@admin_bp.route("/_snapshot", methods=["POST"])
+def snapshot() -> tuple[Response, int]:
+    """Capture the identity's database and blobs as a named snapshot."""
+    data = _request_data()
+    identity = _target_identity(data)
+    name = data.get("name", "")
+    if not SNAPSHOT_NAME.match(name):
+        return jsonify(
+            {
+                "type": "error",
+                "code": "bad_request",
+                "message": "Snapshot name must be letters, digits, '.', '_' or '-'",
+            },
+        ), 400
+
+    create_snapshot(identity, name)
+    return jsonify(
+        {"status": "snapshot created", "identity": identity, "name": name},
+    ), 201
+
+
+@admin_bp.route("/_snapshot", methods=["GET"])
+def snapshots() -> Response:
+    """List the identity's snapshots."""
+    identity = _target_identity(request.args.to_dict())
+    return jsonify({"identity": identity, "snapshots": list_snapshots(identity)})
+
+
+@admin_bp.route("/_restore", methods=["POST"])
+def restore() -> tuple[Response, int]:
+    """Restore the identity to a named snapshot."""
+    data = _request_data()
+    identity = _target_identity(data)
+    name = data.get("name", "")
+    if not SNAPSHOT_NAME.match(name) or not restore_snapshot(identity, name):
+        return jsonify(
+            {"type": "error", "code": "not_found", "message": "Snapshot not found"},
+        ), 404
+
+    return jsonify(
+        {"status": "restore complete", "identity": identity, "name": name},
+    ), 200
+
+
+@admin_bp.route("/_seed", methods=["POST"])
+def seed() -> tuple[Response, int]:
+    """
+    Import a fixture tree into the identity.
+
+    Takes the manifest as the JSON body, or as a multipart ``manifest`` part
+    with the file contents as a tar in an ``archive`` part.
+    """
+    archive = request.files.get("archive")
+    if request.is_json:
+        manifest = request.get_json(silent=True)
+        identity = _target_identity(manifest if isinstance(manifest, dict) else {})
+    else:
+        data = request.form.to_dict()
+        identity = _target_identity(data)
+        manifest_file = request.files.get("manifest")
+        text = manifest_file.read() if manifest_file else data.get("manifest", "")
+        try:
+            manifest = json.loads(text)
+        except ValueError:
+            manifest = None
+
+    try:
+        counts = seed_identity(identity, manifest, archive.stream if archive else None)
+    except SeedError as e:
+        return jsonify(
+            {"type": "error", "code": "bad_request", "message": str(e)},
+        ), 400
+    return jsonify({"status": "seed complete", "identity": identity, **counts}), 201
+
+
+def _parse_since(value: str) -> float:
+    """Parse a Unix timestamp or an ISO 8601 time, UTC unless it has an offset."""
+    try:
+        return float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value)
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=timezone.utc)
+        return moment.timestamp()
+
+
+@admin_bp.route("/_export")
+def export() -> Response | tuple[Response, int]:
+    """
+    Stream the identity's database and blobs as a tar archive.
+
+    With ``since`` (a Unix timestamp or ISO 8601 time) only blobs stored
+    since then are included, next to the full database.
+    """
+    data = request.args.to_dict()
+    identity = _target_identity(data)
+    if identity not in list_identities():
+        return jsonify(
+            {"type": "error", "code": "not_found", "message": "Identity not found"},
+        ), 404
+    try:
+        since = _parse_since(data["since"]) if data.get("since") else None
+    except ValueError:
+        return jsonify(
+            {
+                "type": "error",
+                "code": "bad_request",
+                "message": "since must be a Unix timestamp or an ISO 8601 time",
+            },
+        ), 400
+
+    response = Response(stream_export(identity, since), mimetype="application/x-tar")
+    response.headers.set(
+        "Content-Disposition",
+        "attachment",
+        filename=f"{identity}.tar",
+    )
+    return response
+
+
+@admin_bp.route("/_stats")
+def stats() -> Response:
+    """Report cache statistics for this server process."""
+    return jsonify({"engines": engine_cache_stats(), "items": item_cache_stats()})
+
+
 @admin_bp.route("/health")
 def health() -> Response:
     """Health check endpoint."""
@@ -0,0 +1,258 @@
+"""
+Mock-only batch endpoint running many API operations in one transaction.
+
+``POST /_batch`` takes an ordered list of operations and dispatches each one
+to the regular ``/2.0`` routes inside this request, so a test tree can be
+built with a single round trip. Every operation shares one database
+transaction: the commits the routes make only release a savepoint, and the
+batch is committed once at the end, or rolled back as a whole when an
+operation fails. Content the operations release is removed after the commit;
+blobs stored by a rolled back batch are released instead. Items are read
+without the item cache, so uncommitted rows are never served to others.
+"""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import io
+import re
+from http import HTTPStatus
+from typing import TYPE_CHECKING, Any
+
+from flask import Blueprint, Response, current_app, g, jsonify, request
+from sqlalchemy.orm import Session
+
+from box_mock import cache, storage
+from box_mock.db import db
+
+if TYPE_CHECKING:
+    from flask import Flask
+    from flask.typing import ResponseReturnValue
+
+batch_bp = Blueprint("batch", __name__)
+
+MAX_OPERATIONS = 1000
+
+# "${ref.path.to.value}" inserts a value from an earlier operation's response.
+_REFERENCE = re.compile(r"\$\{(\w+)((?:\.\w+)*)\}")
+
+
+class BatchError(ValueError):
+    """An operation that cannot be run."""
+
+
+def _lookup(results: dict[str, Any], ref: str, path: str) -> Any:  # noqa: ANN401
+    """Return the value at a dotted path in the response of operation ``ref``."""
+    if ref not in results:
+        msg = f"Unknown operation reference '{ref}'"
+        raise BatchError(msg)
+    value = results[ref]
+    try:
+        for key in path.split(".")[1:]:
+            value = value[int(key)] if isinstance(value, list) else value[key]
+    except (KeyError, IndexError, TypeError, ValueError) as e:
+        msg = f"Operation '{ref}' has no value at '{path[1:]}'"
+        raise BatchError(msg) from e
+    return value
+
+
+def resolve(value: Any, results: dict[str, Any]) -> Any:  # noqa: ANN401
+    """
+    Replace references to earlier responses in an operation's arguments.
+
+    A string that is just a reference takes the referenced value as is, so
+    numbers and objects keep their type; references within longer strings,
+    such as paths, are formatted into them.
+    """
+    if isinstance(value, dict):
+        return {key: resolve(item, results) for key, item in value.items()}
+    if isinstance(value, list):
+        return [resolve(item, results) for item in value]
+    if not isinstance(value, str):
+        return value
+    match = _REFERENCE.fullmatch(value)
+    if match:
+        return _lookup(results, *match.groups())
+    return _REFERENCE.sub(lambda m: str(_lookup(results, *m.groups())), value)
+
+
+def _request_arguments(operation: dict[str, Any]) -> dict[str, Any]:
+    """Build the request context arguments of an operation."""
+    method = str(operation.get("method", "GET")).upper()
+    path = operation.get("path")
+    if not isinstance(path, str) or not path.startswith("/2.0/"):
+        msg = "Each operation needs a path under /2.0/"
+        raise BatchError(msg)
+
+    arguments: dict[str, Any] = {
+        "path": path,
+        "method": method,
+        "headers": operation.get("headers") or {},
+    }
+    if "body" in operation:
+        arguments["json"] = operation["body"]
+    elif "form" in operation or "files" in operation:
+        # Uploads: {"files": {"file": {"filename": ..., "content": base64}}}.
+        data: dict[str, Any] = {
+            key: value if isinstance(value, str) else str(value)
+            for key, value in (operation.get("form") or {}).items()
+        }
+        try:
+            for field, upload in (operation.get("files") or {}).items():
+                content = base64.b64decode(upload.get("content", ""), validate=True)
+                data[field] = (io.BytesIO(content), upload.get("filename", field))
+        except (AttributeError, binascii.Error) as e:
+            msg = "Files must have a filename and base64 content"
+            raise BatchError(msg) from e
+        arguments["data"] = data
+    return arguments
+
+
+def _dispatch(session: Session, arguments: dict[str, Any]) -> Response:
+    """
+    Run one operation through the app's routes and error handlers.
+
+    The request hooks are skipped: the operation uses the batch's identity and
+    session, which teardown closes, leaving its transaction to the batch.
+    """
+    app = current_app._get_current_object()  # noqa: SLF001
+    with app.test_request_context(**arguments):
+        g.db_session = g.db_read_session = session
+        try:
+            rv = app.dispatch_request()
+        except Exception as e:  # noqa: BLE001 - handled like a real request
+            rv = _handle_error(app, session, e)
+        return app.make_response(rv)
+
+
+def _handle_error(
+    app: Flask,
+    session: Session,
+    error: Exception,
+) -> ResponseReturnValue:
+    """
+    Handle an operation's error with the app's error handlers.
+
+    An error no handler takes fails the operation with a 500, rather than the
+    whole batch request, and its changes are rolled back to the savepoint.
+    """
+    try:
+        return app.handle_user_exception(error)
+    except Exception:
+        app.logger.exception("Batch operation failed")
+        session.rollback()
+        return jsonify(
+            {
+                "type": "error",
+                "code": "internal_server_error",
+                "message": "Internal Server Error",
+            },
+        ), 500
+
+
+def _run(
+    session: Session,
+    operations: list[dict[str, Any]],
+) -> tuple[list[dict[str, Any]], bool]:
+    """
+    Run operations in order until one fails.
+
+    Returns the result of each operation run and whether all succeeded.
+    """
+    results: list[dict[str, Any]] = []
+    bodies: dict[str, Any] = {}
+    for index, operation in enumerate(operations):
+        ref = str(operation.get("ref", index))
+        try:
+            arguments = _request_arguments(resolve(operation, bodies))
+            response = _dispatch(session, arguments)
+        except BatchError as e:
+            results.append(
+                {
+                    "ref": ref,
+                    "status": 400,
+                    "body": {"type": "error", "code": "bad_request", "message": str(e)},
+                },
+            )
+            return results, False
+        body = response.get_json(silent=True)
+        results.append({"ref": ref, "status": response.status_code, "body": body})
+        if response.status_code >= HTTPStatus.BAD_REQUEST:
+            return results, False
+        bodies[ref] = body
+    return results, True
+
+
+@batch_bp.route("/_batch", methods=["POST"])
+def batch() -> Response | tuple[Response, int]:
+    """
+    Run a list of API operations in one transaction.
+
+    Each operation has a ``method``, a ``path`` under ``/2.0/`` and a JSON
+    ``body``, or ``form`` fields and base64 ``files`` for uploads, plus an
+    optional ``ref`` (its index by default). Strings like ``${ref.id}`` or
+    ``${ref.entries.0.id}`` are replaced with values from the response of an
+    earlier operation. The first failing operation rolls back the whole
+    batch; the results run so far are then returned in a 400 error.
+    """
+    data = request.get_json(silent=True) or {}
+    operations = data.get("operations") if isinstance(data, dict) else None
+    if (
+        not isinstance(operations, list)
+        or len(operations) > MAX_OPERATIONS
+        or not all(isinstance(operation, dict) for operation in operations)
+    ):
+        return jsonify(
+            {
+                "type": "error",
+                "code": "bad_request",
+                "message": f"operations must be a list of at most {MAX_OPERATIONS} "
+                "objects",
+            },
+        ), 400
+
+    identity = g.identity
+    engine = db.session.get_bind()
+    outer_sessions = {
+        key: g.pop(key, None) for key in ("db_session", "db_read_session")
+    }
+    with engine.connect() as connection:
+        # Take the write lock up front; the routes' commits become savepoints.
+        connection.exec_driver_sql("BEGIN IMMEDIATE")
+        session = Session(bind=connection, join_transaction_mode="create_savepoint")
+        committed = False
+        try:
+            with storage.defer_removals() as pending, cache.bypass():
+                results, succeeded = _run(session, operations)
+            if succeeded:
+                connection.commit()
+                committed = True
+            else:
+                connection.rollback()
+        finally:
+            session.close()
+            for key, outer_session in outer_sessions.items():
+                if outer_session is not None:
+                    setattr(g, key, outer_session)
+            cache.invalidate_identity(identity)
+            if not committed:
+                storage.remove_content_later(identity, pending.added_sha1s)
+
+    if not succeeded:
+        return jsonify(
+            {
+                "type": "error",
+                "code": "batch_failed",
+                "message": f"Operation {len(results) - 1} failed, nothing was "
+                "committed",
+                "context_info": {"results": results},
+            },
+        ), 400
+    storage.remove_content_later(
+        identity,
+        pending.sha1s,
+        pending.file_ids,
+        pending.session_ids,
+    )
+    return jsonify({"results": results})
@@ -3,111 +3,193 @@
 from __future__ import annotations
 
 import json
-import shutil
-import uuid
 from typing import TYPE_CHECKING
 
-from flask import Blueprint, Response, g, jsonify, request, send_file
+from flask import Blueprint, Response, g, jsonify, request
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 
+from box_mock import cache, etags, storage
 from box_mock.db import db
+from box_mock.downloads import send_content
 from box_mock.models import File, Folder
-
-files_bp = Blueprint("files", __name__, url_prefix="/2.0")
+from box_mock.serialization import requested_fields
 
 if TYPE_CHECKING:
     from pathlib import Path
 
-
-def get_files_dir() -> Path:
-    """Get the files directory for the current identity."""
-    from box_mock.db import DATA_DIR  # noqa: PLC0415
-
-    identity = g.get("identity", "default")
-    files_dir = DATA_DIR / identity / "files"
-    files_dir.mkdir(parents=True, exist_ok=True)
-    return files_dir
+files_bp = Blueprint("files", __name__, url_prefix="/2.0")
+files_bp.register_error_handler(StaleDataError, etags.handle_stale_data)
+
+
+def get_identity() -> str:
+    """Get the identity of the current request."""
+    return g.get("identity", "default")
+
+
+def get_file_path(file: File) -> Path:
+    """Get filesystem path holding a file's content."""
+    return storage.get_content_path(get_identity(), file)
+
+
+def name_conflict(
+    folder_id: str,
+    name: str,
+    exclude_id: str | None = None,
+) -> tuple[Response, int] | None:
+    """Return a 409 response if another file with ``name`` is in the folder."""
+    existing = db.session.query(File).filter_by(folder_id=folder_id, name=name).first()
+    if not existing or existing.id == exclude_id:
+        return None
+    return jsonify(
+        {
+            "type": "error",
+            "code": "item_name_in_use",
+            "message": f"Item with name '{name}' already exists",
+            "context_info": {
+                "conflicts": [{"id": existing.id, "name": existing.name}],
+            },
+        },
+    ), 409
 
 
-def get_file_path(file_id: str) -> Path:
-    """Get filesystem path for a file."""
-    return get_files_dir() / file_id
+@files_bp.errorhandler(IntegrityError)
+def handle_integrity_error(_: IntegrityError) -> tuple[Response, int]:
+    """Report a name taken by a concurrent request as a conflict."""
+    db.session.rollback()
+    return jsonify(
+        {
+            "type": "error",
+            "code": "item_name_in_use",
+            "message": "Item with the same name already exists",
+        },
+    ), 409
 
 
 @files_bp.route("/files/<file_id>", methods=["GET"])
 def get_file(file_id: str) -> Response | tuple[Response, int]:
-    """Get file metadata by ID."""
-    file = db.session.get(File, file_id)
-    if not file:
+    """
+    Get file metadata by ID, limited to the requested ``fields``.
+
+    Answers 304 when ``If-None-Match`` names the file's current etag.
+    """
+    data = cache.get_item(
+        get_identity(),
+        db.read_session,
+        File,
+        file_id,
+        requested_fields(),
+    )
+    if data is None:
         return jsonify(
             {"type": "error", "code": "not_found", "message": "File not found"},
         ), 404
-    return jsonify(file.to_dict())
+    return etags.item_response(data)
 
 
 @files_bp.route("/files/<file_id>", methods=["PUT"])
 def update_file(file_id: str) -> Response | tuple[Response, int]:
-    """Update file metadata (name)."""
+    """Update file metadata (name), if ``If-Match`` names its current etag."""
     file = db.session.get(File, file_id)
     if not file:
         return jsonify(
             {"type": "error", "code": "not_found", "message": "File not found"},
         ), 404
+    precondition = etags.check_if_match(str(file.etag))
+    if precondition:
+        return precondition
 
     data = request.get_json()
     if "name" in data:
+        conflict = name_conflict(file.folder_id, data["name"], exclude_id=file.id)
+        if conflict:
+            return conflict
         file.name = data["name"]
 
     db.session.commit()
-    return jsonify(file.to_dict())
+    cache.invalidate(get_identity(), File, file.id)
+    return jsonify(file.to_dict(requested_fields()))
 
 
 @files_bp.route("/files/<file_id>", methods=["DELETE"])
 def delete_file(file_id: str) -> tuple[Response, int] | tuple[str, int]:
-    """Delete file by ID."""
+    """Delete file by ID, if ``If-Match`` names its current etag."""
     file = db.session.get(File, file_id)
     if not file:
         return jsonify(
             {"type": "error", "code": "not_found", "message": "File not found"},
         ), 404
+    precondition = etags.check_if_match(str(file.etag))
+    if precondition:
+        return precondition
 
-    file_path = get_file_path(file_id)
-    if file_path.exists():
-        file_path.unlink()
-
+    sha1 = file.sha1
     db.session.delete(file)
     db.session.commit()
+    cache.invalidate(get_identity(), File, file_id)
+    if not sha1:
+        storage.remove_content(get_identity(), file_ids=[file_id])
+    storage.release_blobs(get_identity(), db.session, [sha1])
     return "", 204
 
 
 @files_bp.route("/files/<file_id>/content", methods=["GET"])
 def download_file(file_id: str) -> Response | tuple[Response, int]:
     """Download file content."""
-    file = db.session.get(File, file_id)
+    file = db.read_session.get(File, file_id)
     if not file:
         return jsonify(
             {"type": "error", "code": "not_found", "message": "File not found"},
         ), 404
 
-    file_path = get_file_path(file_id)
+    file_path = get_file_path(file)
     if not file_path.exists():
         return jsonify(
             {"type": "error", "code": "not_found", "message": "File content not found"},
         ), 404
 
-    return send_file(file_path, download_name=file.name)
+    return send_content(file_path, file.name, f"{file.id}_v{file.version}")
+
 
+def stream_upload_to_temp() -> tuple[Path, str, int] | None:
+    """
+    Return the first non-empty uploaded file as a temp file in the files dir.
 
-def extract_file_content() -> bytes | None:
-    """Extract file content from request, handling various multipart formats."""
+    Parts are parsed straight into the files dir (see ``BoxMockRequest``) and
+    are handed over as they are; other streams are copied. Returns the temp
+    path, content SHA-1 and size, or None if no content was sent.
+    """
     for key in request.files:
         f = request.files[key]
-        if f is not None:
-            content = f.read()
-            if content:
-                return content
+        if f is None:
+            continue
+        if isinstance(f.stream, storage.HashingTempFile):
+            if f.stream.size:
+                return f.stream.claim()
+            continue
+        tmp_path, sha1, size = storage.write_temp_blob(get_identity(), [f.stream])
+        if size:
+            return tmp_path, sha1, size
+        tmp_path.unlink()
     return None
 
 
+def commit_upload(tmp_path: Path, sha1: str) -> None:
+    """
+    Commit the session and move the uploaded temp file into the blob store.
+
+    Files updated by the commit are dropped from the item cache.
+    """
+    changed = [obj.id for obj in db.session.dirty if isinstance(obj, File)]
+    try:
+        db.session.commit()
+    except Exception:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    cache.invalidate(get_identity(), File, *changed)
+    storage.add_blob(get_identity(), tmp_path, sha1)
+
+
 @files_bp.route("/files/content", methods=["POST"])
 def upload_file() -> tuple[Response, int]:
     """Upload a new file."""
@@ -127,45 +209,65 @@ def upload_file() -> tuple[Response, int]:
             },
         ), 404
 
-    content = extract_file_content()
-    if content is None:
+    conflict = name_conflict(parent_id, name)
+    if conflict:
+        return conflict
+
+    upload = stream_upload_to_temp()
+    if upload is None:
         return jsonify(
             {"type": "error", "code": "bad_request", "message": "No file provided"},
         ), 400
+    tmp_path, sha1, size = upload
 
-    file = File(name=name, folder_id=parent_id, size=len(content))
+    file = File(name=name, folder_id=parent_id, size=size, sha1=sha1)
     db.session.add(file)
-    db.session.commit()
+    commit_upload(tmp_path, sha1)
 
-    file_path = get_file_path(file.id)
-    file_path.write_bytes(content)
-
-    return jsonify({"entries": [file.to_dict()]}), 201
+    return jsonify({"entries": [file.to_dict(requested_fields())]}), 201
 
 
 @files_bp.route("/files/<file_id>/content", methods=["POST"])
 def upload_file_version(file_id: str) -> tuple[Response, int]:
-    """Upload a new version of an existing file."""
+    """Upload a new version of a file, if ``If-Match`` names its current etag."""
     file = db.session.get(File, file_id)
     if not file:
         return jsonify(
             {"type": "error", "code": "not_found", "message": "File not found"},
         ), 404
+    precondition = etags.check_if_match(str(file.etag))
+    if precondition:
+        return precondition
 
-    content = extract_file_content()
-    if content is None:
+    upload = stream_upload_to_temp()
+    if upload is None:
         return jsonify(
             {"type": "error", "code": "bad_request", "message": "No file provided"},
         ), 400
+    tmp_path, sha1, size = upload
 
+    old_sha1 = file.sha1
     file.version += 1
-    file.size = len(content)
-    db.session.commit()
+    file.size = size
+    file.sha1 = sha1
+    commit_upload(tmp_path, sha1)
+    if not old_sha1:
+        storage.remove_content(get_identity(), file_ids=[file.id])
+    storage.release_blobs(get_identity(), db.session, [old_sha1])
 
-    file_path = get_file_path(file.id)
-    file_path.write_bytes(content)
+    return jsonify({"entries": [file.to_dict(requested_fields())]}), 201
 
-    return jsonify({"entries": [file.to_dict()]}), 201
+
+def adopt_legacy_content(file: File) -> None:
+    """Move content stored under a file's ID into the blob store."""
+    legacy_path = get_file_path(file)
+    if not legacy_path.exists():
+        return
+    with legacy_path.open("rb") as f:
+        tmp_path, sha1, _ = storage.write_temp_blob(get_identity(), [f])
+    file.sha1 = sha1
+    commit_upload(tmp_path, sha1)
+    storage.remove_content(get_identity(), file_ids=[file.id])
 
 
 @files_bp.route("/files/<file_id>/copy", methods=["POST"])
@@ -191,42 +293,15 @@ def copy_file(file_id: str) -> tuple[Response, int]:
             },
         ), 404
 
-    new_file = File(name=new_name, folder_id=parent_id, size=file.size)
-    db.session.add(new_file)
-    db.session.commit()
-
-    src_path = get_file_path(file.id)
-    dst_path = get_file_path(new_file.id)
-    if src_path.exists():
-        shutil.copy2(src_path, dst_path)
-
-    return jsonify(new_file.to_dict()), 201
+    conflict = name_conflict(parent_id, new_name)
+    if conflict:
+        return conflict
 
+    if not file.sha1:
+        adopt_legacy_content(file)
 
-@files_bp.route("/files/upload_sessions", methods=["POST"])
-def preflight_check() -> tuple[Response, int]:
-    """Preflight check for file upload (checks if name conflicts exist)."""
-    data = request.get_json()
-    name = data.get("name")
-    parent_id = data.get("parent", {}).get("id", "0")
-
-    folder = db.session.get(Folder, parent_id)
-    if not folder:
-        return jsonify(
-            {"type": "error", "code": "not_found", "message": "Folder not found"},
-        ), 404
-
-    existing = db.session.query(File).filter_by(folder_id=parent_id, name=name).first()
-    if existing:
-        return jsonify(
-            {
-                "type": "error",
-                "code": "item_name_in_use",
-                "message": f"Item with name '{name}' already exists",
-                "context_info": {
-                    "conflicts": [{"id": existing.id, "name": existing.name}],
-                },
-            },
-        ), 409
+    new_file = File(name=new_name, folder_id=parent_id, size=file.size, sha1=file.sha1)
+    db.session.add(new_file)
+    db.session.commit()
 
-    return jsonify({"upload_token": str(uuid.uuid4())}), 200
+    return jsonify(new_file.to_dict(requested_fields())), 201
@@ -2,12 +2,50 @@
 
 from __future__ import annotations
 
-from flask import Blueprint, Response, jsonify, request
+import os
+import uuid
+from typing import TYPE_CHECKING
 
+from flask import Blueprint, Response, g, jsonify, request
+from sqlalchemy import delete, func, insert, or_, select
+from sqlalchemy.orm import load_only
+from sqlalchemy.orm.exc import StaleDataError
+
+from box_mock import cache, etags, pagination, storage
 from box_mock.db import db
-from box_mock.models import Folder
+from box_mock.models import File, Folder, UploadPart, UploadSession
+from box_mock.serialization import requested_fields
+
+if TYPE_CHECKING:
+    from sqlalchemy import CTE, Select
 
 folders_bp = Blueprint("folders", __name__, url_prefix="/2.0")
+folders_bp.register_error_handler(StaleDataError, etags.handle_stale_data)
+
+# Deletes leaving more blobs than this to check remove them in the background.
+INLINE_REMOVAL_LIMIT = 100
+
+ITEM_SORTS = {"id", "name", "date", "size"}
+
+
+def subtree_cte(*folder_ids: str) -> CTE:
+    """
+    Build a recursive CTE of folders and all of their descendant folders.
+
+    Rows are combined with ``UNION``, so a parent cycle in the data ends the
+    recursion instead of repeating forever.
+    """
+    tree = (
+        select(Folder.id, Folder.parent_id, Folder.name)
+        .where(Folder.id.in_(folder_ids))
+        .cte("subtree", recursive=True)
+    )
+    return tree.union(
+        select(Folder.id, Folder.parent_id, Folder.name).join(
+            tree,
+            Folder.parent_id == tree.c.id,
+        ),
+    )
 
 
 @folders_bp.route("/folders", methods=["POST"])
@@ -31,42 +69,73 @@ def create_folder() -> tuple[Response, int]:
     folder = Folder(name=name, parent_id=parent_id)
     db.session.add(folder)
     db.session.commit()
-    return jsonify(folder.to_dict()), 201
+    return jsonify(folder.to_dict(requested_fields())), 201
 
 
 @folders_bp.route("/folders/<folder_id>", methods=["GET"])
 def get_folder(folder_id: str) -> Response | tuple[Response, int]:
-    """Get folder by ID."""
-    folder = db.session.get(Folder, folder_id)
-    if not folder:
+    """
+    Get folder by ID, limited to the requested ``fields``.
+
+    Answers 304 when ``If-None-Match`` names the folder's current etag.
+    """
+    data = cache.get_item(
+        g.get("identity", "default"),
+        db.read_session,
+        Folder,
+        folder_id,
+        requested_fields(),
+    )
+    if data is None:
         return jsonify(
             {"type": "error", "code": "not_found", "message": "Folder not found"},
         ), 404
-    return jsonify(folder.to_dict())
+    return etags.item_response(data)
 
 
 @folders_bp.route("/folders/<folder_id>", methods=["PUT"])
 def update_folder(folder_id: str) -> Response | tuple[Response, int]:
-    """Update folder (name or parent)."""
+    """Update folder (name or parent), if ``If-Match`` names its current etag."""
     folder = db.session.get(Folder, folder_id)
     if not folder:
         return jsonify(
             {"type": "error", "code": "not_found", "message": "Folder not found"},
         ), 404
+    precondition = etags.check_if_match(str(folder.etag))
+    if precondition:
+        return precondition
 
     data = request.get_json()
+    if "parent" in data:
+        parent_id = data["parent"].get("id")
+        tree = subtree_cte(folder_id)
+        if db.session.scalar(select(tree.c.id).where(tree.c.id == parent_id)):
+            return jsonify(
+                {
+                    "type": "error",
+                    "code": "bad_request",
+                    "message": "Cannot move a folder into itself or its subfolders",
+                },
+            ), 400
+        folder.parent_id = parent_id
     if "name" in data:
         folder.name = data["name"]
-    if "parent" in data:
-        folder.parent_id = data["parent"].get("id")
 
     db.session.commit()
-    return jsonify(folder.to_dict())
+    cache.invalidate(g.get("identity", "default"), Folder, folder_id)
+    return jsonify(folder.to_dict(requested_fields()))
 
 
 @folders_bp.route("/folders/<folder_id>", methods=["DELETE"])
 def delete_folder(folder_id: str) -> tuple[Response, int] | tuple[str, int]:
-    """Delete folder by ID (recursive)."""
+    """
+    Delete folder by ID (recursive), if ``If-Match`` names its current etag.
+
+    The subtree's folders, files and upload sessions are deleted with a few
+    set-based statements over a recursive CTE, without loading any rows into
+    the session. Their content is removed after the commit, on a background
+    thread when there is a lot of it.
+    """
     folder = db.session.get(Folder, folder_id)
     if not folder:
         return jsonify(
@@ -80,22 +149,276 @@ def delete_folder(folder_id: str) -> tuple[Response, int] | tuple[str, int]:
                 "message": "Cannot delete root folder",
             },
         ), 403
+    precondition = etags.check_if_match(str(folder.etag))
+    if precondition:
+        return precondition
 
-    db.session.delete(folder)
+    folder_ids = select(subtree_cte(folder_id).c.id)
+    file_ids = select(File.id).where(File.folder_id.in_(folder_ids))
+    session_ids = select(UploadSession.id).where(
+        or_(
+            UploadSession.folder_id.in_(folder_ids),
+            UploadSession.file_id.in_(file_ids),
+        ),
+    )
+    files = db.session.execute(
+        select(File.id, File.sha1).where(File.folder_id.in_(folder_ids)),
+    ).all()
+    sessions = db.session.scalars(session_ids).all()
+
+    for statement in (
+        delete(UploadPart).where(UploadPart.session_id.in_(session_ids)),
+        delete(UploadSession).where(UploadSession.id.in_(session_ids)),
+        delete(File).where(File.folder_id.in_(folder_ids)),
+        delete(Folder).where(Folder.id.in_(folder_ids)),
+    ):
+        db.session.execute(statement.execution_options(synchronize_session=False))
     db.session.commit()
+    # The subtree's IDs are not loaded, so drop the identity's whole cache.
+    cache.invalidate_identity(g.get("identity", "default"))
+
+    content = (
+        g.get("identity", "default"),
+        [row.sha1 for row in files if row.sha1],
+        [row.id for row in files if not row.sha1],
+        sessions,
+    )
+    if len(files) + len(sessions) > INLINE_REMOVAL_LIMIT:
+        storage.remove_content_later(*content)
+    else:
+        storage.remove_content(*content)
     return "", 204
 
 
+def _item_sort_columns(model: type[Folder | File], sort: str) -> list:
+    """Return the columns items of ``model`` are sorted by, ID last."""
+    column = {
+        "name": model.name,
+        "date": model.created_at,
+        "size": getattr(model, "size", None),
+    }.get(sort)
+    return [model.id] if column is None else [column, model.id]
+
+
+def _children_query(
+    model: type[Folder | File],
+    folder_id: str,
+    page: pagination.Page,
+    after: list | None = None,
+) -> Select:
+    """
+    Build the sorted query of the folders or files directly in a folder.
+
+    With ``fields`` requested only those and the sort columns are loaded.
+    """
+    columns = _item_sort_columns(model, page.sort)
+    parent = model.parent_id if model is Folder else model.folder_id
+    query = select(model).where(parent == folder_id)
+    fields = requested_fields()
+    if fields is not None:
+        query = query.options(load_only(*model.load_columns(fields), *columns))
+    if after is not None:
+        query = query.where(
+            pagination.after(columns, after, descending=page.descending),
+        )
+    return query.order_by(*pagination.order_by(columns, descending=page.descending))
+
+
+def _marker_page(folder_id: str, page: pagination.Page) -> dict:
+    """List a folder with keyset paging, folders first."""
+    marker = page.marker or {"type": "folder", "sort": page.sort, "after": None}
+    if marker.get("sort") != page.sort or marker.get("type") not in {"folder", "file"}:
+        msg = "Marker does not match this listing"
+        raise pagination.PaginationError(msg)
+
+    # One extra row tells whether there is a next page.
+    items: list[Folder | File] = []
+    if marker["type"] == "folder":
+        query = _children_query(Folder, folder_id, page, marker.get("after"))
+        items = list(db.read_session.scalars(query.limit(page.limit + 1)))
+    if len(items) <= page.limit:
+        after = marker.get("after") if marker["type"] == "file" else None
+        query = _children_query(File, folder_id, page, after)
+        items += db.read_session.scalars(query.limit(page.limit + 1 - len(items)))
+
+    entries = items[: page.limit]
+    fields = requested_fields()
+    next_marker = None
+    if len(items) > page.limit:
+        last = entries[-1]
+        columns = _item_sort_columns(type(last), page.sort)
+        next_marker = pagination.encode_marker(
+            {
+                "type": "folder" if isinstance(last, Folder) else "file",
+                "sort": page.sort,
+                "after": [getattr(last, column.key) for column in columns],
+            },
+        )
+    return {
+        "entries": [item.to_dict(fields) for item in entries],
+        "limit": page.limit,
+        "next_marker": next_marker,
+        "order": page.order(),
+    }
+
+
+def _offset_page(folder_id: str, page: pagination.Page) -> dict:
+    """List a folder with offset paging, folders first."""
+    folder_count = db.read_session.scalar(
+        select(func.count()).select_from(Folder).where(Folder.parent_id == folder_id),
+    )
+    file_count = db.read_session.scalar(
+        select(func.count()).select_from(File).where(File.folder_id == folder_id),
+    )
+
+    items: list[Folder | File] = []
+    if page.offset < folder_count:
+        query = _children_query(Folder, folder_id, page)
+        items = list(
+            db.read_session.scalars(query.offset(page.offset).limit(page.limit))
+        )
+    if len(items) < page.limit and page.offset + len(items) < folder_count + file_count:
+        query = _children_query(File, folder_id, page)
+        offset = max(page.offset - folder_count, 0)
+        items += db.read_session.scalars(
+            query.offset(offset).limit(page.limit - len(items))
+        )
+
+    fields = requested_fields()
+    return {
+        "entries": [item.to_dict(fields) for item in items],
+        "total_count": folder_count + file_count,
+        "offset": page.offset,
+        "limit": page.limit,
+        "order": page.order(),
+    }
+
+
 @folders_bp.route("/folders/<folder_id>/items", methods=["GET"])
 def get_folder_items(folder_id: str) -> Response | tuple[Response, int]:
-    """List items in a folder (subfolders and files)."""
+    """
+    List items in a folder (subfolders and files).
+
+    Folders come before files, each sorted by ``sort`` and ``direction``.
+    Supports offset paging and, with ``usemarker=true``, marker paging; both
+    only load the requested page from the database.
+    """
+    folder = db.read_session.get(Folder, folder_id)
+    if not folder:
+        return jsonify(
+            {"type": "error", "code": "not_found", "message": "Folder not found"},
+        ), 404
+
+    try:
+        page = pagination.parse_page(ITEM_SORTS, "name")
+        if page.use_marker:
+            return jsonify(_marker_page(folder_id, page))
+        return jsonify(_offset_page(folder_id, page))
+    except pagination.PaginationError as e:
+        return jsonify(
+            {"type": "error", "code": "bad_request", "message": str(e)},
+        ), 400
+
+
+@folders_bp.route("/folders/<folder_id>/copy", methods=["POST"])
+def copy_folder(folder_id: str) -> tuple[Response, int]:
+    """
+    Copy a folder and its whole subtree to a new parent.
+
+    The subtree is read with one recursive query and the copies are inserted
+    in bulk in a single transaction. File contents are shared through the
+    blob store, so no content is copied.
+    """
     folder = db.session.get(Folder, folder_id)
     if not folder:
         return jsonify(
             {"type": "error", "code": "not_found", "message": "Folder not found"},
         ), 404
+    if folder_id == "0":
+        return jsonify(
+            {
+                "type": "error",
+                "code": "forbidden",
+                "message": "Cannot copy root folder",
+            },
+        ), 403
+
+    data = request.get_json()
+    parent_id = data.get("parent", {}).get("id")
+    if not parent_id:
+        return jsonify(
+            {
+                "type": "error",
+                "code": "bad_request",
+                "message": "parent.id is required",
+            },
+        ), 400
+    if not db.session.get(Folder, parent_id):
+        return jsonify(
+            {
+                "type": "error",
+                "code": "not_found",
+                "message": "Destination folder not found",
+            },
+        ), 404
+
+    tree = subtree_cte(folder_id)
+    folders = db.session.execute(select(tree.c.id, tree.c.parent_id, tree.c.name)).all()
+    new_ids = {row.id: str(uuid.uuid4()) for row in folders}
+    if parent_id in new_ids:
+        return jsonify(
+            {
+                "type": "error",
+                "code": "bad_request",
+                "message": "Cannot copy a folder into itself",
+            },
+        ), 400
+
+    files = db.session.execute(
+        select(File.id, File.folder_id, File.name, File.size, File.sha1).where(
+            File.folder_id.in_(select(tree.c.id)),
+        ),
+    ).all()
+    new_file_ids = {row.id: str(uuid.uuid4()) for row in files}
+
+    new_parent_ids = {folder.parent_id: parent_id, **new_ids}
+    new_names = {folder_id: data.get("name", folder.name)}
+    db.session.execute(
+        insert(Folder),
+        [
+            {
+                "id": new_ids[row.id],
+                "parent_id": new_parent_ids[row.parent_id],
+                "name": new_names.get(row.id, row.name),
+            }
+            for row in folders
+        ],
+    )
+    if files:
+        db.session.execute(
+            insert(File),
+            [
+                {
+                    "id": new_file_ids[row.id],
+                    "folder_id": new_ids[row.folder_id],
+                    "name": row.name,
+                    "size": row.size,
+                    "sha1": row.sha1,
+                }
+                for row in files
+            ],
+        )
+    db.session.commit()
 
-    items = [child.to_dict() for child in folder.children]
-    items.extend(file.to_dict() for file in folder.files)
+    # Files uploaded before content addressing keep per-ID content; hardlink it.
+    identity = g.get("identity", "default")
+    for row in files:
+        legacy_path = storage.get_blob_path(identity, row.id)
+        if not row.sha1 and legacy_path.exists():
+            new_path = storage.get_blob_path(identity, new_file_ids[row.id])
+            new_path.parent.mkdir(parents=True, exist_ok=True)
+            os.link(legacy_path, new_path)
 
-    return jsonify({"entries": items, "total_count": len(items)})
+    return jsonify(
+        db.session.get(Folder, new_ids[folder_id]).to_dict(requested_fields())
+    ), 201
@@ -0,0 +1,133 @@
+"""Search routes for Box Mock API."""
+
+from __future__ import annotations
+
+import re
+from typing import TYPE_CHECKING
+
+from flask import Blueprint, Response, jsonify, request
+from sqlalchemy import column, func, literal, literal_column, select, table, union_all
+
+from box_mock.db import db
+from box_mock.models import File, Folder
+from box_mock.routes.folders import subtree_cte
+from box_mock.serialization import load_options, requested_fields
+
+if TYPE_CHECKING:
+    from sqlalchemy import Select
+
+search_bp = Blueprint("search", __name__, url_prefix="/2.0")
+
+DEFAULT_LIMIT = 30
+MAX_LIMIT = 200
+
+_TOKEN = re.compile(r"\w+")
+
+ITEM_TYPES: dict[str, type[Folder | File]] = {"folder": Folder, "file": File}
+
+
+def match_expression(query: str) -> str | None:
+    """
+    Turn a search query into an FTS5 expression matching every word.
+
+    Each word is quoted, so it is taken literally, and matched as a prefix.
+    Returns None when the query has no words.
+    """
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def _matches(item_type: str, expression: str, folder_ids: Select | None) -> Select:
+    """
+    Select the type, ID and rank of the items of a type matching a query.
+
+    With ``folder_ids`` only items directly in one of those folders match.
+    """
+    model = ITEM_TYPES[item_type]
+    fts = table(f"{model.__tablename__}_fts", column("rowid"), column("rank"))
+    parent = model.parent_id if model is Folder else model.folder_id
+    query = (
+        select(
+            literal(item_type).label("type"),
+            model.id.label("id"),
+            fts.c.rank.label("rank"),
+        )
+        .join(fts, fts.c.rowid == literal_column(f"{model.__tablename__}.rowid"))
+        .where(literal_column(fts.name).op("MATCH")(expression))
+    )
+    if model is Folder:
+        query = query.where(Folder.id != "0")
+    if folder_ids is not None:
+        query = query.where(parent.in_(folder_ids))
+    return query
+
+
+@search_bp.route("/search", methods=["GET"])
+def search() -> Response | tuple[Response, int]:
+    """
+    Search files and folders by name.
+
+    Matches come from the FTS5 indexes over item names, best matches first.
+    Supports ``type``, ``ancestor_folder_ids``, ``limit``, ``offset`` and
+    ``fields``; only the requested page of items is loaded.
+    """
+    query = request.args.get("query", "")
+    item_type = request.args.get("type")
+    offset = max(request.args.get("offset", 0, type=int), 0)
+    limit = min(max(request.args.get("limit", DEFAULT_LIMIT, type=int), 1), MAX_LIMIT)
+    if not query or item_type not in {None, *ITEM_TYPES}:
+        return jsonify(
+            {
+                "type": "error",
+                "code": "bad_request",
+                "message": "query is required and type must be file or folder",
+            },
+        ), 400
+
+    expression = match_expression(query)
+    ancestor_ids = [
+        folder_id
+        for folder_id in request.args.get("ancestor_folder_ids", "").split(",")
+        if folder_id
+    ]
+    folder_ids = select(subtree_cte(*ancestor_ids).c.id) if ancestor_ids else None
+    item_types = [item_type] if item_type else list(ITEM_TYPES)
+    entries: list[dict] = []
+    total_count = 0
+    if expression is not None:
+        matches = union_all(
+            *(_matches(t, expression, folder_ids) for t in item_types),
+        ).subquery()
+        total_count = db.read_session.scalar(select(func.count()).select_from(matches))
+        page = db.read_session.execute(
+            select(matches.c.type, matches.c.id)
+            .order_by(matches.c.rank, matches.c.type, matches.c.id)
+            .offset(offset)
+            .limit(limit),
+        ).all()
+
+        fields = requested_fields()
+        items = {}
+        for page_type in item_types:
+            model = ITEM_TYPES[page_type]
+            ids = [row.id for row in page if row.type == page_type]
+            if ids:
+                found = db.read_session.scalars(
+                    select(model)
+                    .where(model.id.in_(ids))
+                    .options(*load_options(model, fields)),
+                )
+                items.update({(page_type, item.id): item for item in found})
+        entries = [items[row.type, row.id].to_dict(fields) for row in page]
+
+    return jsonify(
+        {
+            "type": "search_results_items",
+            "entries": entries,
+            "total_count": total_count,
+            "limit": limit,
+            "offset": offset,
+        },
+    )
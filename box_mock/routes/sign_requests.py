@@ -5,10 +5,12 @@ from __future__ import annotations
 import json
 import uuid
 
-from flask import Blueprint, Response, jsonify, request
+from flask import Blueprint, Response, g, jsonify, request
 
+from box_mock import cache
 from box_mock.db import db
 from box_mock.models import SignRequest
+from box_mock.serialization import requested_fields
 
 sign_requests_bp = Blueprint("sign_requests", __name__, url_prefix="/2.0")
 
@@ -55,14 +57,20 @@ def create_sign_request() -> tuple[Response, int]:
     db.session.add(sign_request)
     db.session.commit()
 
-    return jsonify(sign_request.to_dict()), 201
+    return jsonify(sign_request.to_dict(requested_fields())), 201
 
 
 @sign_requests_bp.route("/sign_requests/<sign_request_id>", methods=["GET"])
 def get_sign_request(sign_request_id: str) -> Response | tuple[Response, int]:
-    """Get a sign request by ID."""
-    sign_request = db.session.get(SignRequest, sign_request_id)
-    if not sign_request:
+    """Get a sign request by ID, limited to the requested ``fields``."""
+    data = cache.get_item(
+        g.get("identity", "default"),
+        db.read_session,
+        SignRequest,
+        sign_request_id,
+        requested_fields(),
+    )
+    if data is None:
         return jsonify(
             {
                 "type": "error",
@@ -71,4 +79,4 @@ def get_sign_request(sign_request_id: str) -> Response | tuple[Response, int]:
             },
         ), 404
 
-    return jsonify(sign_request.to_dict())
+    return jsonify(data)
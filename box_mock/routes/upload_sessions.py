@@ -0,0 +1,346 @@
+"""Chunked upload session routes for Box Mock API."""
+
+from __future__ import annotations
+
+import base64
+import binascii
+import re
+import shutil
+import uuid
+from typing import TYPE_CHECKING
+
+from flask import Blueprint, Response, jsonify, request, url_for
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
+
+from box_mock import etags, storage
+from box_mock.db import db
+from box_mock.models import File, Folder, UploadPart, UploadSession
+from box_mock.routes.files import (
+    commit_upload,
+    get_identity,
+    handle_integrity_error,
+    name_conflict,
+)
+
+if TYPE_CHECKING:
+    from collections.abc import Iterator
+    from pathlib import Path
+    from typing import BinaryIO
+
+upload_sessions_bp = Blueprint("upload_sessions", __name__, url_prefix="/2.0")
+
+PART_SIZE = 8 * 1024 * 1024
+
+_CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+upload_sessions_bp.register_error_handler(IntegrityError, handle_integrity_error)
+upload_sessions_bp.register_error_handler(StaleDataError, etags.handle_stale_data)
+
+
+def _not_found() -> tuple[Response, int]:
+    """Build the error response for an unknown upload session."""
+    return jsonify(
+        {"type": "error", "code": "not_found", "message": "Upload session not found"},
+    ), 404
+
+
+def _error(status: int, code: str, message: str) -> tuple[Response, int]:
+    """Build an error response."""
+    return jsonify({"type": "error", "code": code, "message": message}), status
+
+
+def _parse_digest() -> str | None:
+    """Return the hex SHA-1 from a ``Digest: sha=<base64>`` header."""
+    algorithm, _, value = request.headers.get("Digest", "").partition("=")
+    if algorithm.strip().lower() != "sha" or not value:
+        return None
+    try:
+        return base64.b64decode(value.strip(), validate=True).hex()
+    except binascii.Error:
+        return None
+
+
+def _parse_part_range(session: UploadSession) -> tuple[int, int] | None:
+    """
+    Return the inclusive byte range from the Content-Range header.
+
+    The range must start on a part boundary and cover a full part, or the
+    tail of the file for the last part.
+    """
+    match = _CONTENT_RANGE.match(request.headers.get("Content-Range", ""))
+    if not match:
+        return None
+    start, end, total = (int(n) for n in match.groups())
+    expected_end = min(start + session.part_size, session.file_size) - 1
+    if total != session.file_size or start % session.part_size or end != expected_end:
+        return None
+    return start, end
+
+
+def _session_dict(session: UploadSession) -> dict:
+    """Convert an upload session to a response including its endpoints."""
+    endpoint = url_for(
+        "upload_sessions.get_upload_session",
+        session_id=session.id,
+        _external=True,
+    )
+    data = session.to_dict()
+    data["session_endpoints"] = {
+        "upload_part": endpoint,
+        "commit": f"{endpoint}/commit",
+        "abort": endpoint,
+        "list_parts": f"{endpoint}/parts",
+        "status": endpoint,
+    }
+    return data
+
+
+def _start_session(
+    file_size: object,
+    folder_id: str | None = None,
+    file_id: str | None = None,
+    file_name: str | None = None,
+) -> tuple[Response, int]:
+    """Create an upload session for a new file or a new version."""
+    if not isinstance(file_size, int) or file_size <= 0:
+        return _error(400, "bad_request", "file_size must be a positive integer")
+
+    session = UploadSession(
+        folder_id=folder_id,
+        file_id=file_id,
+        file_name=file_name,
+        file_size=file_size,
+        part_size=PART_SIZE,
+    )
+    db.session.add(session)
+    db.session.commit()
+    return jsonify(_session_dict(session)), 201
+
+
+@upload_sessions_bp.route("/files/upload_sessions", methods=["POST"])
+def preflight_check() -> tuple[Response, int]:
+    """
+    Create an upload session for a new file.
+
+    Requests without ``file_size`` are treated as a name-conflict preflight
+    check and only return an upload token.
+    """
+    data = request.get_json()
+    if "file_size" not in data:
+        name = data.get("name")
+        parent_id = data.get("parent", {}).get("id", "0")
+    else:
+        name = data.get("file_name")
+        parent_id = data.get("folder_id", "0")
+
+    folder = db.session.get(Folder, parent_id)
+    if not folder:
+        return jsonify(
+            {"type": "error", "code": "not_found", "message": "Folder not found"},
+        ), 404
+
+    conflict = name_conflict(parent_id, name)
+    if conflict:
+        return conflict
+
+    if "file_size" not in data:
+        return jsonify({"upload_token": str(uuid.uuid4())}), 200
+    return _start_session(data["file_size"], folder_id=parent_id, file_name=name)
+
+
+@upload_sessions_bp.route("/files/<file_id>/upload_sessions", methods=["POST"])
+def create_version_upload_session(file_id: str) -> tuple[Response, int]:
+    """Create an upload session for a new version of an existing file."""
+    file = db.session.get(File, file_id)
+    if not file:
+        return jsonify(
+            {"type": "error", "code": "not_found", "message": "File not found"},
+        ), 404
+
+    data = request.get_json()
+    return _start_session(
+        data.get("file_size"),
+        file_id=file_id,
+        file_name=data.get("file_name"),
+    )
+
+
+@upload_sessions_bp.route("/files/upload_sessions/<session_id>", methods=["GET"])
+def get_upload_session(session_id: str) -> Response | tuple[Response, int]:
+    """Get upload session status."""
+    session = db.read_session.get(UploadSession, session_id)
+    if not session:
+        return _not_found()
+    return jsonify(_session_dict(session))
+
+
+@upload_sessions_bp.route("/files/upload_sessions/<session_id>", methods=["PUT"])
+def upload_part(session_id: str) -> Response | tuple[Response, int]:
+    """
+    Upload one part of a session.
+
+    The part is streamed to its own file, so parts of the same session can be
+    uploaded in parallel. Re-uploading a part replaces it.
+    """
+    session = db.session.get(UploadSession, session_id)
+    if not session:
+        return _not_found()
+
+    part_range = _parse_part_range(session)
+    if part_range is None:
+        return _error(416, "range_not_satisfiable", "Content-Range does not match part")
+    start, end = part_range
+
+    digest = _parse_digest()
+    if digest is None:
+        return _error(400, "bad_digest", "Missing or invalid Digest header")
+
+    session_dir = storage.get_upload_session_dir(get_identity(), session_id)
+    tmp_path, sha1, size = storage.write_temp_file(session_dir, [request.stream])
+    if size != end - start + 1:
+        tmp_path.unlink()
+        return _error(416, "range_not_satisfiable", "Body size does not match range")
+    if sha1 != digest:
+        tmp_path.unlink()
+        return _error(412, "precondition_failed", "Part digest does not match")
+
+    db.session.query(UploadPart).filter_by(session_id=session_id, offset=start).delete()
+    part = UploadPart(session_id=session_id, offset=start, size=size, sha1=sha1)
+    db.session.add(part)
+    db.session.commit()
+    tmp_path.replace(session_dir / str(start))
+
+    return jsonify({"part": part.to_dict()})
+
+
+@upload_sessions_bp.route("/files/upload_sessions/<session_id>/parts", methods=["GET"])
+def list_parts(session_id: str) -> Response | tuple[Response, int]:
+    """List uploaded parts of a session, ordered by offset."""
+    session = db.read_session.get(UploadSession, session_id)
+    if not session:
+        return _not_found()
+
+    offset = request.args.get("offset", 0, type=int)
+    limit = request.args.get("limit", 1000, type=int)
+    parts = session.parts
+    return jsonify(
+        {
+            "entries": [p.to_dict() for p in parts[offset : offset + limit]],
+            "offset": offset,
+            "limit": limit,
+            "total_count": len(parts),
+        },
+    )
+
+
+def _read_parts(paths: list[Path]) -> Iterator[BinaryIO]:
+    """Open part files one at a time, in order."""
+    for path in paths:
+        with path.open("rb") as f:
+            yield f
+
+
+def _check_target(
+    session: UploadSession,
+    file: File | None,
+    folder_id: str,
+    name: str | None,
+) -> tuple[Response, int] | None:
+    """Return the error response if a session cannot be committed as named."""
+    if session.file_id and not file:
+        return _error(404, "not_found", "File not found")
+    if not db.session.get(Folder, folder_id):
+        return _error(404, "not_found", "Parent folder not found")
+    return (file and etags.check_if_match(str(file.etag))) or (
+        name and name_conflict(folder_id, name, session.file_id)
+    )
+
+
+@upload_sessions_bp.route(
+    "/files/upload_sessions/<session_id>/commit",
+    methods=["POST"],
+)
+def commit_session(session_id: str) -> tuple[Response, int]:
+    """
+    Assemble the uploaded parts into a file or a new file version.
+
+    Parts are streamed into the blob store one after another, so memory use
+    does not depend on the file size. A new version is only committed if
+    ``If-Match`` is absent or names the file's current etag.
+    """
+    session = db.session.get(UploadSession, session_id)
+    if not session:
+        return _not_found()
+
+    digest = _parse_digest()
+    if digest is None:
+        return _error(400, "bad_digest", "Missing or invalid Digest header")
+
+    data = request.get_json() or {}
+    uploaded = [p.to_dict() for p in session.parts]
+    committed = sorted(data.get("parts", []), key=lambda p: p.get("offset", 0))
+    if committed != uploaded or sum(p["size"] for p in uploaded) != session.file_size:
+        return _error(400, "bad_request", "Parts do not cover the whole file")
+
+    attributes = data.get("attributes", {})
+    name = attributes.get("name") or session.file_name
+    file = db.session.get(File, session.file_id) if session.file_id else None
+    folder_id = (
+        file.folder_id
+        if file
+        else attributes.get("parent", {}).get("id") or session.folder_id
+    )
+    error = _check_target(session, file, folder_id, name)
+    if error:
+        return error
+
+    session_dir = storage.get_upload_session_dir(get_identity(), session_id)
+    paths = [session_dir / str(p["offset"]) for p in uploaded]
+    tmp_path, sha1, size = storage.write_temp_blob(get_identity(), _read_parts(paths))
+    if sha1 != digest:
+        tmp_path.unlink()
+        return _error(412, "precondition_failed", "File digest does not match")
+
+    old_sha1 = legacy_id = None
+    if file:
+        old_sha1 = file.sha1
+        legacy_id = None if old_sha1 else file.id
+        file.version += 1
+        file.size = size
+        file.sha1 = sha1
+        if name:
+            file.name = name
+    else:
+        file = File(
+            name=name or "unnamed_file",
+            folder_id=folder_id,
+            size=size,
+            sha1=sha1,
+        )
+        db.session.add(file)
+
+    db.session.delete(session)
+    commit_upload(tmp_path, sha1)
+    if legacy_id:
+        storage.remove_content(get_identity(), file_ids=[legacy_id])
+    storage.release_blobs(get_identity(), db.session, [old_sha1])
+    shutil.rmtree(session_dir, ignore_errors=True)
+
+    return jsonify({"entries": [file.to_dict()], "total_count": 1}), 201
+
+
+@upload_sessions_bp.route("/files/upload_sessions/<session_id>", methods=["DELETE"])
+def abort_session(session_id: str) -> tuple[Response, int] | tuple[str, int]:
+    """Abort an upload session and discard its parts."""
+    session = db.session.get(UploadSession, session_id)
+    if not session:
+        return _not_found()
+
+    db.session.delete(session)
+    db.session.commit()
+    shutil.rmtree(
+        storage.get_upload_session_dir(get_identity(), session_id),
+        ignore_errors=True,
+    )
+    return "", 204
@@ -2,14 +2,30 @@
 
 from __future__ import annotations
 
-from flask import Blueprint, Response, jsonify, request
-from sqlalchemy import or_
+import re
+from typing import TYPE_CHECKING
 
+from flask import Blueprint, Response, g, jsonify, request
+from sqlalchemy import column, false, func, literal_column, or_, select, table
+
+from box_mock import cache, pagination
 from box_mock.db import db
 from box_mock.models import User
+from box_mock.serialization import load_options, requested_fields
+
+if TYPE_CHECKING:
+    from sqlalchemy import Select
 
 users_bp = Blueprint("users", __name__, url_prefix="/2.0")
 
+USER_SORTS = {"id", "name"}
+USER_TYPES = {"all", "managed", "external"}
+EMAIL = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+# Shortest term the trigram index can match.
+TRIGRAM = 3
+
+users_fts = table("users_fts", column("rowid"))
+
 
 @users_bp.route("/users/me", methods=["GET"])
 def get_current_user() -> Response:
@@ -19,24 +35,114 @@ def get_current_user() -> Response:
         user = User(name="Box Mock Service", login="service@boxmock.local")
         db.session.add(user)
         db.session.commit()
-    return jsonify(user.to_dict())
+    return jsonify(user.to_dict(requested_fields()))
 
 
-@users_bp.route("/users", methods=["GET"])
-def list_users() -> Response:
-    """List users, optionally filtered by filter_term."""
-    filter_term = request.args.get("filter_term", "")
-    query = db.session.query(User)
-    if filter_term:
-        query = query.filter(
+def _matching_users(filter_term: str, user_type: str) -> Select:
+    """
+    Select users of ``user_type`` whose name, email or login has ``filter_term``.
+
+    A full email address is first matched exactly, through the email and
+    login indexes. Other terms of three or more characters are looked up in
+    the trigram index; shorter ones, which it cannot match, fall back to a
+    scan.
+    """
+    if user_type not in USER_TYPES:
+        msg = "user_type must be all, managed or external"
+        raise pagination.PaginationError(msg)
+    query = select(User)
+    if user_type == "external":
+        # Every user of the mock belongs to its enterprise.
+        query = query.where(false())
+    if not filter_term:
+        return query
+    if EMAIL.match(filter_term):
+        exact = query.where(or_(User.email == filter_term, User.login == filter_term))
+        if db.read_session.scalar(exact.with_only_columns(User.id).limit(1)):
+            return exact
+    if len(filter_term) < TRIGRAM:
+        pattern = f"%{filter_term}%"
+        return query.where(
             or_(
-                User.name.ilike(f"%{filter_term}%"),
-                User.email.ilike(f"%{filter_term}%"),
-                User.login.ilike(f"%{filter_term}%"),
+                User.name.ilike(pattern),
+                User.email.ilike(pattern),
+                User.login.ilike(pattern),
             ),
         )
-    users = query.all()
-    return jsonify({"entries": [u.to_dict() for u in users], "total_count": len(users)})
+    phrase = '"{}"'.format(filter_term.replace('"', '""'))
+    matches = select(users_fts.c.rowid).where(
+        literal_column(users_fts.name).op("MATCH")(phrase),
+    )
+    return query.where(literal_column("users.rowid").in_(matches))
+
+
+def _offset_page(query: Select, page: pagination.Page) -> dict:
+    """Return one offset page of users with the total count."""
+    total_count = db.read_session.scalar(
+        select(func.count()).select_from(query.order_by(None).subquery()),
+    )
+    users = db.read_session.scalars(query.offset(page.offset).limit(page.limit))
+    fields = requested_fields()
+    return {
+        "entries": [u.to_dict(fields) for u in users],
+        "total_count": total_count,
+        "offset": page.offset,
+        "limit": page.limit,
+    }
+
+
+def _marker_page(query: Select, columns: list, page: pagination.Page) -> dict:
+    """Return one keyset page of users and the marker of the next one."""
+    marker = page.marker or {"sort": page.sort, "after": None}
+    if marker.get("sort") != page.sort:
+        msg = "Marker does not match this listing"
+        raise pagination.PaginationError(msg)
+    if marker.get("after") is not None:
+        query = query.where(
+            pagination.after(columns, marker["after"], descending=page.descending),
+        )
+
+    # One extra row tells whether there is a next page.
+    users = list(db.read_session.scalars(query.limit(page.limit + 1)))
+    next_marker = None
+    if len(users) > page.limit:
+        last = users[page.limit - 1]
+        next_marker = pagination.encode_marker(
+            {"sort": page.sort, "after": [getattr(last, c.key) for c in columns]},
+        )
+    fields = requested_fields()
+    return {
+        "entries": [u.to_dict(fields) for u in users[: page.limit]],
+        "limit": page.limit,
+        "next_marker": next_marker,
+    }
+
+
+@users_bp.route("/users", methods=["GET"])
+def list_users() -> Response | tuple[Response, int]:
+    """
+    List users, optionally filtered by ``filter_term`` and ``user_type``.
+
+    Supports offset paging and, with ``usemarker=true``, marker paging; only
+    the requested page is loaded.
+    """
+    try:
+        page = pagination.parse_page(USER_SORTS, "name")
+        query = _matching_users(
+            request.args.get("filter_term", ""),
+            request.args.get("user_type", "all"),
+        )
+        columns = (
+            [User.id] if page.sort == "id" else [getattr(User, page.sort), User.id]
+        )
+        query = query.options(*load_options(User, requested_fields())).order_by(
+            *pagination.order_by(columns, descending=page.descending),
+        )
+        if page.use_marker:
+            return jsonify(_marker_page(query, columns, page))
+        return jsonify(_offset_page(query, page))
+    except pagination.PaginationError as e:
+        return jsonify({"type": "error", "code": "bad_request", "message": str(e)}), 400
 
 
 @users_bp.route("/users", methods=["POST"])
@@ -52,18 +158,24 @@ def create_user() -> tuple[Response, int]:
     )
     db.session.add(user)
     db.session.commit()
-    return jsonify(user.to_dict()), 201
+    return jsonify(user.to_dict(requested_fields())), 201
 
 
 @users_bp.route("/users/<user_id>", methods=["GET"])
 def get_user(user_id: str) -> Response | tuple[Response, int]:
-    """Get user by ID."""
-    user = db.session.get(User, user_id)
-    if not user:
+    """Get user by ID, limited to the requested ``fields``."""
+    data = cache.get_item(
+        g.get("identity", "default"),
+        db.read_session,
+        User,
+        user_id,
+        requested_fields(),
+    )
+    if data is None:
         return jsonify(
             {"type": "error", "code": "not_found", "message": "User not found"},
         ), 404
-    return jsonify(user.to_dict())
+    return jsonify(data)
 
 
 @users_bp.route("/users/<user_id>", methods=["DELETE"])
@@ -76,4 +188,5 @@ def delete_user(user_id: str) -> tuple[Response, int] | tuple[str, int]:
         ), 404
     db.session.delete(user)
     db.session.commit()
+    cache.invalidate(g.get("identity", "default"), User, user_id)
     return "", 204
@@ -0,0 +1,162 @@
+"""
+Rendering of models as Box objects, and the app's JSON provider.
+
+Each model declares its fields once, with the getter that renders a field and
+the columns it reads. Renderers for a given ``fields`` selection are built on
+first use and cached, so a request asking for a few fields neither loads nor
+formats the others. Datetimes are left to the JSON provider, which renders
+them in ISO 8601 and uses orjson when it is installed.
+"""
+
+from __future__ import annotations
+
+import functools
+import json
+from datetime import date
+from operator import attrgetter
+from typing import TYPE_CHECKING, Any, ClassVar, NamedTuple
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy.orm import load_only
+
+from box_mock import config
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from flask import Response
+    from sqlalchemy.orm import InstrumentedAttribute
+    from sqlalchemy.sql.base import ExecutableOption
+
+
+class Field(NamedTuple):
+    """How one field of a Box object is rendered and which columns it reads."""
+
+    get: Callable[[Any], Any]
+    columns: tuple[str, ...] = ()
+
+
+def column(name: str) -> Field:
+    """Render a column as it is stored."""
+    return Field(attrgetter(name), (name,))
+
+
+def constant(value: object) -> Field:
+    """Render the same value for every row."""
+    return Field(lambda _: value)
+
+
+def folder_reference(name: str) -> Field:
+    """Render a folder ID column as a mini folder object, or None."""
+
+    def get(row: object) -> dict[str, str] | None:
+        folder_id = getattr(row, name)
+        return {"type": "folder", "id": folder_id} if folder_id else None
+
+    return Field(get, (name,))
+
+
+def etag_field() -> Field:
+    """Render the ``etag`` version counter as the string Box sends."""
+    return Field(lambda row: str(row.etag or 0), ("etag",))
+
+
+@functools.lru_cache(maxsize=1024)
+def _renderers(
+    model: type[Serializable],
+    fields: frozenset[str] | None,
+) -> tuple[tuple[str, Callable[[Any], Any]], ...]:
+    """Return the ``(name, getter)`` pairs rendering ``fields`` of ``model``."""
+    return tuple(
+        (name, field.get)
+        for name, field in model.FIELDS.items()
+        if fields is None or name in fields or name in model.REQUIRED_FIELDS
+    )
+
+
+class Serializable:
+    """Mixin rendering a model as a Box object, optionally limited to fields."""
+
+    FIELDS: ClassVar[dict[str, Field]]
+    # Rendered whatever fields are requested, as Box does.
+    REQUIRED_FIELDS: ClassVar[frozenset[str]] = frozenset({"type", "id"})
+
+    def to_dict(self, fields: frozenset[str] | None = None) -> dict[str, Any]:
+        """Convert to a Box object with every field, or only ``fields``."""
+        return {name: get(self) for name, get in _renderers(type(self), fields)}
+
+    @classmethod
+    def load_columns(cls, fields: frozenset[str] | None) -> list[InstrumentedAttribute]:
+        """Return the columns needed to render ``fields``, for ``load_only``."""
+        names = {"id"}
+        for name, field in cls.FIELDS.items():
+            if fields is None or name in fields or name in cls.REQUIRED_FIELDS:
+                names.update(field.columns)
+        return [getattr(cls, name) for name in sorted(names)]
+
+
+def requested_fields() -> frozenset[str] | None:
+    """Return the fields named by the ``fields`` query parameter, if any."""
+    fields = request.args.get("fields")
+    if not fields:
+        return None
+    return frozenset(name.strip() for name in fields.split(",") if name.strip())
+
+
+def load_options(
+    model: type[Serializable],
+    fields: frozenset[str] | None,
+) -> list[ExecutableOption]:
+    """Return query options loading only the columns ``fields`` need."""
+    if fields is None:
+        return []
+    return [load_only(*model.load_columns(fields))]
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Compact JSON provider, backed by orjson when it is installed.
+
+    ``config.JSON_BACKEND`` set to "stdlib" forces the ``json`` module. Either
+    way datetimes are rendered in ISO 8601, matching ``datetime.isoformat``.
+    """
+
+    sort_keys = False
+    compact = True
+    ensure_ascii = False
+
+    @staticmethod
+    def default(o: object) -> Any:  # noqa: ANN401
+        """Render types JSON has no representation for."""
+        if isinstance(o, date):
+            return o.isoformat()
+        return DefaultJSONProvider.default(o)
+
+    def dumps(self, obj: object, **kwargs: Any) -> str:  # noqa: ANN401
+        """Serialize ``obj`` to a JSON string."""
+        if orjson is None or config.JSON_BACKEND != "orjson" or kwargs:
+            kwargs.setdefault("default", self.default)
+            kwargs.setdefault("ensure_ascii", self.ensure_ascii)
+            kwargs.setdefault("separators", (",", ":"))
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default).decode()
+
+    def response(self, *args: object, **kwargs: object) -> Response:
+        """Serialize the arguments into an ``application/json`` response."""
+        if args and kwargs:
+            msg = "Pass either positional or keyword arguments, not both"
+            raise TypeError(msg)
+        obj = (args[0] if len(args) == 1 else list(args)) if args else kwargs
+        if orjson is None or config.JSON_BACKEND != "orjson":
+            body: str | bytes = self.dumps(obj) + "\n"
+        else:
+            body = orjson.dumps(
+                obj, default=self.default, option=orjson.OPT_APPEND_NEWLINE
+            )
+        return self._app.response_class(body, mimetype=self.mimetype)
@@ -0,0 +1,96 @@
+"""
+Production server: a gunicorn master forking threaded worker processes.
+
+Each worker creates its own app, so engines, caches and background threads
+belong to one process. Identity databases and blobs on disk are shared by
+all workers, which serialize bootstrap and blob placement with file locks.
+Two settings cannot be shared: in-memory identities only exist in the memory
+of one process, and the item cache of a worker would keep serving items that
+another worker has changed, so it is disabled when there are several.
+
+On SIGTERM the master stops accepting connections and gives workers up to
+``GRACEFUL_TIMEOUT`` seconds to finish their requests. Workers then exit
+normally, running their exit handlers: in-memory checkpoints, pending
+content removals and the log writer's flush.
+"""
+
+from __future__ import annotations
+
+import logging
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from gunicorn.app.base import BaseApplication
+
+from box_mock import config
+
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
+    from flask import Flask
+
+logger = logging.getLogger(__name__)
+
+
+class ServerConfigError(ValueError):
+    """Settings the server cannot run with."""
+
+
+def check_worker_settings() -> None:
+    """
+    Check the settings against the number of worker processes.
+
+    Raises ``ServerConfigError`` for in-memory mode with several workers, and
+    disables the item cache when there are several.
+    """
+    if config.WORKERS < 1 or config.THREADS < 1:
+        msg = "The server needs at least one worker and one thread"
+        raise ServerConfigError(msg)
+    if config.WORKERS == 1:
+        return
+    if config.IN_MEMORY:
+        msg = "In-memory mode keeps identities in one process; use a single worker"
+        raise ServerConfigError(msg)
+    if config.ITEM_CACHE_SIZE:
+        logger.warning("Item cache disabled: it is not shared between workers")
+        config.ITEM_CACHE_SIZE = 0
+
+
+class BoxMockServer(BaseApplication):
+    """Gunicorn application creating the Flask app in each worker."""
+
+    def __init__(
+        self, app_factory: Callable[[], Flask], options: dict[str, Any]
+    ) -> None:
+        """Configure a server running the app made by ``app_factory``."""
+        self.app_factory = app_factory
+        self.options = options
+        super().__init__()
+
+    def load_config(self) -> None:
+        """Apply the server options to the gunicorn configuration."""
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+    def load(self) -> Flask:
+        """Create the app, in the worker process serving it."""
+        return self.app_factory()
+
+
+def serve(app_factory: Callable[[], Flask], host: str, port: int) -> None:
+    """Serve the app with the configured workers until the server is stopped."""
+    check_worker_settings()
+    BoxMockServer(
+        app_factory,
+        {
+            "bind": f"{host}:{port}",
+            "workers": config.WORKERS,
+            "threads": config.THREADS,
+            "worker_class": "gthread",
+            "graceful_timeout": config.GRACEFUL_TIMEOUT,
+            # Requests are logged by the app.
+            "accesslog": None,
+            # Worker heartbeats are files; keep them off container overlays.
+            **({"worker_tmp_dir": "/dev/shm"} if Path("/dev/shm").is_dir() else {}),
+        },
+    ).run()
@@ -0,0 +1,79 @@
+"""
+Named per-identity snapshots for instant restore.
+
+A snapshot is a copy of the identity's database, taken with the SQLite backup
+API, plus hardlinks to its blobs. Blobs are immutable, so linking them shares
+storage with the live identity and makes both capture and restore independent
+of content size.
+"""
+
+from __future__ import annotations
+
+import re
+import shutil
+import sqlite3
+import tempfile
+from pathlib import Path
+
+from box_mock import storage
+from box_mock.db import backup_database, get_identity_dir, restore_database
+
+SNAPSHOT_NAME = re.compile(r"^[A-Za-z0-9][A-Za-z0-9._-]*$")
+
+
+def get_snapshots_dir(identity: str) -> Path:
+    """Get the directory holding an identity's snapshots."""
+    return get_identity_dir(identity) / "snapshots"
+
+
+def list_snapshots(identity: str) -> list[str]:
+    """List the names of an identity's snapshots."""
+    snapshots_dir = get_snapshots_dir(identity)
+    if not snapshots_dir.exists():
+        return []
+    return sorted(
+        path.name
+        for path in snapshots_dir.iterdir()
+        if SNAPSHOT_NAME.match(path.name) and (path / "box.db").exists()
+    )
+
+
+def create_snapshot(identity: str, name: str) -> None:
+    """
+    Capture an identity's database and blobs as snapshot ``name``.
+
+    An existing snapshot with the same name is replaced. In-progress upload
+    sessions are not captured.
+    """
+    snapshots_dir = get_snapshots_dir(identity)
+    snapshots_dir.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=snapshots_dir, prefix=f".{name}-"))
+
+    backup_database(identity, staging / "box.db")
+    connection = sqlite3.connect(staging / "box.db")
+    try:
+        connection.execute("DELETE FROM upload_parts")
+        connection.execute("DELETE FROM upload_sessions")
+        connection.commit()
+    finally:
+        connection.close()
+    storage.link_tree(storage.get_files_dir(identity), staging / "files")
+
+    snapshot_dir = snapshots_dir / name
+    if snapshot_dir.exists():
+        old = staging.with_name(f"{staging.name}-old")
+        snapshot_dir.replace(old)
+        shutil.rmtree(old)
+    staging.replace(snapshot_dir)
+
+
+def restore_snapshot(identity: str, name: str) -> bool:
+    """Restore an identity to snapshot ``name``. Returns False if it is missing."""
+    snapshot_dir = get_snapshots_dir(identity) / name
+    if not (snapshot_dir / "box.db").exists():
+        return False
+
+    restore_database(identity, snapshot_dir / "box.db")
+    storage.replace_files(identity, snapshot_dir / "files")
+    shutil.rmtree(get_identity_dir(identity) / "upload_sessions", ignore_errors=True)
+    return True
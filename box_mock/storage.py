@@ -0,0 +1,445 @@
+"""
+Content-addressed blob storage for file contents.
+
+Blobs live under ``data/{identity}/files/`` and are named by the SHA-1 of their
+content, so identical uploads and file copies share a single blob. A blob is
+referenced by every ``File`` row carrying its ``sha1`` and is removed once the
+last of those rows is gone.
+
+Blobs are nested in ``config.FANOUT_DEPTH`` levels of directories named after
+their leading characters. A marker file records the depth a directory was laid
+out with, and blobs are moved into place the first time a directory with a
+different layout is used.
+
+Inside ``defer_removals`` content is recorded instead of removed, for work
+whose commit may still be rolled back; the caller removes it once the outcome
+is known.
+
+Placing and releasing blobs and changing a layout also lock out the other
+server processes, through lock files in the identity's directory.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, BinaryIO, NamedTuple
+
+from sqlalchemy import select
+
+from box_mock import config, locks
+
+if TYPE_CHECKING:
+    from collections.abc import Iterable, Iterator
+
+    from sqlalchemy.orm import Session
+
+    from box_mock.models import File
+
+CHUNK_SIZE = 1024 * 1024
+LAYOUT_MARKER = ".layout"
+BLOB_LOCK = ".blobs.lock"
+LAYOUT_LOCK = ".layout.lock"
+# Blobs checked for remaining references per query and lock acquisition.
+RELEASE_BATCH_SIZE = 500
+
+logger = logging.getLogger(__name__)
+
+# Serializes "is this blob still referenced?" checks against blob placement so a
+# blob being re-added by one request is never unlinked by another.
+_blob_lock = threading.Lock()
+_layout_lock = threading.Lock()
+# Single worker, so queued removals run in order and wait_for_removals works.
+_removal_executor = ThreadPoolExecutor(
+    max_workers=1,
+    thread_name_prefix="box-mock-removal",
+)
+_checked_layouts: set[tuple[Path, int]] = set()
+
+
+class PendingRemovals(NamedTuple):
+    """Content recorded instead of removed inside ``defer_removals``."""
+
+    sha1s: list[str]
+    file_ids: list[str]
+    session_ids: list[str]
+    # Blobs stored meanwhile, orphaned if the work is rolled back.
+    added_sha1s: list[str]
+
+
+_pending_removals: ContextVar[PendingRemovals | None] = ContextVar(
+    "pending_removals",
+    default=None,
+)
+
+
+@contextmanager
+def defer_removals() -> Iterator[PendingRemovals]:
+    """Record instead of remove the content released in this context."""
+    pending = PendingRemovals([], [], [], [])
+    token = _pending_removals.set(pending)
+    try:
+        yield pending
+    finally:
+        _pending_removals.reset(token)
+
+
+def _defer(
+    sha1s: Iterable[str] = (),
+    file_ids: Iterable[str] = (),
+    session_ids: Iterable[str] = (),
+) -> bool:
+    """Record content to remove if removals are deferred; return whether so."""
+    pending = _pending_removals.get()
+    if pending is None:
+        return False
+    pending.sha1s.extend(filter(None, sha1s))
+    pending.file_ids.extend(file_ids)
+    pending.session_ids.extend(session_ids)
+    return True
+
+
+@contextmanager
+def _layout_lock_for(files_dir: Path) -> Iterator[None]:
+    """Hold the lock on the layout of a blob directory."""
+    with _layout_lock, locks.file_lock(files_dir.parent / LAYOUT_LOCK):
+        yield
+
+
+def _write_layout_marker(files_dir: Path) -> None:
+    """Record the configured depth as the layout of a blob directory."""
+    # Snapshots may share the marker; replace it rather than writing into it.
+    marker = files_dir / LAYOUT_MARKER
+    temp = marker.with_name(f"{LAYOUT_MARKER}.tmp")
+    temp.write_text(str(config.FANOUT_DEPTH))
+    temp.replace(marker)
+
+
+def _fix_layout(files_dir: Path) -> None:
+    """Lay out a blob directory for the configured depth, if it is not yet."""
+    marker = files_dir / LAYOUT_MARKER
+    if not marker.exists() or marker.read_text() != str(config.FANOUT_DEPTH):
+        relayout_blobs(files_dir)
+
+
+def get_files_dir(identity: str) -> Path:
+    """Get the blob directory for an identity, migrating its layout if needed."""
+    from box_mock.db import get_identity_dir  # noqa: PLC0415
+
+    files_dir = get_identity_dir(identity) / "files"
+    key = (files_dir, config.FANOUT_DEPTH)
+    if key not in _checked_layouts:
+        with _layout_lock_for(files_dir):
+            if key not in _checked_layouts:
+                files_dir.mkdir(parents=True, exist_ok=True)
+                _fix_layout(files_dir)
+                _checked_layouts.add(key)
+    return files_dir
+
+
+@contextmanager
+def _blob_lock_for(identity: str) -> Iterator[None]:
+    """Hold the lock serializing placement and release of an identity's blobs."""
+    with _blob_lock, locks.file_lock(get_files_dir(identity).parent / BLOB_LOCK):
+        yield
+
+
+def _shard_path(files_dir: Path, name: str) -> Path:
+    """Get the path of blob ``name`` under the configured fan-out depth."""
+    shards = [name[i : i + 2] for i in range(0, 2 * config.FANOUT_DEPTH, 2)]
+    return files_dir.joinpath(*shards, name)
+
+
+def relayout_blobs(files_dir: Path) -> int:
+    """
+    Move every blob under ``files_dir`` to its path for the configured depth.
+
+    Handles the flat layout as well as any other fan-out depth, removes shard
+    directories left empty and records the new depth. Returns the number of
+    blobs moved.
+    """
+    moved = 0
+    for path in [p for p in files_dir.rglob("*") if p.is_file()]:
+        if path.name.startswith("."):
+            continue
+        target = _shard_path(files_dir, path.name)
+        if target != path:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            path.replace(target)
+            moved += 1
+
+    directories = [p for p in files_dir.rglob("*") if p.is_dir()]
+    for directory in sorted(directories, key=lambda p: len(p.parts), reverse=True):
+        if not any(directory.iterdir()):
+            directory.rmdir()
+
+    _write_layout_marker(files_dir)
+    return moved
+
+
+def get_blob_path(identity: str, name: str) -> Path:
+    """Get filesystem path for a blob, named by SHA-1 or legacy file ID."""
+    return _shard_path(get_files_dir(identity), name)
+
+
+def get_content_path(identity: str, file: File) -> Path:
+    """Get filesystem path holding a file's current content."""
+    # Files uploaded before content addressing are stored under their own ID.
+    return get_blob_path(identity, file.sha1 or file.id)
+
+
+def get_upload_session_dir(identity: str, session_id: str) -> Path:
+    """Get the directory holding the parts of a chunked upload session."""
+    from box_mock.db import get_identity_dir  # noqa: PLC0415
+
+    session_dir = get_identity_dir(identity) / "upload_sessions" / session_id
+    session_dir.mkdir(parents=True, exist_ok=True)
+    return session_dir
+
+
+def write_temp_file(
+    directory: Path,
+    streams: Iterable[BinaryIO],
+) -> tuple[Path, str, int]:
+    """
+    Copy streams, in order, into a new temp file in ``directory``.
+
+    Content is read in fixed-size chunks and hashed on the way through, so
+    memory use does not depend on the stream length. Returns the temp path,
+    the content SHA-1 and the size in bytes.
+    """
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".upload-")
+    digest = hashlib.sha1()
+    size = 0
+    with os.fdopen(fd, "wb") as out:
+        for stream in streams:
+            while chunk := stream.read(CHUNK_SIZE):
+                out.write(chunk)
+                digest.update(chunk)
+                size += len(chunk)
+    return Path(tmp_name), digest.hexdigest(), size
+
+
+class HashingTempFile:
+    """
+    Temp file in a blob directory that hashes what is written to it.
+
+    Request parsing writes uploaded parts into these, so content lands in the
+    blob directory once and is moved into the store without another copy.
+    The file is removed when closed, unless ``claim`` handed it over first.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        """Create the temp file in ``directory``."""
+        fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        self.path = Path(tmp_name)
+        self.size = 0
+        self._file = os.fdopen(fd, "w+b")
+        self._digest = hashlib.sha1()
+        self._claimed = False
+
+    def write(self, data: bytes) -> int:
+        """Append ``data``, hashing it on the way through."""
+        self._digest.update(data)
+        self.size += len(data)
+        return self._file.write(data)
+
+    def __getattr__(self, name: str) -> Any:  # noqa: ANN401
+        """Read, seek and so on like the underlying file."""
+        return getattr(self._file, name)
+
+    def claim(self) -> tuple[Path, str, int]:
+        """Close the file and return its path, SHA-1 and size; it is kept."""
+        self._claimed = True
+        self._file.close()
+        return self.path, self._digest.hexdigest(), self.size
+
+    def close(self) -> None:
+        """Close the file, removing it unless it was claimed."""
+        self._file.close()
+        if not self._claimed:
+            self.path.unlink(missing_ok=True)
+
+
+def write_temp_blob(
+    identity: str,
+    streams: Iterable[BinaryIO],
+) -> tuple[Path, str, int]:
+    """Copy streams into a temp file in the identity's blob directory."""
+    return write_temp_file(get_files_dir(identity), streams)
+
+
+def add_blob(identity: str, tmp_path: Path, sha1: str) -> None:
+    """
+    Move a temp file into the store under its SHA-1.
+
+    Call this after the referencing ``File`` row is committed. If the blob is
+    already stored the temp file is discarded instead.
+    """
+    pending = _pending_removals.get()
+    if pending is not None:
+        pending.added_sha1s.append(sha1)
+    blob_path = get_blob_path(identity, sha1)
+    with _blob_lock_for(identity):
+        if blob_path.exists():
+            tmp_path.unlink()
+        else:
+            blob_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.replace(blob_path)
+
+
+def release_blobs(identity: str, session: Session, sha1s: Iterable[str]) -> None:
+    """
+    Remove blobs no longer referenced by any ``File`` row.
+
+    Call this after the change dropping the references is committed. Blobs
+    are checked in batches, with one query per batch.
+    """
+    from box_mock.models import File  # noqa: PLC0415
+
+    if _defer(sha1s):
+        return
+    pending = sorted(set(filter(None, sha1s)))
+    for start in range(0, len(pending), RELEASE_BATCH_SIZE):
+        batch = pending[start : start + RELEASE_BATCH_SIZE]
+        with _blob_lock_for(identity):
+            referenced = set(
+                session.scalars(select(File.sha1).where(File.sha1.in_(batch))),
+            )
+            for sha1 in batch:
+                if sha1 not in referenced:
+                    get_blob_path(identity, sha1).unlink(missing_ok=True)
+
+
+def remove_content(
+    identity: str,
+    sha1s: Iterable[str] = (),
+    file_ids: Iterable[str] = (),
+    session_ids: Iterable[str] = (),
+) -> None:
+    """
+    Remove the content of deleted files and upload sessions.
+
+    Content stored under the IDs of files uploaded before content addressing
+    and the parts of the sessions are removed outright; ``sha1s`` are
+    released once no ``File`` row references them.
+    """
+    from box_mock.db import get_identity_dir, get_session_class  # noqa: PLC0415
+
+    if _defer(sha1s, file_ids, session_ids):
+        return
+    for file_id in file_ids:
+        get_blob_path(identity, file_id).unlink(missing_ok=True)
+    sessions_dir = get_identity_dir(identity) / "upload_sessions"
+    for session_id in session_ids:
+        shutil.rmtree(sessions_dir / session_id, ignore_errors=True)
+    with get_session_class(identity)() as session:
+        release_blobs(identity, session, sha1s)
+
+
+def remove_content_later(
+    identity: str,
+    sha1s: Iterable[str] = (),
+    file_ids: Iterable[str] = (),
+    session_ids: Iterable[str] = (),
+) -> None:
+    """Queue ``remove_content`` on a background thread."""
+    if _defer(sha1s, file_ids, session_ids):
+        return
+    arguments = (identity, list(sha1s), list(file_ids), list(session_ids))
+
+    def run() -> None:
+        try:
+            remove_content(*arguments)
+        except Exception:
+            logger.exception("Removing content of identity %s failed", identity)
+
+    _removal_executor.submit(run)
+
+
+def wait_for_removals() -> None:
+    """Block until every queued ``remove_content_later`` call has finished."""
+    _removal_executor.submit(lambda: None).result()
+
+
+def mirror_dir(source: Path, target: Path) -> None:
+    """
+    Make ``target`` hold the same blobs as ``source``.
+
+    Blobs are immutable once stored, so only missing files are copied; files
+    no longer present in ``source`` are removed from ``target``.
+    """
+    wanted = set()
+    for path in source.rglob("*"):
+        if path.is_file() and not path.name.startswith(".upload-"):
+            relative = path.relative_to(source)
+            wanted.add(relative)
+            if not (target / relative).exists():
+                (target / relative).parent.mkdir(parents=True, exist_ok=True)
+                shutil.copy2(path, target / relative)
+    if target.exists():
+        for path in target.rglob("*"):
+            if path.is_file() and path.relative_to(target) not in wanted:
+                path.unlink()
+
+
+def link_tree(source: Path, target: Path) -> None:
+    """
+    Recreate the files under ``source`` in ``target``.
+
+    Blobs are immutable and linked. Dotfiles, such as the layout marker, can
+    change and are copied.
+    """
+    target.mkdir(parents=True, exist_ok=True)
+    for path in source.rglob("*"):
+        if path.is_file() and not path.name.startswith(".upload-"):
+            link = target / path.relative_to(source)
+            link.parent.mkdir(parents=True, exist_ok=True)
+            if path.name.startswith("."):
+                shutil.copyfile(path, link)
+            else:
+                os.link(path, link)
+
+
+def replace_files(identity: str, source: Path) -> None:
+    """
+    Replace an identity's blobs with hardlinks to the blobs under ``source``.
+
+    The new tree is staged next to the live one and swapped in with renames,
+    so the cost depends on the number of blobs, not their size.
+    """
+    files_dir = get_files_dir(identity)
+    staging = Path(tempfile.mkdtemp(dir=files_dir.parent, prefix=".files-"))
+    link_tree(source, staging)
+    trash = files_dir.with_name(f"{staging.name}-old")
+    with _layout_lock_for(files_dir):
+        files_dir.replace(trash)
+        staging.replace(files_dir)
+        # The restored tree may have been laid out with another depth. Other
+        # processes have already checked this directory, so it is fixed now.
+        _fix_layout(files_dir)
+    shutil.rmtree(trash, ignore_errors=True)
+
+
+def clear_files(identity: str) -> None:
+    """
+    Remove every blob of an identity, leaving an empty blob directory.
+
+    The directory is recreated, with its layout marker, before the lock is
+    released, so processes that already checked its layout keep using it.
+    """
+    files_dir = get_files_dir(identity)
+    trash = Path(tempfile.mkdtemp(dir=files_dir.parent, prefix=".files-old-"))
+    with _layout_lock_for(files_dir):
+        files_dir.replace(trash / "files")
+        files_dir.mkdir()
+        _write_layout_marker(files_dir)
+    shutil.rmtree(trash, ignore_errors=True)
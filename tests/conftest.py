@@ -0,0 +1,20 @@
+"""Fixtures shared by all tests."""
+
+from pathlib import Path
+
+import pytest
+
+import box_mock.db as db_module
+from box_mock.lru import LRUCache
+
+
+@pytest.fixture
+def temp_data_dir(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Point the data directory and engine cache at fresh state."""
+    monkeypatch.setattr(db_module, "DATA_DIR", tmp_path)
+    monkeypatch.setattr(
+        db_module,
+        "_engines",
+        LRUCache(on_evict=db_module._dispose_engines),
+    )
+    return tmp_path
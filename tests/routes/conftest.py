@@ -1,6 +1,7 @@
 """Fixtures for route tests."""
 
 from collections.abc import Iterator
+from pathlib import Path
 
 import pytest
 from flask.testing import FlaskClient
@@ -9,8 +10,9 @@ from app import create_app
 
 
 @pytest.fixture
-def client() -> Iterator[FlaskClient]:
-    """Yield a Flask test client."""
+def client(temp_data_dir: Path) -> Iterator[FlaskClient]:
+    """Yield a Flask test client backed by a temporary data directory."""
+    _ = temp_data_dir
     app = create_app()
     app.config["TESTING"] = True
     with app.test_client() as test_client:
@@ -0,0 +1,50 @@
+"""Helpers shared by the route tests."""
+
+import io
+import json
+
+from flask.testing import FlaskClient
+from werkzeug.test import TestResponse
+
+import box_mock.db as db_module
+from box_mock import cache
+from box_mock.models import File
+from box_mock.storage import get_blob_path
+
+
+def create_folder(client: FlaskClient, name: str, parent_id: str = "0") -> str:
+    """Create a folder and return its ID."""
+    return client.post(
+        "/2.0/folders",
+        json={"name": name, "parent": {"id": parent_id}},
+    ).json["id"]
+
+
+def upload_file(
+    client: FlaskClient,
+    name: str = "test.txt",
+    content: bytes = b"test content",
+    parent_id: str = "0",
+) -> TestResponse:
+    """Upload a file and return the response."""
+    return client.post(
+        "/2.0/files/content",
+        data={
+            "attributes": json.dumps({"name": name, "parent": {"id": parent_id}}),
+            "file": (io.BytesIO(content), name),
+        },
+        content_type="multipart/form-data",
+    )
+
+
+def store_as_legacy(file_id: str) -> None:
+    """Move a file's content under its ID, as before content addressing."""
+    session = db_module.get_session_class("default")()
+    file = session.get(File, file_id)
+    legacy_path = get_blob_path("default", file_id)
+    legacy_path.parent.mkdir(parents=True, exist_ok=True)
+    get_blob_path("default", file.sha1).replace(legacy_path)
+    file.sha1 = None
+    session.commit()
+    session.close()
+    cache.invalidate_identity("default")
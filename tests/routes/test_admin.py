@@ -1,9 +1,19 @@
 """Tests for admin routes."""
 
+import io
+import json
+import tarfile
 from unittest.mock import MagicMock, patch
 
+import pytest
 from flask.testing import FlaskClient
 
+import box_mock.db as db_module
+from box_mock import config
+from box_mock.models import File, Folder
+from box_mock.routes import admin
+from tests.routes.helpers import create_folder, upload_file
+
 
 @patch("box_mock.routes.admin.reset_identity_data")
 def test_reset_calls_reset_identity_data(
@@ -36,3 +46,216 @@ def test_health_returns_ok(client: FlaskClient):
 
     assert response.status_code == 200
     assert response.json == {"status": "ok"}
+
+
+def test_stats_reports_engine_cache(client: FlaskClient):
+    """Test that GET /_stats reports engine cache counters."""
+    client.get("/2.0/folders/0")
+
+    response = client.get("/_stats")
+
+    assert response.status_code == 200
+    assert response.json["engines"]["size"] == 1
+    assert {"hits", "misses", "evictions"} <= response.json["engines"].keys()
+
+
+def test_snapshot_and_restore(client: FlaskClient):
+    """Test that POST /_restore brings back the tree captured by /_snapshot."""
+    client.post("/2.0/folders", json={"name": "Kept", "parent": {"id": "0"}})
+    kept_file = client.post(
+        "/2.0/files/content",
+        data={
+            "attributes": json.dumps({"name": "kept.txt", "parent": {"id": "0"}}),
+            "file": (io.BytesIO(b"kept"), "kept.txt"),
+        },
+        content_type="multipart/form-data",
+    ).json["entries"][0]
+
+    response = client.post("/_snapshot", json={"name": "baseline"})
+    assert response.status_code == 201
+    assert client.get("/_snapshot").json["snapshots"] == ["baseline"]
+
+    client.post("/2.0/folders", json={"name": "Discarded", "parent": {"id": "0"}})
+    client.delete(f"/2.0/files/{kept_file['id']}")
+
+    response = client.post("/_restore", json={"name": "baseline"})
+
+    assert response.status_code == 200
+    names = [e["name"] for e in client.get("/2.0/folders/0/items").json["entries"]]
+    assert sorted(names) == ["Kept", "kept.txt"]
+    assert client.get(f"/2.0/files/{kept_file['id']}/content").data == b"kept"
+
+
+def test_restore_snapshot_taken_before_relayout(
+    client: FlaskClient,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that migrating the live blobs leaves a snapshot's layout intact."""
+    monkeypatch.setattr(config, "FANOUT_DEPTH", 2)
+    file_id = upload_file(client, "kept.txt", b"kept").json["entries"][0]["id"]
+    client.post("/_snapshot", json={"name": "deep"})
+
+    monkeypatch.setattr(config, "FANOUT_DEPTH", 1)
+    assert client.get(f"/2.0/files/{file_id}/content").data == b"kept"
+    client.post("/_restore", json={"name": "deep"})
+
+    assert client.get(f"/2.0/files/{file_id}/content").data == b"kept"
+
+
+def test_restore_unknown_snapshot(client: FlaskClient):
+    """Test that restoring a missing snapshot returns 404."""
+    response = client.post("/_restore", json={"name": "missing"})
+
+    assert response.status_code == 404
+
+
+def test_snapshot_rejects_unsafe_name(client: FlaskClient):
+    """Test that snapshot names cannot escape the snapshots directory."""
+    response = client.post("/_snapshot", json={"name": "../escape"})
+
+    assert response.status_code == 400
+
+
+def test_seed_imports_manifest_and_archive(client: FlaskClient):
+    """Test that POST /_seed imports a manifest with contents from a tar."""
+    archive = io.BytesIO()
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        info = tarfile.TarInfo("a.txt")
+        info.size = 5
+        tar.addfile(info, io.BytesIO(b"hello"))
+    manifest = {
+        "folders": [{"name": "Docs", "files": [{"name": "a.txt", "path": "a.txt"}]}]
+    }
+
+    response = client.post(
+        "/_seed",
+        data={
+            "manifest": (io.BytesIO(json.dumps(manifest).encode()), "manifest.json"),
+            "archive": (io.BytesIO(archive.getvalue()), "contents.tar"),
+        },
+        content_type="multipart/form-data",
+    )
+
+    assert response.status_code == 201
+    assert response.json["folders"] == 1
+    docs = client.get("/2.0/folders/0/items").json["entries"][0]
+    file = client.get(f"/2.0/folders/{docs['id']}/items").json["entries"][0]
+    assert client.get(f"/2.0/files/{file['id']}/content").data == b"hello"
+
+
+def test_seed_rejects_invalid_manifest(client: FlaskClient):
+    """Test that POST /_seed reports an invalid manifest as a bad request."""
+    response = client.post("/_seed", json={"users": "nope"})
+
+    assert response.status_code == 400
+    assert response.json["code"] == "bad_request"
+
+
+def test_export_streams_database_and_blobs(client: FlaskClient):
+    """Test that GET /_export returns a tar with box.db and the blobs."""
+    entry = client.post(
+        "/2.0/files/content",
+        data={
+            "attributes": json.dumps({"name": "a.txt", "parent": {"id": "0"}}),
+            "file": (io.BytesIO(b"exported"), "a.txt"),
+        },
+        content_type="multipart/form-data",
+    ).json["entries"][0]
+
+    response = client.get("/_export")
+    future = client.get("/_export", query_string={"since": "2999-01-01T00:00:00"})
+
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-tar"
+    with tarfile.open(fileobj=io.BytesIO(response.data)) as tar:
+        names = tar.getnames()
+        blob = next(n for n in names if n.endswith(entry["sha1"]))
+        assert tar.extractfile(blob).read() == b"exported"
+    assert "box.db" in names
+    with tarfile.open(fileobj=io.BytesIO(future.data)) as tar:
+        assert [n for n in tar.getnames() if not n.endswith(".layout")] == ["box.db"]
+    response.close()
+    future.close()
+    assert not list((db_module.DATA_DIR / "default").glob(".export-*"))
+
+
+def test_export_rejects_unknown_identity_and_bad_since(client: FlaskClient):
+    """Test that GET /_export checks the identity and the since parameter."""
+    client.get("/2.0/folders/0")
+
+    missing = client.get("/_export", query_string={"identity": "missing"})
+    bad_since = client.get("/_export", query_string={"since": "yesterday"})
+
+    assert missing.status_code == 404
+    assert bad_since.status_code == 400
+
+
+def test_browse_index_does_not_open_identities(client: FlaskClient):
+    """Test that the identity index links to identities without opening them."""
+    client.get("/2.0/folders/0", headers={"Authorization": "Identity=listed"})
+    engines = client.get("/_stats").json["engines"]["size"]
+
+    response = client.get("/_browse")
+
+    assert b'href="/_browse/listed"' in response.data
+    assert client.get("/_stats").json["engines"]["size"] == engines
+
+
+def test_browse_identity_limits_tree_depth(client: FlaskClient):
+    """Test that an identity page shows the tree down to the requested depth."""
+    parent_id = "0"
+    for name in ("level1", "level2", "level3"):
+        parent_id = client.post(
+            "/2.0/folders",
+            json={"name": name, "parent": {"id": parent_id}},
+        ).json["id"]
+    client.post("/2.0/users", json={"name": "Browsed User"})
+
+    shallow = client.get("/_browse/default", query_string={"depth": 2}).data
+    deep = client.get("/_browse/default").data
+
+    assert b"level2" in shallow
+    assert b"level3" not in shallow
+    assert b"level3" in deep
+    assert b"Browsed User" in deep
+    assert client.get("/_browse/missing").status_code == 404
+
+
+def test_browse_identity_shows_cycle_once(client: FlaskClient):
+    """Test that a parent cycle in the data lists each folder once."""
+    top_id = create_folder(client, "Top")
+    child_id = create_folder(client, "Child", top_id)
+    session = db_module.get_session_class("default")()
+    session.get(Folder, top_id).parent_id = child_id
+    session.commit()
+    session.close()
+
+    response = client.get(f"/_browse/default?root={top_id}&depth=5")
+
+    assert response.status_code == 200
+    assert response.data.count(f"({top_id})".encode()) == 1
+    assert response.data.count(f"({child_id})".encode()) == 1
+
+
+def test_browse_identity_keeps_files_of_shallow_folders(
+    client: FlaskClient,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that the file cap drops the files of the deepest folders first."""
+    monkeypatch.setattr(admin, "BROWSE_FILE_LIMIT", 1)
+    session = db_module.get_session_class("default")()
+    session.add_all(
+        [
+            Folder(id="b-shallow", name="Shallow", parent_id="0"),
+            Folder(id="a-deep", name="Deep", parent_id="b-shallow"),
+            File(id="f-deep", name="deep.txt", folder_id="a-deep"),
+            File(id="f-shallow", name="shallow.txt", folder_id="b-shallow"),
+        ],
+    )
+    session.commit()
+    session.close()
+
+    response = client.get("/_browse/default")
+
+    assert b"shallow.txt" in response.data
+    assert b"deep.txt" not in response.data
@@ -0,0 +1,207 @@
+"""Tests for the batch route."""
+
+import base64
+import json
+
+import pytest
+from flask.testing import FlaskClient
+
+from box_mock import cache, storage
+from box_mock.storage import get_blob_path
+from tests.routes.helpers import store_as_legacy
+
+
+def _upload(name: str, content: bytes, parent: str = "0") -> dict:
+    """Build a batch operation uploading a file."""
+    return {
+        "method": "POST",
+        "path": "/2.0/files/content",
+        "form": {"attributes": json.dumps({"name": name, "parent": {"id": parent}})},
+        "files": {
+            "file": {"filename": name, "content": base64.b64encode(content).decode()},
+        },
+    }
+
+
+def test_batch_builds_tree_with_references(client: FlaskClient):
+    """Test that operations run in order and can use earlier responses."""
+    response = client.post(
+        "/_batch",
+        json={
+            "operations": [
+                {
+                    "ref": "docs",
+                    "method": "POST",
+                    "path": "/2.0/folders",
+                    "body": {"name": "Docs", "parent": {"id": "0"}},
+                },
+                {
+                    "method": "POST",
+                    "path": "/2.0/folders",
+                    "body": {"name": "Nested", "parent": {"id": "${docs.id}"}},
+                },
+                {"ref": "file", **_upload("a.txt", b"hello", "${docs.id}")},
+                {"method": "GET", "path": "/2.0/folders/${docs.id}/items"},
+            ],
+        },
+    )
+
+    assert response.status_code == 200
+    results = response.json["results"]
+    assert [r["status"] for r in results] == [201, 201, 201, 200]
+    assert [r["ref"] for r in results] == ["docs", "1", "file", "3"]
+    docs_id = results[0]["body"]["id"]
+    assert results[1]["body"]["parent"]["id"] == docs_id
+    assert results[3]["body"]["total_count"] == 2
+    file_id = results[2]["body"]["entries"][0]["id"]
+    assert client.get(f"/2.0/files/{file_id}/content").data == b"hello"
+
+
+def test_batch_failure_rolls_back_everything(client: FlaskClient):
+    """Test that a failing operation leaves no trace of the batch."""
+    response = client.post(
+        "/_batch",
+        json={
+            "operations": [
+                {
+                    "ref": "docs",
+                    "method": "POST",
+                    "path": "/2.0/folders",
+                    "body": {"name": "Docs", "parent": {"id": "0"}},
+                },
+                _upload("a.txt", b"orphan", "${docs.id}"),
+                _upload("a.txt", b"again", "${docs.id}"),
+            ],
+        },
+    )
+    storage.wait_for_removals()
+
+    assert response.status_code == 400
+    assert response.json["code"] == "batch_failed"
+    results = response.json["context_info"]["results"]
+    assert [r["status"] for r in results] == [201, 201, 409]
+    assert client.get("/2.0/folders/0/items").json["total_count"] == 0
+    sha1 = results[1]["body"]["entries"][0]["sha1"]
+    assert not get_blob_path("default", sha1).exists()
+
+
+def test_batch_unhandled_error_fails_operation(
+    client: FlaskClient,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that an error no handler takes fails the batch with a 500 entry."""
+
+    def broken(folder_id: str) -> None:
+        raise RuntimeError(folder_id)
+
+    monkeypatch.setitem(client.application.view_functions, "folders.get_folder", broken)
+
+    response = client.post(
+        "/_batch",
+        json={
+            "operations": [
+                _upload("a.txt", b"orphan"),
+                {"method": "GET", "path": "/2.0/folders/0"},
+            ],
+        },
+    )
+    storage.wait_for_removals()
+
+    assert response.status_code == 400
+    results = response.json["context_info"]["results"]
+    assert [r["status"] for r in results] == [201, 500]
+    assert results[1]["body"]["code"] == "internal_server_error"
+    assert client.get("/2.0/folders/0/items").json["total_count"] == 0
+    sha1 = results[0]["body"]["entries"][0]["sha1"]
+    assert not get_blob_path("default", sha1).exists()
+
+
+def test_batch_defers_blob_removal_until_commit(client: FlaskClient):
+    """Test that content deleted in a rolled back batch is kept."""
+    file_id = client.post(
+        "/_batch",
+        json={"operations": [_upload("a.txt", b"keep me")]},
+    ).json["results"][0]["body"]["entries"][0]["id"]
+
+    response = client.post(
+        "/_batch",
+        json={
+            "operations": [
+                {"method": "DELETE", "path": f"/2.0/files/{file_id}"},
+                {"method": "GET", "path": "/2.0/files/missing"},
+            ],
+        },
+    )
+    storage.wait_for_removals()
+
+    assert response.status_code == 400
+    assert client.get(f"/2.0/files/{file_id}/content").data == b"keep me"
+
+
+def test_batch_rollback_keeps_legacy_content(client: FlaskClient):
+    """Test that content stored under a file's ID outlives a rolled back delete."""
+    file_id = client.post(
+        "/_batch",
+        json={"operations": [_upload("a.txt", b"legacy")]},
+    ).json["results"][0]["body"]["entries"][0]["id"]
+    store_as_legacy(file_id)
+
+    response = client.post(
+        "/_batch",
+        json={
+            "operations": [
+                {"method": "DELETE", "path": f"/2.0/files/{file_id}"},
+                {"method": "GET", "path": "/2.0/folders/missing"},
+            ],
+        },
+    )
+    storage.wait_for_removals()
+
+    assert response.status_code == 400
+    assert client.get(f"/2.0/files/{file_id}/content").data == b"legacy"
+
+
+def test_batch_reads_bypass_item_cache(client: FlaskClient):
+    """Test that rows read inside a batch never reach the shared item cache."""
+    folder_id = client.post(
+        "/2.0/folders",
+        json={"name": "committed", "parent": {"id": "0"}},
+    ).json["id"]
+
+    client.post(
+        "/_batch",
+        json={
+            "operations": [
+                {
+                    "method": "PUT",
+                    "path": f"/2.0/folders/{folder_id}",
+                    "body": {"name": "uncommitted"},
+                },
+                {"method": "GET", "path": f"/2.0/folders/{folder_id}"},
+                {"method": "GET", "path": "/2.0/folders/missing"},
+            ],
+        },
+    )
+
+    keys = cache._items.keys()
+    cached = [cache._items.peek(key) for key in keys]
+    assert all(item["name"] != "uncommitted" for item in cached)
+    assert client.get(f"/2.0/folders/{folder_id}").json["name"] == "committed"
+
+
+def test_batch_rejects_bad_operations(client: FlaskClient):
+    """Test that malformed batches and references are rejected."""
+    not_a_list = client.post("/_batch", json={"operations": {}})
+    outside_api = client.post(
+        "/_batch",
+        json={"operations": [{"method": "POST", "path": "/_reset"}]},
+    )
+    unknown_ref = client.post(
+        "/_batch",
+        json={"operations": [{"path": "/2.0/folders/${nope.id}"}]},
+    )
+
+    assert not_a_list.status_code == 400
+    assert outside_api.json["context_info"]["results"][0]["status"] == 400
+    message = unknown_ref.json["context_info"]["results"][0]["body"]["message"]
+    assert "nope" in message
@@ -1,32 +1,21 @@
 """Tests for file routes."""
 
 import io
-import json
 
+import pytest
 from flask.testing import FlaskClient
-from werkzeug.test import TestResponse
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import StaleDataError
 
-
-def _upload_file(
-    client: FlaskClient,
-    name: str = "test.txt",
-    content: bytes = b"test content",
-    parent_id: str = "0",
-) -> TestResponse:
-    """Upload a file for testing."""
-    return client.post(
-        "/2.0/files/content",
-        data={
-            "attributes": json.dumps({"name": name, "parent": {"id": parent_id}}),
-            "file": (io.BytesIO(content), name),
-        },
-        content_type="multipart/form-data",
-    )
+import box_mock.db as db_module
+from box_mock import storage
+from box_mock.storage import CHUNK_SIZE, get_blob_path
+from tests.routes.helpers import store_as_legacy, upload_file
 
 
 def test_upload_file(client: FlaskClient):
     """Test that POST /2.0/files/content uploads a file."""
-    response = _upload_file(client)
+    response = upload_file(client)
 
     assert response.status_code == 201
     data = response.json
@@ -37,7 +26,7 @@ def test_upload_file(client: FlaskClient):
 
 def test_get_file(client: FlaskClient):
     """Test that GET /2.0/files/<id> returns file metadata."""
-    upload_response = _upload_file(client)
+    upload_response = upload_file(client)
     file_id = upload_response.json["entries"][0]["id"]
 
     response = client.get(f"/2.0/files/{file_id}")
@@ -50,7 +39,7 @@ def test_get_file(client: FlaskClient):
 
 def test_update_file(client: FlaskClient):
     """Test that PUT /2.0/files/<id> updates file metadata."""
-    upload_response = _upload_file(client)
+    upload_response = upload_file(client)
     file_id = upload_response.json["entries"][0]["id"]
 
     response = client.put(
@@ -64,7 +53,7 @@ def test_update_file(client: FlaskClient):
 
 def test_delete_file(client: FlaskClient):
     """Test that DELETE /2.0/files/<id> deletes file."""
-    upload_response = _upload_file(client)
+    upload_response = upload_file(client)
     file_id = upload_response.json["entries"][0]["id"]
 
     response = client.delete(f"/2.0/files/{file_id}")
@@ -74,7 +63,7 @@ def test_delete_file(client: FlaskClient):
 
 def test_download_file(client: FlaskClient):
     """Test that GET /2.0/files/<id>/content downloads file content."""
-    upload_response = _upload_file(client, content=b"hello world")
+    upload_response = upload_file(client, content=b"hello world")
     file_id = upload_response.json["entries"][0]["id"]
 
     response = client.get(f"/2.0/files/{file_id}/content")
@@ -85,7 +74,7 @@ def test_download_file(client: FlaskClient):
 
 def test_upload_file_version(client: FlaskClient):
     """Test that POST /2.0/files/<id>/content uploads new version."""
-    upload_response = _upload_file(client)
+    upload_response = upload_file(client)
     file_id = upload_response.json["entries"][0]["id"]
 
     response = client.post(
@@ -101,7 +90,7 @@ def test_upload_file_version(client: FlaskClient):
 
 def test_copy_file(client: FlaskClient):
     """Test that POST /2.0/files/<id>/copy copies file."""
-    upload_response = _upload_file(client)
+    upload_response = upload_file(client)
     file_id = upload_response.json["entries"][0]["id"]
 
     response = client.post(
@@ -122,3 +111,294 @@ def test_preflight_check(client: FlaskClient):
 
     assert response.status_code == 200
     assert "upload_token" in response.json
+
+
+def test_upload_large_file_streams_to_disk(
+    client: FlaskClient,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that large uploads are parsed into the store, written only once."""
+
+    def copy(*_: object) -> None:
+        pytest.fail("uploaded content was copied")
+
+    monkeypatch.setattr(storage, "write_temp_file", copy)
+    content = b"0123456789abcdef" * (CHUNK_SIZE // 8)
+    upload_response = upload_file(client, name="large.bin", content=content)
+    entry = upload_response.json["entries"][0]
+
+    assert upload_response.status_code == 201
+    assert entry["size"] == len(content)
+
+    response = client.get(f"/2.0/files/{entry['id']}/content")
+    assert response.data == content
+
+    files_dir = db_module.DATA_DIR / "default" / "files"
+    assert not list(files_dir.glob(".upload-*"))
+
+
+def test_upload_file_without_content(client: FlaskClient):
+    """Test that uploading an empty file part is rejected."""
+    response = upload_file(client, name="empty.txt", content=b"")
+
+    assert response.status_code == 400
+
+
+def test_rejected_upload_leaves_no_temp_files(client: FlaskClient):
+    """Test that parsed parts no route claimed are removed with the request."""
+    response = upload_file(client, parent_id="missing")
+
+    assert response.status_code == 404
+    files_dir = db_module.DATA_DIR / "default" / "files"
+    assert not list(files_dir.glob(".upload-*"))
+
+
+def test_upload_file_returns_sha1(client: FlaskClient):
+    """Test that uploaded files report the SHA-1 of their content."""
+    response = upload_file(client, content=b"hello world")
+
+    sha1 = "2aae6c35c94fcfb415dbe95f408b9ce91ee846ed"
+    assert response.json["entries"][0]["sha1"] == sha1
+    assert get_blob_path("default", sha1).exists()
+
+
+def test_identical_uploads_share_blob(client: FlaskClient):
+    """Test that identical content and copies are stored once."""
+    first = upload_file(client, name="a.txt", content=b"same").json["entries"][0]
+    second = upload_file(client, name="b.txt", content=b"same").json["entries"][0]
+    copy = client.post(f"/2.0/files/{first['id']}/copy", json={"name": "c.txt"}).json
+
+    assert first["sha1"] == second["sha1"] == copy["sha1"]
+    files_dir = db_module.DATA_DIR / "default" / "files"
+    blobs = [p for p in files_dir.rglob("*") if p.is_file() and p.name[0] != "."]
+    assert blobs == [get_blob_path("default", first["sha1"])]
+
+
+def test_blob_removed_with_last_reference(client: FlaskClient):
+    """Test that a blob is kept while referenced and removed afterwards."""
+    first = upload_file(client, name="a.txt", content=b"shared").json["entries"][0]
+    copy = client.post(f"/2.0/files/{first['id']}/copy", json={"name": "b.txt"}).json
+    blob_path = get_blob_path("default", first["sha1"])
+
+    client.delete(f"/2.0/files/{first['id']}")
+    assert blob_path.exists()
+    assert client.get(f"/2.0/files/{copy['id']}/content").data == b"shared"
+
+    client.delete(f"/2.0/files/{copy['id']}")
+    assert not blob_path.exists()
+
+
+def test_download_file_etag_and_not_modified(client: FlaskClient):
+    """Test that downloads carry a strong ETag and honor If-None-Match."""
+    file_id = upload_file(client).json["entries"][0]["id"]
+
+    response = client.get(f"/2.0/files/{file_id}/content")
+    assert response.headers["ETag"] == f'"{file_id}_v1"'
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+    response = client.get(
+        f"/2.0/files/{file_id}/content",
+        headers={"If-None-Match": f'"{file_id}_v1"'},
+    )
+    assert response.status_code == 304
+
+
+def test_download_file_single_range(client: FlaskClient):
+    """Test that a single byte range returns partial content."""
+    file_id = upload_file(client, content=b"hello world").json["entries"][0]["id"]
+
+    response = client.get(
+        f"/2.0/files/{file_id}/content",
+        headers={"Range": "bytes=6-"},
+    )
+
+    assert response.status_code == 206
+    assert response.data == b"world"
+    assert response.headers["Content-Range"] == "bytes 6-10/11"
+
+
+def test_download_file_multiple_ranges(client: FlaskClient):
+    """Test that several byte ranges return a multipart/byteranges body."""
+    file_id = upload_file(client, content=b"hello world").json["entries"][0]["id"]
+
+    response = client.get(
+        f"/2.0/files/{file_id}/content",
+        headers={"Range": "bytes=0-4,-5"},
+    )
+
+    assert response.status_code == 206
+    assert response.mimetype == "multipart/byteranges"
+    assert int(response.headers["Content-Length"]) == len(response.data)
+    assert b"Content-Range: bytes 0-4/11\r\n\r\nhello\r\n" in response.data
+    assert b"Content-Range: bytes 6-10/11\r\n\r\nworld\r\n" in response.data
+
+
+def test_download_file_stale_if_range_returns_full_content(client: FlaskClient):
+    """Test that a stale If-Range ignores the Range header."""
+    file_id = upload_file(client, content=b"hello world").json["entries"][0]["id"]
+
+    response = client.get(
+        f"/2.0/files/{file_id}/content",
+        headers={"Range": "bytes=0-4,6-", "If-Range": '"stale"'},
+    )
+
+    assert response.status_code == 200
+    assert response.data == b"hello world"
+
+
+def test_download_file_unsatisfiable_range(client: FlaskClient):
+    """Test that ranges beyond the end of the file return 416."""
+    file_id = upload_file(client, content=b"hello").json["entries"][0]["id"]
+
+    response = client.get(
+        f"/2.0/files/{file_id}/content",
+        headers={"Range": "bytes=10-20,30-40"},
+    )
+
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == "bytes */5"
+
+
+def test_upload_file_name_conflict(client: FlaskClient):
+    """Test that uploading a duplicate name into a folder returns 409."""
+    existing_id = upload_file(client, "same.txt").json["entries"][0]["id"]
+
+    response = upload_file(client, "same.txt", b"other content")
+
+    assert response.status_code == 409
+    assert response.json["code"] == "item_name_in_use"
+    assert response.json["context_info"]["conflicts"][0]["id"] == existing_id
+
+
+def test_rename_and_copy_file_name_conflict(client: FlaskClient):
+    """Test that renames and copies onto a taken name return 409."""
+    upload_file(client, "a.txt")
+    file_id = upload_file(client, "b.txt").json["entries"][0]["id"]
+
+    rename = client.put(f"/2.0/files/{file_id}", json={"name": "a.txt"})
+    copy = client.post(f"/2.0/files/{file_id}/copy", json={"name": "a.txt"})
+    keep_name = client.put(f"/2.0/files/{file_id}", json={"name": "b.txt"})
+
+    assert rename.status_code == 409
+    assert copy.status_code == 409
+    assert keep_name.status_code == 200
+
+
+def test_get_file_fields(client: FlaskClient):
+    """Test that ?fields= returns only the requested fields plus type, id, etag."""
+    file_id = upload_file(client).json["entries"][0]["id"]
+
+    response = client.get(f"/2.0/files/{file_id}?fields=name,size")
+
+    assert response.json == {
+        "type": "file",
+        "id": file_id,
+        "etag": "0",
+        "name": "test.txt",
+        "size": len(b"test content"),
+    }
+
+
+def test_get_file_cache_sees_writes(client: FlaskClient):
+    """Test that cached file responses are refreshed by renames and deletes."""
+    file_id = upload_file(client).json["entries"][0]["id"]
+    client.get(f"/2.0/files/{file_id}")
+
+    client.put(f"/2.0/files/{file_id}", json={"name": "renamed.txt"})
+    renamed = client.get(f"/2.0/files/{file_id}").json["name"]
+    client.get(f"/2.0/files/{file_id}")
+    client.delete(f"/2.0/files/{file_id}")
+
+    assert renamed == "renamed.txt"
+    assert client.get(f"/2.0/files/{file_id}").status_code == 404
+    assert client.get("/_stats").json["items"]["hits"] >= 1
+
+
+def test_file_etag_bumps_on_every_change(client: FlaskClient):
+    """Test that renames and new versions each bump the file's etag."""
+    file_id = upload_file(client).json["entries"][0]["id"]
+
+    renamed = client.put(f"/2.0/files/{file_id}", json={"name": "renamed.txt"})
+    new_version = client.post(
+        f"/2.0/files/{file_id}/content",
+        data={"file": (io.BytesIO(b"v2"), "renamed.txt")},
+        content_type="multipart/form-data",
+    )
+
+    assert renamed.json["etag"] == "1"
+    assert new_version.json["entries"][0]["etag"] == "2"
+    assert client.get(f"/2.0/files/{file_id}").headers["ETag"] == '"2"'
+
+
+def test_file_if_match(client: FlaskClient):
+    """Test that writes with a stale If-Match fail with 412 and change nothing."""
+    file_id = upload_file(client).json["entries"][0]["id"]
+    client.put(f"/2.0/files/{file_id}", json={"name": "renamed.txt"})
+
+    stale = client.put(
+        f"/2.0/files/{file_id}",
+        json={"name": "stale.txt"},
+        headers={"If-Match": "0"},
+    )
+    stale_delete = client.delete(f"/2.0/files/{file_id}", headers={"If-Match": "0"})
+    current = client.put(
+        f"/2.0/files/{file_id}",
+        json={"name": "current.txt"},
+        headers={"If-Match": "1"},
+    )
+
+    assert stale.status_code == 412
+    assert stale.json["code"] == "precondition_failed"
+    assert stale_delete.status_code == 412
+    assert current.status_code == 200
+    assert current.json["name"] == "current.txt"
+
+
+def test_get_file_if_none_match(client: FlaskClient):
+    """Test that GET answers 304 while If-None-Match names the current etag."""
+    file_id = upload_file(client).json["entries"][0]["id"]
+
+    cached = client.get(f"/2.0/files/{file_id}", headers={"If-None-Match": '"0"'})
+    client.put(f"/2.0/files/{file_id}", json={"name": "renamed.txt"})
+    changed = client.get(f"/2.0/files/{file_id}", headers={"If-None-Match": '"0"'})
+
+    assert cached.status_code == 304
+    assert not cached.data
+    assert changed.status_code == 200
+    assert changed.json["name"] == "renamed.txt"
+
+
+def test_upload_after_reset(client: FlaskClient):
+    """Test that an identity accepts uploads again after it is reset."""
+    assert upload_file(client, content=b"before").status_code == 201
+
+    client.post("/_reset", json={"identity": "default"})
+    response = upload_file(client, content=b"after")
+
+    assert response.status_code == 201
+    file_id = response.json["entries"][0]["id"]
+    assert client.get(f"/2.0/files/{file_id}/content").data == b"after"
+
+
+def test_failed_commit_keeps_legacy_content(
+    client: FlaskClient,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that legacy content survives writes whose commit fails."""
+    file_id = upload_file(client, content=b"legacy").json["entries"][0]["id"]
+    store_as_legacy(file_id)
+
+    def fail(_: Session) -> None:
+        raise StaleDataError
+
+    with monkeypatch.context() as patched:
+        patched.setattr(Session, "commit", fail)
+        deleted = client.delete(f"/2.0/files/{file_id}")
+        updated = client.post(
+            f"/2.0/files/{file_id}/content",
+            data={"file": (io.BytesIO(b"new"), "test.txt")},
+        )
+
+    assert deleted.status_code == 412
+    assert updated.status_code == 412
+    assert client.get(f"/2.0/files/{file_id}/content").data == b"legacy"
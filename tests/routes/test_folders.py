@@ -1,7 +1,17 @@
 """Tests for folder routes."""
 
+import io
+import json
+
+import pytest
 from flask.testing import FlaskClient
 
+import box_mock.db as db_module
+from box_mock import cache, pagination, storage
+from box_mock.models import Folder
+from box_mock.routes import folders
+from tests.routes.helpers import create_folder, upload_file
+
 
 def test_create_folder(client: FlaskClient):
     """Test that POST /2.0/folders creates a folder."""
@@ -65,3 +75,241 @@ def test_get_folder_items(client: FlaskClient):
     data = response.json
     assert "entries" in data
     assert "total_count" in data
+
+
+def test_copy_folder_copies_subtree(client: FlaskClient):
+    """Test that POST /2.0/folders/<id>/copy copies folders and files."""
+    source_id = client.post(
+        "/2.0/folders",
+        json={"name": "Template", "parent": {"id": "0"}},
+    ).json["id"]
+    child_id = client.post(
+        "/2.0/folders",
+        json={"name": "Child", "parent": {"id": source_id}},
+    ).json["id"]
+    client.post(
+        "/2.0/files/content",
+        data={
+            "attributes": json.dumps({"name": "a.txt", "parent": {"id": child_id}}),
+            "file": (io.BytesIO(b"content"), "a.txt"),
+        },
+        content_type="multipart/form-data",
+    )
+
+    response = client.post(
+        f"/2.0/folders/{source_id}/copy",
+        json={"name": "Copy", "parent": {"id": "0"}},
+    )
+
+    assert response.status_code == 201
+    assert response.json["name"] == "Copy"
+    assert response.json["id"] != source_id
+    children = client.get(f"/2.0/folders/{response.json['id']}/items").json
+    assert [e["name"] for e in children["entries"]] == ["Child"]
+    copied_child_id = children["entries"][0]["id"]
+    files = client.get(f"/2.0/folders/{copied_child_id}/items").json["entries"]
+    assert [e["name"] for e in files] == ["a.txt"]
+    assert client.get(f"/2.0/files/{files[0]['id']}/content").data == b"content"
+
+
+def test_copy_folder_into_itself_is_rejected(client: FlaskClient):
+    """Test that a folder cannot be copied into its own subtree."""
+    folder_id = client.post(
+        "/2.0/folders",
+        json={"name": "Loop", "parent": {"id": "0"}},
+    ).json["id"]
+
+    response = client.post(
+        f"/2.0/folders/{folder_id}/copy",
+        json={"parent": {"id": folder_id}},
+    )
+
+    assert response.status_code == 400
+
+
+def test_copy_folder_requires_parent(client: FlaskClient):
+    """Test that a copy without a destination is a bad request."""
+    folder_id = create_folder(client, "Docs")
+
+    response = client.post(f"/2.0/folders/{folder_id}/copy", json={"name": "Copy"})
+
+    assert response.status_code == 400
+    assert response.json["code"] == "bad_request"
+
+
+def test_move_folder_into_its_subtree_is_rejected(client: FlaskClient):
+    """Test that a folder cannot become its own ancestor."""
+    top_id = create_folder(client, "Top")
+    child_id = create_folder(client, "Child", top_id)
+
+    into_child = client.put(f"/2.0/folders/{top_id}", json={"parent": {"id": child_id}})
+    into_self = client.put(f"/2.0/folders/{top_id}", json={"parent": {"id": top_id}})
+
+    assert into_child.status_code == 400
+    assert into_self.status_code == 400
+    assert client.get(f"/2.0/folders/{top_id}").json["parent"]["id"] == "0"
+
+
+def test_parent_cycle_in_data_does_not_hang(client: FlaskClient):
+    """Test that tree queries end on a parent cycle already in the database."""
+    top_id = create_folder(client, "Top")
+    child_id = create_folder(client, "Child", top_id)
+    session = db_module.get_session_class("default")()
+    session.get(Folder, top_id).parent_id = child_id
+    session.commit()
+    session.close()
+    cache.invalidate_identity("default")
+
+    browse = client.get(f"/_browse/default?root={top_id}")
+    search = client.get(f"/2.0/search?query=child&ancestor_folder_ids={top_id}")
+    deleted = client.delete(f"/2.0/folders/{top_id}")
+
+    assert browse.status_code == 200
+    assert search.json["total_count"] == 1
+    assert deleted.status_code == 204
+    assert client.get(f"/2.0/folders/{child_id}").status_code == 404
+
+
+@pytest.mark.parametrize("inline_limit", [100, 0])
+def test_delete_folder_removes_subtree_and_blobs(
+    client: FlaskClient,
+    monkeypatch: pytest.MonkeyPatch,
+    inline_limit: int,
+):
+    """Test that deleting a tree removes its rows and unshared blobs."""
+    monkeypatch.setattr(folders, "INLINE_REMOVAL_LIMIT", inline_limit)
+    top_id = create_folder(client, "Top")
+    child_id = create_folder(client, "Child", top_id)
+    grandchild_id = create_folder(client, "Grandchild", child_id)
+    only_in_tree = upload_file(client, "a.txt", b"only in tree", grandchild_id)
+    only_in_tree = only_in_tree.json["entries"][0]
+    in_tree = upload_file(client, "b.txt", b"shared", child_id).json["entries"][0]
+    outside = upload_file(client, "b.txt", b"shared").json["entries"][0]
+
+    response = client.delete(f"/2.0/folders/{top_id}")
+    storage.wait_for_removals()
+
+    assert response.status_code == 204
+    for folder_id in (top_id, child_id, grandchild_id):
+        assert client.get(f"/2.0/folders/{folder_id}").status_code == 404
+    assert client.get(f"/2.0/files/{only_in_tree['id']}").status_code == 404
+    assert client.get(f"/2.0/files/{in_tree['id']}").status_code == 404
+    assert not storage.get_blob_path("default", only_in_tree["sha1"]).exists()
+    assert client.get(f"/2.0/files/{outside['id']}/content").data == b"shared"
+
+
+def _populate(client: FlaskClient) -> str:
+    """Create a folder holding folders f0-f2 and files a0-a3, return its ID."""
+    parent_id = create_folder(client, "Listing")
+    for i in range(3):
+        create_folder(client, f"f{i}", parent_id)
+    for i in range(4):
+        upload_file(client, f"a{i}.txt", f"content {i}".encode(), parent_id)
+    return parent_id
+
+
+def test_get_folder_items_offset_paging(client: FlaskClient):
+    """Test that offset pages list folders before files, sorted by name."""
+    parent_id = _populate(client)
+
+    first = client.get(f"/2.0/folders/{parent_id}/items?limit=2").json
+    second = client.get(f"/2.0/folders/{parent_id}/items?offset=2&limit=3").json
+    last = client.get(
+        f"/2.0/folders/{parent_id}/items?offset=5&sort=name&direction=DESC",
+    ).json
+
+    assert first["total_count"] == 7
+    assert [e["name"] for e in first["entries"]] == ["f0", "f1"]
+    assert [e["name"] for e in second["entries"]] == ["f2", "a0.txt", "a1.txt"]
+    assert [e["name"] for e in last["entries"]] == ["a1.txt", "a0.txt"]
+    assert last["order"] == [{"by": "name", "direction": "DESC"}]
+
+
+def test_get_folder_items_marker_paging(client: FlaskClient):
+    """Test that following next_marker visits every item exactly once."""
+    parent_id = _populate(client)
+
+    names = []
+    url = f"/2.0/folders/{parent_id}/items?usemarker=true&limit=2&direction=DESC"
+    marker = None
+    while True:
+        page = client.get(url + (f"&marker={marker}" if marker else "")).json
+        assert "total_count" not in page
+        names += [e["name"] for e in page["entries"]]
+        marker = page["next_marker"]
+        if marker is None:
+            break
+
+    assert names == ["f2", "f1", "f0", "a3.txt", "a2.txt", "a1.txt", "a0.txt"]
+
+
+def test_get_folder_items_rejects_bad_parameters(client: FlaskClient):
+    """Test that unknown sorts and malformed markers return 400."""
+    bad_sort = client.get("/2.0/folders/0/items?sort=color")
+    bad_marker = client.get("/2.0/folders/0/items?usemarker=true&marker=%%%")
+
+    assert bad_sort.status_code == 400
+    assert bad_marker.status_code == 400
+
+
+@pytest.mark.parametrize(
+    ("sort", "after"),
+    [
+        ("name", "Docs"),
+        ("name", ["Docs"]),
+        ("name", [{"name": "Docs"}, "1"]),
+        ("date", ["yesterday", "1"]),
+        ("date", [5, "1"]),
+    ],
+)
+def test_get_folder_items_rejects_tampered_marker(
+    client: FlaskClient,
+    sort: str,
+    after: object,
+):
+    """Test that a marker whose position does not fit the sort returns 400."""
+    marker = pagination.encode_marker({"type": "folder", "sort": sort, "after": after})
+
+    response = client.get(
+        f"/2.0/folders/0/items?usemarker=true&sort={sort}&marker={marker}",
+    )
+
+    assert response.status_code == 400
+
+
+def test_get_folder_items_fields(client: FlaskClient):
+    """Test that folder listings honor ?fields= for every entry."""
+    parent_id = _populate(client)
+
+    entries = client.get(
+        f"/2.0/folders/{parent_id}/items?fields=name&usemarker=true&limit=4",
+    ).json["entries"]
+
+    assert {tuple(sorted(e)) for e in entries} == {("etag", "id", "name", "type")}
+
+
+def test_folder_etags(client: FlaskClient):
+    """Test folder etags with If-Match on writes and If-None-Match on reads."""
+    folder_id = create_folder(client, "a")
+
+    renamed = client.put(f"/2.0/folders/{folder_id}", json={"name": "b"})
+    stale = client.put(
+        f"/2.0/folders/{folder_id}",
+        json={"name": "c"},
+        headers={"If-Match": "0"},
+    )
+    not_modified = client.get(
+        f"/2.0/folders/{folder_id}",
+        headers={"If-None-Match": '"1"'},
+    )
+    stale_delete = client.delete(
+        f"/2.0/folders/{folder_id}",
+        headers={"If-Match": "0"},
+    )
+    deleted = client.delete(f"/2.0/folders/{folder_id}", headers={"If-Match": "1"})
+
+    assert renamed.json["etag"] == "1"
+    assert stale.status_code == 412
+    assert not_modified.status_code == 304
+    assert stale_delete.status_code == 412
+    assert deleted.status_code == 204
@@ -0,0 +1,136 @@
+"""Tests for request logging."""
+
+import io
+import json
+import logging
+from collections.abc import Iterator
+
+import pytest
+from flask.testing import FlaskClient
+
+from box_mock import config, request_log
+
+
+class _Records(logging.Handler):
+    """Collect the request fields of log records."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.entries: list[dict] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.entries.append(record.request)
+
+
+@pytest.fixture
+def records() -> Iterator[_Records]:
+    """Capture request log records as they are emitted."""
+    handler = _Records()
+    request_log.logger.addHandler(handler)
+    yield handler
+    request_log.logger.removeHandler(handler)
+    request_log.configure_request_log()
+
+
+def _configure(monkeypatch: pytest.MonkeyPatch, **settings: object) -> None:
+    """Apply logging settings."""
+    for name, value in settings.items():
+        monkeypatch.setattr(config, name, value)
+    request_log.configure_request_log()
+
+
+def test_requests_are_logged_with_fields(client: FlaskClient, records: _Records):
+    """Test that each request is logged once with its fields and no body."""
+    client.post("/2.0/folders", json={"name": "Docs", "parent": {"id": "0"}})
+
+    (entry,) = records.entries
+    assert entry["method"] == "POST"
+    assert entry["endpoint"] == "folders.create_folder"
+    assert entry["identity"] == "default"
+    assert entry["status"] == 201
+    assert entry["duration_ms"] >= 0
+    assert "body" not in entry
+
+
+def test_bodies_are_opt_in_capped_and_never_parsed(
+    client: FlaskClient,
+    records: _Records,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that only the start of JSON bodies is logged, never uploads."""
+    _configure(monkeypatch, LOG_BODIES=True, LOG_BODY_LIMIT=10)
+
+    client.post("/2.0/folders", json={"name": "Docs", "parent": {"id": "0"}})
+    client.post(
+        "/2.0/files/content",
+        data={
+            "attributes": json.dumps({"name": "a.txt", "parent": {"id": "0"}}),
+            "file": (io.BytesIO(b"secret"), "a.txt"),
+        },
+    )
+
+    folder, upload = records.entries
+    assert folder["body"] == '{"name":"D'
+    assert upload["status"] == 201
+    assert "body" not in upload
+
+
+def test_unread_bodies_are_read_up_to_the_cap(
+    client: FlaskClient,
+    records: _Records,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that logging reads no more of an unread body than it logs."""
+    _configure(monkeypatch, LOG_BODIES=True, LOG_BODY_LIMIT=10)
+    body = io.BytesIO(b"x" * 100_000)
+
+    client.get(
+        "/health",
+        input_stream=body,
+        content_length=100_000,
+        content_type="text/plain",
+    )
+
+    (entry,) = records.entries
+    assert entry["body"] == "x" * 10
+    assert body.tell() == 10
+
+
+def test_sampling_and_route_levels(
+    client: FlaskClient,
+    records: _Records,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that sampling drops successes only and routes set their level."""
+    _configure(
+        monkeypatch,
+        LOG_SAMPLE_RATE=0.0,
+        LOG_ROUTES="admin.health=WARNING,folders.get_folder=INFO:1",
+    )
+
+    client.get("/health")
+    client.get("/2.0/folders/0/items")
+    client.get("/2.0/folders/0")
+    client.get("/2.0/files/missing")
+
+    assert [(e["endpoint"], e["status"]) for e in records.entries] == [
+        ("folders.get_folder", 200),
+        ("files.get_file", 404),
+    ]
+
+
+def test_parse_route_policies():
+    """Test that route policies default to the global level and rate."""
+    default = request_log.RoutePolicy(logging.INFO, 0.5)
+
+    policies = request_log.parse_route_policies(
+        "admin.health=warning, files.get_file=:0.1,",
+        default,
+    )
+
+    assert policies == {
+        "admin.health": (logging.WARNING, 0.5),
+        "files.get_file": (logging.INFO, 0.1),
+    }
+    with pytest.raises(ValueError, match="LOUD"):
+        request_log.parse_route_policies("admin.health=LOUD", default)
@@ -0,0 +1,66 @@
+"""Tests for search routes."""
+
+from flask.testing import FlaskClient
+
+from tests.routes.helpers import create_folder, upload_file
+
+
+def _names(client: FlaskClient, query_string: str) -> list[str]:
+    """Search and return the names of the results."""
+    response = client.get(f"/2.0/search?{query_string}")
+    assert response.status_code == 200
+    return sorted(entry["name"] for entry in response.json["entries"])
+
+
+def test_search_matches_word_prefixes(client: FlaskClient):
+    """Test that every query word must prefix a word of the item name."""
+    reports_id = create_folder(client, "Quarterly Reports")
+    upload_file(client, "report_2024.pdf", parent_id=reports_id)
+    upload_file(client, "notes.txt")
+
+    assert _names(client, "query=report") == ["Quarterly Reports", "report_2024.pdf"]
+    assert _names(client, "query=report 2024") == ["report_2024.pdf"]
+    assert _names(client, "query=report&type=folder") == ["Quarterly Reports"]
+
+
+def test_search_follows_renames_and_deletes(client: FlaskClient):
+    """Test that the index is kept in sync with the item tables."""
+    file_id = upload_file(client, "draft.txt").json["entries"][0]["id"]
+    folder_id = create_folder(client, "draft folder")
+
+    client.put(f"/2.0/files/{file_id}", json={"name": "final.txt"})
+    client.delete(f"/2.0/folders/{folder_id}")
+
+    assert _names(client, "query=draft") == []
+    assert _names(client, "query=final") == ["final.txt"]
+
+
+def test_search_within_ancestor_folders(client: FlaskClient):
+    """Test that ancestor_folder_ids limits results to those subtrees."""
+    outer_id = create_folder(client, "Outer")
+    inner_id = create_folder(client, "Inner", outer_id)
+    upload_file(client, "budget.xlsx", parent_id=inner_id)
+    upload_file(client, "budget old.xlsx")
+
+    assert _names(client, f"query=budget&ancestor_folder_ids={outer_id}") == [
+        "budget.xlsx",
+    ]
+
+
+def test_search_pages_results(client: FlaskClient):
+    """Test that limit and offset page through results with a total count."""
+    for i in range(5):
+        upload_file(client, f"invoice {i}.pdf")
+
+    first = client.get("/2.0/search?query=invoice&limit=2").json
+    rest = client.get("/2.0/search?query=invoice&limit=2&offset=2&fields=name").json
+
+    assert first["total_count"] == 5
+    assert len(first["entries"]) == 2
+    assert len(rest["entries"]) == 2
+    assert set(rest["entries"][0]) == {"type", "id", "etag", "name"}
+
+
+def test_search_requires_query(client: FlaskClient):
+    """Test that a missing query returns 400."""
+    assert client.get("/2.0/search").status_code == 400
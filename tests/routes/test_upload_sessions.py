@@ -0,0 +1,170 @@
+"""Tests for chunked upload session routes."""
+
+import base64
+import hashlib
+
+import pytest
+from flask.testing import FlaskClient
+from werkzeug.test import TestResponse
+
+import box_mock.routes.upload_sessions as upload_sessions_module
+
+
+@pytest.fixture(autouse=True)
+def small_parts(monkeypatch: pytest.MonkeyPatch):
+    """Use tiny parts so tests can upload several of them."""
+    monkeypatch.setattr(upload_sessions_module, "PART_SIZE", 4)
+
+
+def _digest(content: bytes) -> str:
+    return "sha=" + base64.b64encode(hashlib.sha1(content).digest()).decode()
+
+
+def _create_session(client: FlaskClient, size: int, name: str = "big.bin") -> dict:
+    response = client.post(
+        "/2.0/files/upload_sessions",
+        json={"folder_id": "0", "file_size": size, "file_name": name},
+    )
+    assert response.status_code == 201
+    return response.json
+
+
+def _upload_part(
+    client: FlaskClient,
+    session_id: str,
+    content: bytes,
+    offset: int,
+    total: int,
+) -> TestResponse:
+    return client.put(
+        f"/2.0/files/upload_sessions/{session_id}",
+        data=content,
+        headers={
+            "Digest": _digest(content),
+            "Content-Range": f"bytes {offset}-{offset + len(content) - 1}/{total}",
+        },
+        content_type="application/octet-stream",
+    )
+
+
+def test_chunked_upload_lifecycle(client: FlaskClient):
+    """Test creating a session, uploading parts out of order and committing."""
+    content = b"hello chunked world"
+    session = _create_session(client, len(content))
+    assert session["total_parts"] == 5
+
+    parts = [
+        _upload_part(client, session["id"], content[o : o + 4], o, len(content))
+        for o in reversed(range(0, len(content), 4))
+    ]
+    assert all(p.status_code == 200 for p in parts)
+
+    listed = client.get(f"/2.0/files/upload_sessions/{session['id']}/parts").json
+    assert listed["total_count"] == 5
+    assert [p["offset"] for p in listed["entries"]] == [0, 4, 8, 12, 16]
+
+    response = client.post(
+        f"/2.0/files/upload_sessions/{session['id']}/commit",
+        json={"parts": [p.json["part"] for p in parts]},
+        headers={"Digest": _digest(content)},
+    )
+
+    assert response.status_code == 201
+    file = response.json["entries"][0]
+    assert file["name"] == "big.bin"
+    assert file["size"] == len(content)
+    assert file["sha1"] == hashlib.sha1(content).hexdigest()
+    assert client.get(f"/2.0/files/{file['id']}/content").data == content
+    status = client.get(f"/2.0/files/upload_sessions/{session['id']}")
+    assert status.status_code == 404
+
+
+def test_upload_part_rejects_bad_digest(client: FlaskClient):
+    """Test that a part whose Digest does not match is rejected."""
+    session = _create_session(client, 8)
+
+    response = client.put(
+        f"/2.0/files/upload_sessions/{session['id']}",
+        data=b"abcd",
+        headers={"Digest": _digest(b"wxyz"), "Content-Range": "bytes 0-3/8"},
+        content_type="application/octet-stream",
+    )
+
+    assert response.status_code == 412
+
+
+def test_upload_part_rejects_misaligned_range(client: FlaskClient):
+    """Test that a Content-Range not on a part boundary is rejected."""
+    session = _create_session(client, 8)
+
+    response = _upload_part(client, session["id"], b"bcd", 1, 8)
+
+    assert response.status_code == 416
+
+
+def test_commit_rejects_missing_parts(client: FlaskClient):
+    """Test that committing before all parts are uploaded fails."""
+    session = _create_session(client, 8)
+    part = _upload_part(client, session["id"], b"abcd", 0, 8).json["part"]
+
+    response = client.post(
+        f"/2.0/files/upload_sessions/{session['id']}/commit",
+        json={"parts": [part]},
+        headers={"Digest": _digest(b"abcdefgh")},
+    )
+
+    assert response.status_code == 400
+
+
+def test_commit_rejects_missing_parent(client: FlaskClient):
+    """Test that committing into a folder that does not exist fails."""
+    session = _create_session(client, 4)
+    part = _upload_part(client, session["id"], b"abcd", 0, 4).json["part"]
+
+    response = client.post(
+        f"/2.0/files/upload_sessions/{session['id']}/commit",
+        json={"parts": [part], "attributes": {"parent": {"id": "nope"}}},
+        headers={"Digest": _digest(b"abcd")},
+    )
+
+    assert response.status_code == 404
+    assert response.json["code"] == "not_found"
+    assert client.get("/2.0/folders/0/items").json["total_count"] == 0
+
+
+def test_abort_session(client: FlaskClient):
+    """Test that aborting a session removes it."""
+    session = _create_session(client, 8)
+    _upload_part(client, session["id"], b"abcd", 0, 8)
+
+    response = client.delete(f"/2.0/files/upload_sessions/{session['id']}")
+
+    assert response.status_code == 204
+    status = client.get(f"/2.0/files/upload_sessions/{session['id']}")
+    assert status.status_code == 404
+
+
+def test_version_upload_session(client: FlaskClient):
+    """Test that a session for an existing file commits a new version."""
+    first = _create_session(client, 4, name="doc.txt")
+    part = _upload_part(client, first["id"], b"v1v1", 0, 4).json["part"]
+    file = client.post(
+        f"/2.0/files/upload_sessions/{first['id']}/commit",
+        json={"parts": [part]},
+        headers={"Digest": _digest(b"v1v1")},
+    ).json["entries"][0]
+
+    session = client.post(
+        f"/2.0/files/{file['id']}/upload_sessions",
+        json={"file_size": 4},
+    ).json
+    part = _upload_part(client, session["id"], b"v2v2", 0, 4).json["part"]
+    response = client.post(
+        f"/2.0/files/upload_sessions/{session['id']}/commit",
+        json={"parts": [part]},
+        headers={"Digest": _digest(b"v2v2")},
+    )
+
+    assert response.status_code == 201
+    assert response.json["entries"][0]["file_version"]["version_number"] == 2
+    assert client.get(f"/2.0/files/{file['id']}/content").data == b"v2v2"
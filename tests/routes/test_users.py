@@ -2,6 +2,8 @@
 
 from flask.testing import FlaskClient
 
+from box_mock import pagination
+
 
 def test_get_current_user(client: FlaskClient):
     """Test that GET /2.0/users/me returns current user."""
@@ -68,3 +70,82 @@ def test_delete_user(client: FlaskClient):
     response = client.delete(f"/2.0/users/{user_id}")
 
     assert response.status_code == 204
+
+
+def _create_users(client: FlaskClient) -> None:
+    """Create a few users with distinct names and emails."""
+    for name, email in [
+        ("Alice Anders", "alice@example.com"),
+        ("Bob Brown", "bob@example.com"),
+        ("Carol Bobson", "carol@example.org"),
+        ("Dan Day", "dan@example.com"),
+    ]:
+        client.post("/2.0/users", json={"name": name, "email": email})
+
+
+def _names(client: FlaskClient, query_string: str) -> list[str]:
+    """List users and return their names."""
+    response = client.get(f"/2.0/users?{query_string}")
+    assert response.status_code == 200
+    return [entry["name"] for entry in response.json["entries"]]
+
+
+def test_list_users_filter_term(client: FlaskClient):
+    """Test that filter_term matches substrings of names and emails."""
+    _create_users(client)
+
+    assert _names(client, "filter_term=bob") == ["Bob Brown", "Carol Bobson"]
+    assert _names(client, "filter_term=EXAMPLE.ORG") == ["Carol Bobson"]
+    assert _names(client, "filter_term=an") == ["Alice Anders", "Dan Day"]
+    assert _names(client, "filter_term=bob@example.com") == ["Bob Brown"]
+
+
+def test_list_users_filter_term_follows_updates(client: FlaskClient):
+    """Test that the user index drops deleted users."""
+    _create_users(client)
+    bob_id = client.get("/2.0/users?filter_term=bob@example.com").json["entries"][0]
+
+    client.delete(f"/2.0/users/{bob_id['id']}")
+
+    assert _names(client, "filter_term=bob") == ["Carol Bobson"]
+
+
+def test_list_users_paging(client: FlaskClient):
+    """Test offset and marker paging over users."""
+    _create_users(client)
+
+    offset_page = client.get("/2.0/users?limit=2&offset=1").json
+    names = []
+    marker = ""
+    while marker is not None:
+        page = client.get(f"/2.0/users?usemarker=true&limit=3&marker={marker}").json
+        names += [entry["name"] for entry in page["entries"]]
+        marker = page["next_marker"]
+
+    assert offset_page["total_count"] == 4
+    assert [e["name"] for e in offset_page["entries"]] == ["Bob Brown", "Carol Bobson"]
+    assert names == ["Alice Anders", "Bob Brown", "Carol Bobson", "Dan Day"]
+
+
+def test_list_users_rejects_tampered_marker(client: FlaskClient):
+    """Test that a marker whose position does not fit the sort returns 400."""
+    _create_users(client)
+    markers = [
+        pagination.encode_marker({"sort": "name", "after": after})
+        for after in ("Bob", ["Bob"], [["Bob"], "1"])
+    ]
+
+    responses = [
+        client.get(f"/2.0/users?usemarker=true&marker={marker}") for marker in markers
+    ]
+
+    assert [r.status_code for r in responses] == [400, 400, 400]
+
+
+def test_list_users_user_type(client: FlaskClient):
+    """Test that user_type is validated and external users are never listed."""
+    _create_users(client)
+
+    assert len(_names(client, "user_type=managed")) == 4
+    assert _names(client, "user_type=external") == []
+    assert client.get("/2.0/users?user_type=robots").status_code == 400
@@ -0,0 +1,86 @@
+"""Tests for the item response cache."""
+
+from collections.abc import Iterator
+from unittest.mock import MagicMock
+
+import pytest
+
+from box_mock import cache, config
+from box_mock.models import File
+
+
+@pytest.fixture(autouse=True)
+def item_cache(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """Start every test with an empty, enabled cache."""
+    monkeypatch.setattr(config, "ITEM_CACHE_SIZE", 100)
+    monkeypatch.setattr(config, "ITEM_CACHE_TTL", 0)
+    cache.configure_item_cache()
+    yield
+    cache.configure_item_cache()
+
+
+def _session(*files: File) -> MagicMock:
+    """Build a session whose get() returns ``files`` in turn."""
+    session = MagicMock()
+    session.get.side_effect = list(files)
+    return session
+
+
+def test_get_item_reads_through_once():
+    """Test that a cached item is served without touching the session."""
+    session = _session(File(id="f1", name="a.txt", folder_id="0", version=1))
+
+    first = cache.get_item("x", session, File, "f1")
+    second = cache.get_item("x", session, File, "f1", frozenset({"name"}))
+
+    assert first["name"] == "a.txt"
+    assert second == {"type": "file", "id": "f1", "etag": "0", "name": "a.txt"}
+    assert session.get.call_count == 1
+    assert cache.item_cache_stats()["hits"] == 1
+
+
+def test_invalidate_drops_item():
+    """Test that invalidated items and identities are loaded again."""
+    session = _session(
+        File(id="f1", name="old.txt", folder_id="0"),
+        File(id="f1", name="new.txt", folder_id="0"),
+        File(id="f1", name="newest.txt", folder_id="0"),
+    )
+
+    cache.get_item("x", session, File, "f1")
+    cache.invalidate("x", File, "f1")
+    renamed = cache.get_item("x", session, File, "f1")
+    cache.invalidate_identity("x")
+    reset = cache.get_item("x", session, File, "f1")
+
+    assert renamed["name"] == "new.txt"
+    assert reset["name"] == "newest.txt"
+
+
+def test_read_racing_a_write_is_not_cached():
+    """Test that a value loaded while a write commits is not stored."""
+    session = MagicMock()
+
+    def get_during_write(*_: object, **__: object) -> File:
+        cache.invalidate("x", File, "f1")
+        return File(id="f1", name="stale.txt", folder_id="0")
+
+    session.get.side_effect = get_during_write
+
+    cache.get_item("x", session, File, "f1")
+
+    assert cache.item_cache_stats()["size"] == 0
+
+
+def test_disabled_cache_loads_every_time(monkeypatch: pytest.MonkeyPatch):
+    """Test that a size of 0 bypasses the cache."""
+    monkeypatch.setattr(config, "ITEM_CACHE_SIZE", 0)
+    session = _session(
+        File(id="f1", name="a.txt", folder_id="0"),
+        File(id="f1", name="a.txt", folder_id="0"),
+    )
+
+    cache.get_item("x", session, File, "f1")
+    cache.get_item("x", session, File, "f1")
+
+    assert session.get.call_count == 2
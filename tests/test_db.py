@@ -1,30 +1,26 @@
 """Tests for database session management."""
 
-import tempfile
-from collections.abc import Iterator
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from unittest.mock import MagicMock
 
 import pytest
 from flask import Flask, g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
 
 import box_mock.db as db_module
-from box_mock.db import DBProxy, get_session_class, reset_identity_data
-from box_mock.models import Folder
-
-
-@pytest.fixture
-def temp_data_dir() -> Iterator[Path]:
-    """Yield a temporary data directory for testing."""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        original_data_dir = db_module.DATA_DIR
-        original_engines = db_module._engines.copy()
-        db_module.DATA_DIR = Path(tmpdir)
-        db_module._engines.clear()
-        yield Path(tmpdir)
-        db_module.DATA_DIR = original_data_dir
-        db_module._engines.clear()
-        db_module._engines.update(original_engines)
+from box_mock import config
+from box_mock.db import (
+    DBProxy,
+    checkpoint_identity,
+    get_read_session_class,
+    get_session_class,
+    list_identities,
+    reset_identity_data,
+)
+from box_mock.models import Base, Folder
 
 
 def test_get_session_class_creates_database(temp_data_dir: Path):
@@ -66,6 +62,71 @@ def test_get_session_class_isolates_identities(temp_data_dir: Path):
     session_b.close()
 
 
+def test_engine_cache_evicts_least_recently_used(
+    temp_data_dir: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that the engine cache is bounded and disposes evicted engines."""
+    _ = temp_data_dir
+    monkeypatch.setattr(config, "MAX_ENGINES", 2)
+    db_module.configure_engine_cache()
+    disposed = []
+    monkeypatch.setattr(
+        db_module._engines,
+        "on_evict",
+        lambda identity, _: disposed.append(identity),
+    )
+
+    get_session_class("lru-a")
+    get_session_class("lru-b")
+    get_session_class("lru-a")
+    get_session_class("lru-c")
+
+    assert disposed == ["lru-b"]
+    assert db_module._engines.keys() == ["lru-a", "lru-c"]
+    assert db_module._engines.stats()["evictions"] == 1
+
+
+def test_new_identity_is_cloned_from_template(
+    temp_data_dir: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that new identities are bootstrapped without create_all."""
+    create_all = MagicMock()
+    monkeypatch.setattr(Base.metadata, "create_all", create_all)
+    db_module.build_template()
+    create_all.reset_mock()
+
+    session = get_session_class("template-identity")()
+
+    assert (temp_data_dir / "template-identity" / "box.db").exists()
+    assert session.get(Folder, "0") is not None
+    create_all.assert_not_called()
+    session.close()
+
+
+def test_concurrent_bootstrap_is_single_flight(
+    temp_data_dir: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that concurrent first requests create the engines only once."""
+    _ = temp_data_dir
+    create_engines = db_module._create_engines
+    calls = []
+
+    def slow_create_engines(identity: str) -> tuple:
+        calls.append(identity)
+        time.sleep(0.05)
+        return create_engines(identity)
+
+    monkeypatch.setattr(db_module, "_create_engines", slow_create_engines)
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(get_session_class, ["racy-identity"] * 8))
+
+    assert calls == ["racy-identity"]
+    assert all(result is results[0] for result in results)
+
+
 def test_reset_identity_data_clears_database(temp_data_dir: Path):
     """Test that reset_identity_data clears all data."""
     _ = temp_data_dir
@@ -104,6 +165,105 @@ def test_reset_identity_data_handles_missing_identity(temp_data_dir: Path):
     reset_identity_data("nonexistent-identity")
 
 
+def test_db_profile_pragmas_are_applied(
+    temp_data_dir: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that the configured profile's PRAGMAs are set on new connections."""
+    _ = temp_data_dir
+    monkeypatch.setattr(config, "DB_PROFILE", "ci")
+    session = get_session_class("profile-identity")()
+
+    assert session.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+    assert session.execute(text("PRAGMA synchronous")).scalar() == 0
+    assert session.execute(text("PRAGMA busy_timeout")).scalar() == 30000
+    session.close()
+
+
+def test_read_session_class_is_read_only(temp_data_dir: Path):
+    """Test that the read engine sees committed data but rejects writes."""
+    _ = temp_data_dir
+    session = get_session_class("read-identity")()
+    session.add(Folder(id="written", name="Written", parent_id="0"))
+    session.commit()
+    session.close()
+
+    read_session = get_read_session_class("read-identity")()
+    assert read_session.get(Folder, "written") is not None
+    read_session.add(Folder(name="Rejected", parent_id="0"))
+    with pytest.raises(OperationalError):
+        read_session.commit()
+    read_session.close()
+
+
+@pytest.fixture
+def in_memory(temp_data_dir: Path, monkeypatch: pytest.MonkeyPatch) -> Path:
+    """Enable in-memory mode with a temporary memory directory."""
+    memory_dir = temp_data_dir / "memory"
+    monkeypatch.setattr(config, "IN_MEMORY", True)
+    monkeypatch.setattr(config, "MEMORY_DIR", memory_dir)
+    monkeypatch.setattr(db_module, "_memory_keepers", {})
+    return memory_dir
+
+
+def test_in_memory_identity_does_not_touch_data_dir(
+    temp_data_dir: Path,
+    in_memory: Path,
+):
+    """Test that in-memory identities keep their database off disk."""
+    session_class = get_session_class("memory-identity")
+    session = session_class()
+    session.add(Folder(name="In Memory", parent_id="0"))
+    session.commit()
+    session.close()
+
+    assert not (temp_data_dir / "memory-identity").exists()
+    assert list_identities() == ["memory-identity"]
+    _ = in_memory
+
+
+def test_checkpoint_round_trip(temp_data_dir: Path, in_memory: Path):
+    """Test that a checkpoint is written to disk and restored on next start."""
+    session_class = get_session_class("checkpoint-identity")
+    session = session_class()
+    session.add(Folder(name="Saved", parent_id="0"))
+    session.commit()
+    session.close()
+    blob = in_memory / "checkpoint-identity" / "files" / "blob"
+    blob.parent.mkdir(parents=True)
+    blob.write_bytes(b"content")
+
+    checkpoint_identity("checkpoint-identity")
+
+    assert (temp_data_dir / "checkpoint-identity" / "box.db").exists()
+    assert (temp_data_dir / "checkpoint-identity" / "files" / "blob").exists()
+
+    db_module._engines.clear()
+    db_module._memory_keepers.clear()
+    blob.unlink()
+    blob.parent.rmdir()
+    session = get_session_class("checkpoint-identity")()
+    assert session.query(Folder).filter_by(name="Saved").count() == 1
+    session.close()
+    assert blob.read_bytes() == b"content"
+
+
+def test_memory_dirs_do_not_outlive_process(in_memory: Path):
+    """Test that stale blobs are discarded and blob directories removed on exit."""
+    stale = in_memory / "stale-identity" / "files" / "blob"
+    stale.parent.mkdir(parents=True)
+    stale.write_bytes(b"stale")
+
+    get_session_class("stale-identity")
+
+    assert not stale.exists()
+    (in_memory / "stale-identity" / "files").mkdir(parents=True)
+
+    db_module.remove_memory_dirs()
+
+    assert not (in_memory / "stale-identity").exists()
+
+
 def test_db_proxy_session_returns_g_session():
     """Test that DBProxy.session returns session from flask.g."""
     app = Flask(__name__)
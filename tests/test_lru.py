@@ -0,0 +1,82 @@
+"""Tests for the LRU cache."""
+
+import pytest
+
+from box_mock import lru
+from box_mock.lru import LRUCache
+
+
+def test_get_counts_hits_and_misses():
+    """Test that lookups update the hit and miss counters."""
+    cache: LRUCache[str, int] = LRUCache()
+    cache.put("a", 1)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_put_evicts_least_recently_used():
+    """Test that exceeding max_size evicts the least recently used entry."""
+    evicted = []
+    cache: LRUCache[str, int] = LRUCache(
+        max_size=2,
+        on_evict=lambda k, v: evicted.append((k, v)),
+    )
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert evicted == [("b", 2)]
+    assert cache.keys() == ["a", "c"]
+
+
+def test_idle_entries_expire(monkeypatch: pytest.MonkeyPatch):
+    """Test that entries unused for longer than ttl are evicted."""
+    now = [100.0]
+    monkeypatch.setattr(lru.time, "monotonic", lambda: now[0])
+    evicted = []
+    cache: LRUCache[str, int] = LRUCache(
+        ttl=10, on_evict=lambda k, _: evicted.append(k)
+    )
+    cache.put("a", 1)
+    now[0] = 105.0
+    cache.put("b", 2)
+    now[0] = 112.0
+
+    assert "a" not in cache
+    assert cache.get("b") == 2
+    assert evicted == ["a"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_evict_idle_sweeps_without_access(monkeypatch: pytest.MonkeyPatch):
+    """Test that idle entries can be dropped without using the cache."""
+    now = [100.0]
+    monkeypatch.setattr(lru.time, "monotonic", lambda: now[0])
+    evicted = []
+    cache: LRUCache[str, int] = LRUCache(
+        ttl=10, on_evict=lambda k, _: evicted.append(k)
+    )
+    cache.put("a", 1)
+    now[0] = 105.0
+    cache.put("b", 2)
+    now[0] = 112.0
+
+    cache.evict_idle()
+
+    assert evicted == ["a"]
+    assert cache.keys() == ["b"]
+
+
+def test_pop_calls_on_evict_without_counting():
+    """Test that explicit removal notifies on_evict but is not an eviction."""
+    evicted = []
+    cache: LRUCache[str, int] = LRUCache(on_evict=lambda k, _: evicted.append(k))
+    cache.put("a", 1)
+
+    assert cache.pop("a") == 1
+    assert evicted == ["a"]
+    assert cache.stats()["evictions"] == 0
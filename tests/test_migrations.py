@@ -0,0 +1,77 @@
+"""Tests for schema migrations."""
+
+import sqlite3
+from pathlib import Path
+
+from sqlalchemy import create_engine, inspect
+
+from box_mock import migrations
+from box_mock.db import get_session_class
+from box_mock.models import File
+
+LEGACY_SCHEMA = """
+CREATE TABLE folders (
+    id VARCHAR(36) PRIMARY KEY, name VARCHAR(255) NOT NULL,
+    parent_id VARCHAR(36) REFERENCES folders(id), created_at DATETIME,
+    modified_at DATETIME, description TEXT
+);
+CREATE TABLE files (
+    id VARCHAR(36) PRIMARY KEY, name VARCHAR(255) NOT NULL,
+    folder_id VARCHAR(36) NOT NULL REFERENCES folders(id), size INTEGER,
+    created_at DATETIME, modified_at DATETIME, description TEXT, version INTEGER
+);
+CREATE TABLE users (
+    id VARCHAR(36) PRIMARY KEY, name VARCHAR(255) NOT NULL, login VARCHAR(255),
+    email VARCHAR(255), created_at DATETIME, modified_at DATETIME,
+    is_platform_access_only BOOLEAN, external_app_user_id VARCHAR(255),
+    status VARCHAR(50), language VARCHAR(10), timezone VARCHAR(50),
+    space_amount INTEGER, space_used INTEGER, max_upload_size INTEGER,
+    job_title VARCHAR(255), phone VARCHAR(50), address VARCHAR(255),
+    avatar_url VARCHAR(500), tracking_codes TEXT
+);
+INSERT INTO folders (id, name) VALUES ('0', 'All Files');
+INSERT INTO files (id, name, folder_id, size, version)
+VALUES ('a', 'dup.txt', '0', 1, 1), ('b', 'dup.txt', '0', 1, 1);
+"""
+
+
+def _legacy_database(path: Path) -> None:
+    """Create a database as written by a release without migrations."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(path)
+    connection.executescript(LEGACY_SCHEMA)
+    connection.close()
+
+
+def test_upgrade_migrates_legacy_database(tmp_path: Path):
+    """Test that a version 0 database gets new columns, tables and indexes."""
+    path = tmp_path / "box.db"
+    _legacy_database(path)
+    engine = create_engine(f"sqlite:///{path}")
+
+    assert migrations.upgrade(engine) == 0
+
+    inspector = inspect(engine)
+    assert "sha1" in {c["name"] for c in inspector.get_columns("files")}
+    assert "etag" in {c["name"] for c in inspector.get_columns("folders")}
+    assert "upload_sessions" in inspector.get_table_names()
+    indexes = {i["name"]: i for i in inspector.get_indexes("files")}
+    assert indexes["ix_files_folder_id_name"]["unique"]
+    with engine.connect() as connection:
+        assert migrations.get_version(connection) == migrations.SCHEMA_VERSION
+        names = dict(connection.exec_driver_sql("SELECT id, name FROM files").all())
+    assert names == {"a": "dup.txt", "b": "dup.txt (b)"}
+    assert migrations.upgrade(engine) == migrations.SCHEMA_VERSION
+    engine.dispose()
+
+
+def test_existing_identity_database_upgraded_on_engine_creation(temp_data_dir: Path):
+    """Test that an old box.db in DATA_DIR is migrated in place when opened."""
+    _legacy_database(temp_data_dir / "legacy" / "box.db")
+
+    session = get_session_class("legacy")()
+
+    assert session.get(File, "a").sha1 is None
+    assert session.get(File, "b").name == "dup.txt (b)"
+    assert session.get(File, "b").etag == 0
+    session.close()
@@ -0,0 +1,103 @@
+"""Tests for bulk seeding of identities."""
+
+import io
+import json
+import sys
+import tarfile
+from pathlib import Path
+
+import pytest
+from sqlalchemy import func, select
+
+from box_mock import seed
+from box_mock.db import get_session_class
+from box_mock.models import File, Folder, User
+from box_mock.storage import get_blob_path
+
+
+def _archive(members: dict[str, bytes]) -> io.BytesIO:
+    """Build an in-memory tar holding ``members``."""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as tar:
+        for name, content in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+    buffer.seek(0)
+    return buffer
+
+
+MANIFEST = {
+    "folders": [
+        {
+            "id": "docs",
+            "name": "Docs",
+            "folders": [{"name": "Nested", "files": [{"name": "b.txt"}]}],
+            "files": [{"name": "a.txt", "path": "./docs/a.txt"}],
+        },
+    ],
+    "files": [{"name": "inline.txt", "content": "inline"}],
+    "users": [{"name": "Ann", "email": "ann@example.com"}, {"login": "bob"}],
+}
+
+
+def test_seed_identity_imports_tree(temp_data_dir: Path):  # noqa: ARG001
+    """Test that folders, files with contents and users are imported."""
+    counts = seed.seed_identity("seeded", MANIFEST, _archive({"docs/a.txt": b"A"}))
+
+    assert counts == {"folders": 2, "files": 3, "users": 2}
+    with get_session_class("seeded")() as session:
+        a = session.scalars(select(File).where(File.name == "a.txt")).one()
+        nested = session.scalars(select(Folder).where(Folder.name == "Nested")).one()
+        names = sorted(session.scalars(select(User.name)))
+    assert a.folder_id == "docs"
+    assert nested.parent_id == "docs"
+    assert a.size == 1
+    assert get_blob_path("seeded", a.sha1).read_bytes() == b"A"
+    assert names == ["Ann", "Unnamed User"]
+
+
+@pytest.mark.parametrize(
+    ("manifest", "archive", "message"),
+    [
+        ({"folders": [{"id": "x"}]}, {}, "needs a name"),
+        ({"files": [{"name": "a", "path": "a"}]}, {}, "no archive"),
+        ({"files": [{"name": "a", "path": "a"}]}, {"b": b""}, "no file 'a'"),
+        ({"files": [{"name": "a"}, {"name": "a"}]}, {}, "duplicate"),
+        ({"parent_id": "missing"}, {}, "Parent folder not found"),
+    ],
+)
+def test_seed_identity_rejects_bad_manifests(
+    temp_data_dir: Path,
+    manifest: dict,
+    archive: dict[str, bytes],
+    message: str,
+):
+    """Test that invalid manifests import nothing and leave no blobs behind."""
+    with pytest.raises(seed.SeedError, match=message):
+        seed.seed_identity("bad", manifest, _archive(archive) if archive else None)
+
+    with get_session_class("bad")() as session:
+        assert session.scalar(select(func.count()).select_from(File)) == 0
+    files_dir = temp_data_dir / "bad" / "files"
+    assert not [p for p in files_dir.rglob("*") if p.name != ".layout"]
+
+
+def test_seed_cli(
+    temp_data_dir: Path,
+    monkeypatch: pytest.MonkeyPatch,
+    capsys: pytest.CaptureFixture[str],
+):
+    """Test that the CLI seeds an identity in the given data directory."""
+    manifest = temp_data_dir / "manifest.json"
+    manifest.write_text(json.dumps({"files": [{"name": "a.txt", "content": "a"}]}))
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        ["seed", str(manifest), "--identity", "cli", "--data-dir", str(temp_data_dir)],
+    )
+
+    seed.main()
+
+    assert json.loads(capsys.readouterr().out)["files"] == 1
+    assert (temp_data_dir / "cli" / "box.db").exists()
@@ -0,0 +1,52 @@
+"""Tests for model rendering and the JSON provider."""
+
+from datetime import datetime
+
+import pytest
+from flask import Flask
+
+from box_mock import config, serialization
+from box_mock.models import File
+from box_mock.serialization import FastJSONProvider
+
+
+def test_to_dict_renders_only_requested_fields():
+    """Test that a fields selection keeps only those fields plus type, id, etag."""
+    file = File(id="f1", name="a.txt", folder_id="0", size=3, version=2)
+
+    data = file.to_dict(frozenset({"name", "file_version"}))
+
+    assert data == {
+        "type": "file",
+        "id": "f1",
+        "etag": "0",
+        "name": "a.txt",
+        "file_version": {"id": "f1_v2", "version_number": 2},
+    }
+
+
+def test_load_columns_covers_requested_fields():
+    """Test that the columns to load follow the requested fields."""
+    columns = File.load_columns(frozenset({"parent", "file_version"}))
+
+    assert {c.key for c in columns} == {"id", "etag", "folder_id", "version"}
+
+
+@pytest.mark.parametrize("backend", ["orjson", "stdlib"])
+def test_provider_renders_datetimes_as_isoformat(
+    monkeypatch: pytest.MonkeyPatch,
+    backend: str,
+):
+    """Test that both backends produce the same compact JSON."""
+    if backend == "orjson" and serialization.orjson is None:
+        pytest.skip("orjson is not installed")
+    monkeypatch.setattr(config, "JSON_BACKEND", backend)
+    app = Flask(__name__)
+    provider = FastJSONProvider(app)
+    created = datetime(2024, 1, 2, 3, 4, 5, 678)  # noqa: DTZ001 - stored naive
+
+    response = provider.response({"created_at": created, "name": "é"})
+
+    assert response.get_data(as_text=True) == (
+        '{"created_at":"2024-01-02T03:04:05.000678","name":"é"}\n'
+    )
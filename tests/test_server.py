@@ -0,0 +1,66 @@
+"""Tests for the production server and cross-process locks."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from box_mock import config, locks
+from box_mock.server import BoxMockServer, ServerConfigError, check_worker_settings
+
+TRY_LOCK = """
+import fcntl, sys
+with open(sys.argv[1], "a") as f:
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        sys.exit(1)
+"""
+
+
+def _try_lock(path: Path) -> bool:
+    """Return whether another process can take the lock on ``path``."""
+    result = subprocess.run([sys.executable, "-c", TRY_LOCK, str(path)], check=False)
+    return result.returncode == 0
+
+
+def test_several_workers_disable_item_cache(monkeypatch: pytest.MonkeyPatch):
+    """Test that the per-process item cache is off with several workers."""
+    monkeypatch.setattr(config, "WORKERS", 4)
+    monkeypatch.setattr(config, "ITEM_CACHE_SIZE", 100)
+
+    check_worker_settings()
+
+    assert config.ITEM_CACHE_SIZE == 0
+
+
+def test_in_memory_needs_one_worker(monkeypatch: pytest.MonkeyPatch):
+    """Test that in-memory mode is refused with several workers."""
+    monkeypatch.setattr(config, "IN_MEMORY", True)
+    monkeypatch.setattr(config, "WORKERS", 2)
+
+    with pytest.raises(ServerConfigError, match="single worker"):
+        check_worker_settings()
+
+    monkeypatch.setattr(config, "WORKERS", 1)
+    check_worker_settings()
+
+
+def test_server_applies_options_and_loads_app():
+    """Test that options reach gunicorn and workers build their own app."""
+    app = object()
+    server = BoxMockServer(lambda: app, {"bind": "127.0.0.1:0", "workers": 3})
+
+    assert server.cfg.workers == 3
+    assert server.cfg.bind == ["127.0.0.1:0"]
+    assert server.load() is app
+
+
+def test_file_lock_excludes_other_processes(tmp_path: Path):
+    """Test that a file lock is held against other processes until released."""
+    path = tmp_path / "identity" / ".bootstrap.lock"
+
+    with locks.file_lock(path):
+        assert not _try_lock(path)
+    assert _try_lock(path)
@@ -0,0 +1,50 @@
+"""Tests for content-addressed blob storage."""
+
+from pathlib import Path
+
+import pytest
+
+from box_mock import config, storage
+
+
+def test_blob_path_is_sharded_by_prefix(
+    temp_data_dir: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that blob paths nest under the configured fan-out depth."""
+    monkeypatch.setattr(config, "FANOUT_DEPTH", 2)
+
+    path = storage.get_blob_path("shard-identity", "abcdef0123")
+
+    assert path == temp_data_dir / "shard-identity" / "files" / "ab/cd/abcdef0123"
+
+
+def test_flat_layout_is_migrated(temp_data_dir: Path, monkeypatch: pytest.MonkeyPatch):
+    """Test that blobs in the flat layout are moved into shard directories."""
+    files_dir = temp_data_dir / "flat-identity" / "files"
+    files_dir.mkdir(parents=True)
+    (files_dir / "abcdef0123").write_bytes(b"flat")
+    monkeypatch.setattr(config, "FANOUT_DEPTH", 1)
+
+    path = storage.get_blob_path("flat-identity", "abcdef0123")
+
+    assert path == files_dir / "ab" / "abcdef0123"
+    assert path.read_bytes() == b"flat"
+    assert (files_dir / storage.LAYOUT_MARKER).read_text() == "1"
+
+
+def test_relayout_blobs_back_to_flat(
+    temp_data_dir: Path,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Test that changing the depth moves blobs and removes empty shards."""
+    files_dir = temp_data_dir / "deep-identity" / "files"
+    (files_dir / "ab" / "cd").mkdir(parents=True)
+    (files_dir / "ab" / "cd" / "abcdef0123").write_bytes(b"deep")
+    monkeypatch.setattr(config, "FANOUT_DEPTH", 0)
+
+    moved = storage.relayout_blobs(files_dir)
+
+    assert moved == 1
+    assert (files_dir / "abcdef0123").read_bytes() == b"deep"
+    assert not (files_dir / "ab").exists()